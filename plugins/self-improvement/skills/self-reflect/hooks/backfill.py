@@ -0,0 +1,152 @@
+"""
+Backfill signals from past session transcripts (`memory_store.py backfill`).
+
+Signals only exist for sessions that ran the PreCompact or SessionEnd hooks
+after the plugin was installed. Backfill.run() finds the older transcripts under
+~/.claude/projects and scans them in a process pool. Each worker runs the
+capture-signals.py detectors and the capture-session-summary.py summary over
+one whole transcript, streamed from disk with the hooks' byte pre-filters.
+Workers only return signals: the parent process is the single writer,
+merging them into the store with append_many() in batches, so the store's
+lock is taken once per batch and not per transcript. Signals are stored like
+fresh captures, so /reflect reviews them before the 14-day prune; the
+transcript's modification time is kept as their `first_seen` and dates them
+in the recurrence table.
+
+The manifest (backfill.json in the reflections directory) records each
+transcript's path, size and mtime once its signals are stored. A re-run
+skips transcripts whose size and mtime have not changed. Transcripts that
+the capture-signals hook already checkpoints (sessions/<id>.json, or
+captured_sessions.json once maintain() drops the state of old sessions) are
+skipped as well, since the hooks keep them up to date. A session with only a
+summary digest there has had its SessionEnd summary stored, so only its
+signals are backfilled.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from capture_session_summary import build_summary_signal
+from capture_signals import extract_signals_from_transcript, stand_in as signal_stand_in
+from session_digest import extract_summary, stand_in
+from session_state import load_captured, load_session_state
+from transcript_io import iter_entries, iter_lines
+
+MANIFEST_FILE = "backfill.json"
+DEFAULT_PROJECTS_DIR = os.path.expanduser("~/.claude/projects")
+BATCH_SIZE = 500
+
+
+def discover(projects_dir):
+    """Paths of the *.jsonl transcripts under `projects_dir`, sorted."""
+    found = []
+    for root, _, files in os.walk(projects_dir):
+        found.extend(os.path.join(root, name) for name in files if name.endswith(".jsonl"))
+    return sorted(found)
+
+
+def _stamp(mtime):
+    """ISO 8601 UTC timestamp, as the store writes them, for a file modification time."""
+    return datetime.fromtimestamp(mtime, timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def _scan(job):
+    """Worker: (path, size, mtime, summarize) -> (path, size, mtime, signals, error)."""
+    path, size, mtime, summarize = job
+    session_id = os.path.basename(path)[:-len(".jsonl")]
+    try:
+        signals = extract_signals_from_transcript(
+            iter_entries(iter_lines(path, 0, size), signal_stand_in), session_id)
+        summary = extract_summary(iter_entries(iter_lines(path, 0, size), stand_in)) if summarize else None
+    except (OSError, ValueError) as e:
+        return path, size, mtime, [], str(e)
+    if summary and summary["turn_count"]:
+        signals.append(build_summary_signal(summary, session_id, hook="backfill"))
+    for signal in signals:
+        signal["source"] = {**signal["source"], "hook": "backfill"}
+    return path, size, mtime, signals, None
+
+
+class Backfill:
+    def __init__(self, store, projects_dir=DEFAULT_PROJECTS_DIR):
+        self.store = store
+        self.projects_dir = projects_dir
+        self.manifest_path = os.path.join(store.base_dir, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save_manifest(self, manifest):
+        self.store._atomic_write(self.manifest_path, json.dumps(manifest))
+
+    def pending(self, manifest):
+        """(jobs, skipped): the transcripts that need a scan, and how many do not.
+
+        A job is (path, size, mtime, summarize); summarize is False when the SessionEnd
+        hook already stored the session's summary.
+        """
+        jobs, skipped = [], 0
+        captured = load_captured(self.store.base_dir)
+        for path in discover(self.projects_dir):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            done = manifest.get(path)
+            session_id = os.path.basename(path)[:-len(".jsonl")]
+            if done and done["size"] == st.st_size and done["mtime"] == st.st_mtime:
+                skipped += 1  # unchanged since the last backfill
+                continue
+            state = load_session_state(self.store.base_dir, session_id)
+            sections = {k for k in ("signals", "summary") if state.get(k, {}).get("path") == path}
+            sections.update(captured.get(path, ()))
+            if "signals" in sections:
+                skipped += 1  # the capture hook owns it
+                continue
+            jobs.append((path, st.st_size, st.st_mtime, "summary" not in sections))
+        return jobs, skipped
+
+    def run(self, workers=None, batch_size=BATCH_SIZE):
+        """Scan every pending transcript. Returns {"scanned", "skipped", "signals", "failed"}."""
+        manifest = self._load_manifest()
+        jobs, skipped = self.pending(manifest)
+        counts = {"scanned": len(jobs), "skipped": skipped, "signals": 0, "failed": 0}
+        batch, done = {}, []  # batch: transcript time -> signals
+
+        def flush():
+            if batch:
+                with self.store._lock():
+                    for seen, signals in batch.items():
+                        self.store.append_many(signals, seen=seen)
+                        counts["signals"] += len(signals)
+            # Only stored transcripts go in the manifest, so an interrupted run resumes
+            for path, size, mtime in done:
+                manifest[path] = {"size": size, "mtime": mtime}
+            self._save_manifest(manifest)
+            batch.clear()
+            done.clear()
+
+        if not jobs:
+            return counts
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, min(16, len(jobs) // (workers * 4)))
+            for path, size, mtime, signals, error in pool.map(_scan, jobs, chunksize=chunksize):
+                if error:
+                    counts["failed"] += 1
+                    continue
+                if signals:
+                    batch.setdefault(_stamp(mtime), []).extend(signals)
+                done.append((path, size, mtime))
+                if sum(map(len, batch.values())) >= batch_size:
+                    flush()
+        flush()
+        return counts
@@ -0,0 +1,77 @@
+"""
+Benchmark `memory_store.py backfill` scaling with worker processes.
+
+Generates --transcripts synthetic session transcripts (mostly plain requests
+with some corrections and praise, tool calls with large results, failures) under a temporary projects
+directory, then times a full backfill into a fresh store for 1, 2, 4, ...
+workers up to the core count, reporting wall time and speedup over one
+worker. Every run must store the same number of signals; the run exits 1 if
+they differ.
+
+Usage: python3 bench_backfill.py [--transcripts 200] [--turns 300] [--max-workers N]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from backfill import Backfill
+from bench_capture import MESSAGES
+from memory_store import MemoryStore
+
+VOCABULARY = [f"{a}{b}" for a in ("con", "re", "pro", "de", "in", "ex", "sub", "trans")
+              for b in ("fig", "tain", "cess", "vert", "port", "pect", "sist", "form", "duce", "ject")]
+
+
+def make_projects(root, transcripts, turns):
+    rng = random.Random(0)
+    for n in range(transcripts):
+        path = os.path.join(root, f"-project-{n % 10}", f"session-{n}.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            for i in range(turns):
+                words = " ".join(rng.choices(VOCABULARY, k=8))
+                # Like real sessions, most user turns are plain requests that no detector flags
+                text = f"{rng.choice(MESSAGES)} {words}" if rng.random() < 0.1 else f"Can you look at the {words}?"
+                f.write(json.dumps({"role": "user", "content": text}) + "\n")
+                tool = {"name": "Bash", "input": {"command": "npm test"}, "result": f"PASS {i}\n" * 400}
+                if i % 50 == 0:
+                    tool["error"] = f"exit {n % 3}"
+                f.write(json.dumps({"role": "assistant", "content": "Running the tests.", "tool_use": tool}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transcripts", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench-backfill-")
+    try:
+        projects = os.path.join(tmpdir, "projects")
+        make_projects(projects, args.transcripts, args.turns)
+        workers, baseline, signals = 1, None, None
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'signals':>8}")
+        while workers <= args.max_workers:
+            store = MemoryStore(base_dir=os.path.join(tmpdir, f"store-{workers}"))
+            start = time.perf_counter()
+            counts = Backfill(store, projects_dir=projects).run(workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            if signals is not None and counts["signals"] != signals:
+                print(f"{workers} workers stored {counts['signals']} signals, 1 worker {signals}", file=sys.stderr)
+                sys.exit(1)
+            signals = counts["signals"]
+            print(f"{workers:>8} {elapsed:>8.2f} {baseline / elapsed:>7.1f}x {signals:>8}")
+            workers *= 2
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
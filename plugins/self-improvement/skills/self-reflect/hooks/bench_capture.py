@@ -0,0 +1,94 @@
+"""
+Benchmark keyword classification in capture-signals.py on synthetic transcripts.
+
+Builds transcripts of increasing size from a mix of corrections, conventions,
+praise, commands and filler turns, then times per message:
+  per-rule    the previous approach: lowercase, then one re.search per pattern
+  combined    signal_matcher.RuleMatcher: one combined pattern per category
+and the whole extract_signals_from_transcript() pass, with the time spent in
+each registered detector. Both classifiers must agree on the categories of
+every message; the run exits 1 if they do not.
+
+Usage: python3 bench_capture.py [--sizes 1000,10000,100000] [--runs 3]
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+
+from capture_signals import _mod as hook
+
+MESSAGES = [
+    "No, use pnpm not npm in this project",
+    "Actually, the config file is in /etc",
+    "Use rg instead of grep, it's faster",
+    "We always use absolute imports in this repo",
+    "Our naming convention is camelCase for files",
+    "Perfect, that's exactly right",
+    "Looks good, nice work",
+    "Please run `make test` and `make lint` before pushing",
+    "ok, continue with the next step",
+    "Can you also update the README with the new flags?",
+    "What does this function return when the list is empty?",
+    "Let's move on to the database migration now",
+]
+
+
+def transcript(turns, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(turns):
+        entries.append({"role": "assistant", "content": f"Working on step {i}, running the tests now.",
+                        "tool_use": {"name": "Bash", "input": {"command": "npm test"}}})
+        entries.append({"role": "user", "content": f"{rng.choice(MESSAGES)} (turn {i})"})
+    return entries
+
+
+def per_rule(text):
+    """The per-pattern scan capture-signals.py used before the combined matcher."""
+    lower = text.lower()
+    hits = set()
+    for name in ("correction", "workflow", "convention", "run", "positive_strong", "positive_moderate"):
+        if any(re.search(rule, lower) for rule in hook.MATCHER.categories[name]):
+            hits.add(name)
+    return hits
+
+
+def best_of(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    names = [detector.name for detector in hook.DETECTORS]
+    print(f"{'user turns':>10} {'per-rule ms':>12} {'combined ms':>12} {'speedup':>8} {'extract ms':>11}"
+          + "".join(f" {name + ' ms':>13}" for name in names))
+    for size in (int(s) for s in args.sizes.split(",")):
+        entries = transcript(size)
+        texts = [text for text in map(hook._user_text, entries) if text]
+        for text in texts[:len(MESSAGES) * 4]:
+            if per_rule(text) != set(hook.MATCHER.classify(text)):
+                print(f"classifiers disagree on: {text!r}", file=sys.stderr)
+                sys.exit(1)
+        old = best_of(lambda: [per_rule(t) for t in texts], args.runs)
+        new = best_of(lambda: [hook.MATCHER.classify(t) for t in texts], args.runs)
+        timings = {}
+        extract = best_of(lambda: hook.extract_signals_from_transcript(iter(entries), "bench", timings=timings),
+                          args.runs)
+        print(f"{size:>10} {old:>12.1f} {new:>12.1f} {old / new:>7.1f}x {extract:>11.1f}"
+              + "".join(f" {timings[name] * 1000 / args.runs:>13.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Startup-time budget for the hooks and the memory_store CLI.
+
+Runs every hook from hooks.json and the latency-sensitive CLI subcommands as
+fresh processes against fixture stdin payloads and a seeded store. Reports the
+median wall time above bare interpreter startup (`python3 -c pass`), checks the
+modules each Python case imports (python -X importtime), and exits 1 when a
+case goes over its budget or imports something it should not.
+
+Usage: python3 bench_hooks.py [--runs 7] [--scale 1.0] [--importtime]
+  --scale      multiply every budget (slow CI machines)
+  --importtime also print each case's slowest top-level imports
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from memory_store import MemoryStore
+
+HOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_SIGNALS = 500
+
+# Modules the fast paths must not pull in
+HEAVY = ("argparse", "socket", "sqlite3", "subprocess")
+
+
+def _transcript(path, turns=200):
+    with open(path, "w") as f:
+        for i in range(turns):
+            f.write(json.dumps({"role": "assistant", "content": f"Running step {i} with npm install now.",
+                                "tool_use": {"name": "Bash", "input": {"command": "npm test"}}}) + "\n")
+            user = ("No, use pnpm instead of npm in this project" if i % 20 == 0
+                    else f"ok, continue with step {i}")
+            f.write(json.dumps({"role": "user", "content": user}) + "\n")
+
+
+def _session(fixture_dir):
+    """Stdin factory for the transcript hooks: each run gets a new session and a new transcript.
+
+    Reusing one would time only the early exit of PreCompact (already captured)
+    and an empty tail for SessionEnd after the first run.
+    """
+    runs = itertools.count()
+
+    def payload():
+        session_id = f"bench-{next(runs)}"
+        transcript = os.path.join(fixture_dir, f"{session_id}.jsonl")
+        _transcript(transcript)
+        return json.dumps({"session_id": session_id, "transcript_path": transcript})
+    return payload
+
+
+def _stdin(stdin):
+    """The payload for one run: `stdin` itself, or a fresh one from a factory."""
+    return stdin() if callable(stdin) else stdin
+
+
+def cases(fixture_dir, entry_id):
+    """Benchmark cases: (name, argv, stdin, budget in ms above interpreter startup, forbidden imports).
+
+    stdin is a string, or a callable returning a new payload for every run.
+    """
+    py = sys.executable
+    store = os.path.join(HOOK_DIR, "memory_store.py")
+    entry = json.dumps({"type": "failure", "status": "captured", "content": "bench", "session_id": "s1"})
+    return [
+        ("PreCompact capture-signals.py", [py, os.path.join(HOOK_DIR, "capture-signals.py")],
+         _session(fixture_dir), 80, HEAVY),
+        ("PostToolUseFailure capture-failure.py", [py, os.path.join(HOOK_DIR, "capture-failure.py")],
+         json.dumps({"session_id": "bench", "tool_name": "Bash", "error": "exit 1"}), 40, HEAVY),
+        ("SessionEnd capture-session-summary.py", [py, os.path.join(HOOK_DIR, "capture-session-summary.py")],
+         _session(fixture_dir), 80, HEAVY),
+        ("SessionStart inject-signals.sh", ["bash", os.path.join(HOOK_DIR, "inject-signals.sh")],
+         json.dumps({"session_id": "s1"}), 250, ()),
+        ("memory_store.py stats --format statusline", [py, store, "stats", "--format", "statusline"],
+         "", 30, HEAVY),
+        ("memory_store.py append", [py, store, "append", entry], "", 40, HEAVY),
+        ("memory_store.py query --limit 20", [py, store, "query", "--status", "captured", "--limit", "20"],
+         "", 80, ("socket", "sqlite3", "subprocess")),
+        ("memory_store.py get", [py, store, "get", entry_id], "", 60, ("socket", "sqlite3", "subprocess")),
+    ]
+
+
+def bench_env(base_dir, cache_dir):
+    """Environment for the runs: a private store, no daemon, bytecode cached outside the tree."""
+    env = dict(os.environ, REFLECTIONS_DIR=base_dir, PYTHONPYCACHEPREFIX=cache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.pop("REFLECTIONS_DAEMON", None)
+    return env
+
+
+def wall_time(argv, stdin, env, runs):
+    samples = []
+    for _ in range(runs):
+        payload = _stdin(stdin)  # built before the clock starts
+        start = time.perf_counter()
+        subprocess.run(argv, input=payload, text=True, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def import_times(argv, stdin, env):
+    """Run once under -X importtime. Returns [(module, self_us, cumulative_us, depth)] in import order."""
+    result = subprocess.run([argv[0], "-X", "importtime"] + argv[1:], input=_stdin(stdin), text=True,
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def imported_modules(argv, stdin, env):
+    return {name for name, _, _, _ in import_times(argv, stdin, env)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--importtime", action="store_true")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench-hooks-")
+    try:
+        base_dir = os.path.join(work, "store")
+        cache_dir = os.path.join(work, "pycache")
+        seeded = MemoryStore(base_dir=base_dir).append_many(
+            {"type": "failure", "status": "captured", "confidence": 1, "source": {"hook": "bench"},
+             "content": f"seed {i}", "context": "bench", "session_id": "s1"} for i in range(SEED_SIGNALS))
+        env = bench_env(base_dir, cache_dir)
+        baseline = wall_time([sys.executable, "-c", "pass"], "", env, args.runs)
+        print(f"interpreter startup: {baseline:.1f} ms (budgets are above this)\n")
+        print(f"{'case':<44} {'ms':>7} {'budget':>7}  result")
+
+        failed = False
+        for name, argv, stdin, budget, forbidden in cases(work, seeded[0]["id"]):
+            wall_time(argv, stdin, env, 1)  # warm bytecode and page caches
+            overhead = wall_time(argv, stdin, env, args.runs) - baseline
+            limit = budget * args.scale
+            problems = []
+            if overhead > limit:
+                problems.append("over budget")
+            imports = import_times(argv, stdin, env) if argv[0] == sys.executable else []
+            heavy = sorted({name for name, _, _, _ in imports} & set(forbidden))
+            if heavy:
+                problems.append("imports " + ", ".join(heavy))
+            failed = failed or bool(problems)
+            print(f"{name:<44} {overhead:>7.1f} {limit:>7.0f}  {'; '.join(problems) or 'ok'}")
+            if args.importtime and imports:
+                top = sorted((r for r in imports if r[3] == 0), key=lambda r: -r[2])[:5]
+                for module, _, cumulative, _ in top:
+                    print(f"    {module:<40} {cumulative / 1000:>7.1f}")
+        sys.exit(1 if failed else 0)
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
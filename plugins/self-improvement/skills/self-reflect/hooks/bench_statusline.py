@@ -0,0 +1,69 @@
+"""
+Benchmark the status line command against stores of increasing size.
+
+Builds a throwaway store per size, then times `memory_store.py stats --format
+statusline` as a fresh process (what the status bar actually runs) and, for
+comparison, a full recount of the same store.
+
+Usage: python3 bench_statusline.py [--sizes 100,1000,10000,100000,1000000] [--runs 5]
+Set REFLECTIONS_BACKEND=sqlite to benchmark the SQLite store instead.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from memory_store import open_store
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_store.py")
+STATUSES = ("captured", "analyzed", "promoted", "rejected")
+TYPES = ("failure", "correction", "convention", "command")
+
+
+def build_store(base_dir, size, chunk=10000):
+    store = open_store(base_dir=base_dir)
+    for start in range(0, size, chunk):
+        store.append_many([{"type": TYPES[i % len(TYPES)], "status": STATUSES[i % len(STATUSES)],
+                            "confidence": 1, "source": {"hook": "bench"}, "content": f"signal {i}",
+                            "context": "bench", "session_id": f"s{i % 50}"}
+                           for i in range(start, min(start + chunk, size))])
+    return store
+
+
+def time_statusline(base_dir, runs):
+    env = dict(os.environ, REFLECTIONS_DIR=base_dir)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SCRIPT, "stats", "--format", "statusline"],
+                       env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'signals':>10}  {'statusline (ms)':>16}  {'full recount (ms)':>18}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        base_dir = tempfile.mkdtemp(prefix="bench-statusline-")
+        try:
+            store = build_store(base_dir, size)
+            fast = time_statusline(base_dir, args.runs)
+            start = time.perf_counter()
+            store.stats(recount=True)
+            full = time.perf_counter() - start
+            print(f"{size:>10}  {fast * 1000:>16.1f}  {full * 1000:>18.1f}")
+        finally:
+            shutil.rmtree(base_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark reading the tail of large transcripts.
+
+Generates transcript fixtures of the given sizes (mostly large tool results,
+like real sessions) and times, in a fresh process each, reading the last 200
+entries for capture-signals.py with:
+  full-read   the previous approach: json.loads every line, keep the last 200
+  tail        capture_signals.read_transcript (transcript_io.tail_lines)
+and summarising the whole file for capture-session-summary.py with:
+  decode-all  json.loads every line
+  stand-in    the digest's byte-level pre-filter, decoding only tool names and inputs
+reporting median wall time and peak RSS. Each pair must produce the same
+result; the run exits 1 if it does not.
+
+Fixtures are written to --dir (a temporary directory by default) and reused
+when a file of the right size is already there.
+
+Usage: python3 bench_transcript.py [--sizes 10,100,1000] [--runs 3] [--dir DIR]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+MB = 1024 * 1024
+
+
+def fixture(path, size_mb):
+    """Write a transcript of about `size_mb` MB: turns with a 20-60 KB tool result each."""
+    if os.path.exists(path) and os.path.getsize(path) >= size_mb * MB:
+        return
+    with open(path, "w") as f:
+        written, turn = 0, 0
+        while written < size_mb * MB:
+            lines = [
+                {"role": "user", "content": f"Please check step {turn} again"},
+                {"role": "assistant", "content": f"Running the tests for step {turn}.",
+                 "tool_use": {"name": "Bash", "input": {"command": "npm test"},
+                              "result": f"PASS test_{turn}.js\n" * (1000 + (turn * 977) % 2000)}},
+                {"role": "assistant", "tool_use": {"name": "Read", "input": {"file_path": f"src/step_{turn % 50}.py"},
+                                                   "result": "    return value\n" * 500}},
+                {"role": "user", "content": [{"type": "tool_result", "content": "PASS\n" * 200}]},
+            ]
+            chunk = "".join(json.dumps(line) + "\n" for line in lines)
+            f.write(chunk)
+            written += len(chunk)
+            turn += 1
+
+
+def full_read(path, max_turns=200):
+    """read_transcript before the tail reader: parse every line, keep the last max_turns."""
+    entries = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries[-max_turns:]
+
+
+def measure(method, path):
+    """Run one read in this process; print wall ms, peak RSS in KB and an entries digest."""
+    sys.path.insert(0, HOOK_DIR)
+    from capture_signals import read_transcript
+    from session_digest import extract_summary, stand_in
+    from transcript_io import parse_lines
+
+    def summarise(pre_filter):
+        with open(path, "rb") as f:
+            return extract_summary(parse_lines(f, pre_filter))
+
+    reader = {"full-read": full_read, "tail": read_transcript,
+              "decode-all": lambda _: summarise(None),
+              "stand-in": lambda _: summarise(stand_in)}[method]
+    start = time.perf_counter()
+    entries = reader(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"ms": elapsed, "rss_kb": peak, "digest": hash(json.dumps(entries, sort_keys=True))}))
+
+
+def run(method, path, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, __file__, "--measure", method, path],
+                             capture_output=True, text=True, check=True,
+                             env=dict(os.environ, PYTHONHASHSEED="0"))
+        samples.append(json.loads(out.stdout))
+    return (statistics.median(s["ms"] for s in samples),
+            max(s["rss_kb"] for s in samples) / 1024,
+            samples[0]["digest"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="fixture sizes in MB")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", help="where to keep the fixtures (default: a temporary directory)")
+    parser.add_argument("--measure", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    fixture_dir = args.dir or tempfile.mkdtemp(prefix="bench-transcript-")
+    os.makedirs(fixture_dir, exist_ok=True)
+    try:
+        sizes = [int(s) for s in args.sizes.split(",")]
+        for old, new in (("full-read", "tail"), ("decode-all", "stand-in")):
+            print(f"{'size MB':>8} {old + ' ms':>14} {old + ' RSS MB':>18} {new + ' ms':>12} {new + ' RSS MB':>16}")
+            for size in sizes:
+                path = os.path.join(fixture_dir, f"transcript-{size}mb.jsonl")
+                fixture(path, size)
+                old_ms, old_rss, old_digest = run(old, path, args.runs)
+                new_ms, new_rss, new_digest = run(new, path, args.runs)
+                if old_digest != new_digest:
+                    print(f"{old} and {new} disagree on {path}", file=sys.stderr)
+                    sys.exit(1)
+                print(f"{size:>8} {old_ms:>14.1f} {old_rss:>18.1f} {new_ms:>12.1f} {new_rss:>16.1f}")
+            print()
+    finally:
+        if not args.dir:
+            shutil.rmtree(fixture_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+capture-failure.py — PostToolUseFailure hook for self-improvement v3.
+Records a failed tool call as a failure signal in the signal store.
+
+Hook type: command (async)
+Timeout: 5 seconds
+Stdin: JSON with session_id, tool_name, error
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from memory_store import connect_store
+
+
+def build_failure_signal(hook_input):
+    """Build the failure signal for a hook payload, or None if it carries nothing useful."""
+    tool_name = hook_input.get("tool_name") or "unknown"
+    error = hook_input.get("error") or ""
+    if not isinstance(error, str):
+        error = json.dumps(error)
+    if not error and tool_name == "unknown":
+        return None
+    return {
+        "type": "failure",
+        "status": "captured",
+        "confidence": 1,
+        "source": {"hook": "PostToolUseFailure"},
+        "content": f"{tool_name} failed: {error[:100]}",
+        "context": error[:200],
+        "session_id": hook_input.get("session_id", ""),
+        "category": "",
+        "tags": [tool_name],
+    }
+
+
+def main():
+    try:
+        hook_input = json.load(sys.stdin)
+    except (json.JSONDecodeError, EOFError):
+        sys.exit(0)
+    if not isinstance(hook_input, dict):
+        sys.exit(0)
+
+    signal = build_failure_signal(hook_input)
+    if signal is None:
+        sys.exit(0)
+
+    # Like the shell hook before it, never fail the tool call over a store problem
+    try:
+        store = connect_store(base_dir=os.environ.get("REFLECTIONS_DIR"))
+        store.append(signal)
+    except Exception as e:  # OSError, DaemonError, socket timeouts, sqlite3 errors
+        print(f"capture-failure: signal not recorded: {type(e).__name__}: {e}", file=sys.stderr)
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,23 @@
 """
 capture-signals.py — PreCompact hook for self-improvement v3.
 Reads the transcript JSONL and extracts learning signal candidates
-using keyword heuristics. Writes to signals.jsonl via memory_store.
+using keyword heuristics. Writes to the signal store via memory_store.
+
+PreCompact fires on every compaction of a long session, so the hook keeps a
+per-session checkpoint (see session_state.py): the byte offset and entry index
+it stopped at, plus the small state its detectors carry across that boundary
+(an open run of failures, the empty-search count, recent assistant actions).
+Each run only parses and scans the lines appended since the last one, and of
+those only the last 200, read backwards from the end of the file
+(transcript_io.py), so tool output earlier in the transcript is never loaded.
+
+Signals come from detectors (see Detector): small state machines registered
+with @register_detector. The transcript is streamed from disk once, and every
+detector sees each entry as it is decoded; adding a detector does not add a
+pass. The time spent in each detector is summed per session in the checkpoint.
+
+Each run also folds the new lines into the session digest (session_digest.py)
+that capture-session-summary.py builds its summary from at SessionEnd.
 
 Hook type: command (synchronous)
 Timeout: 30 seconds
@@ -13,10 +29,16 @@ import json
 import os
 import re
 import sys
+import time
 
 # Import memory_store from same directory
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from memory_store import MemoryStore
+from memory_store import DEFAULT_BASE_DIR, connect_store
+from session_digest import update_digest
+from session_state import load_session_state, save_session_state
+from signal_matcher import RuleMatcher
+from transcript_io import (HEAD_BYTES, count_lines, decode_at, iter_entries, iter_lines, key_offsets,
+                           key_pattern, line_role, parse_lines, tail_lines, tail_span)
 
 
 # --- Heuristic keyword sets ---
@@ -31,9 +53,7 @@ CORRECTION_KEYWORDS = [
     r"that's outdated", r"that changed", r"not anymore", r"\bdeprecated\b",
 ]
 
-WORKFLOW_CORRECTION_PATTERN = re.compile(
-    r"use\s+(\w+)\s+instead\s+of\s+(\w+)", re.IGNORECASE
-)
+WORKFLOW_CORRECTION_PATTERN = r"use\s+(\w+)\s+instead\s+of\s+(\w+)"
 
 CONVENTION_KEYWORDS = [
     r"always use\b", r"never use\b", r"we prefer\b",
@@ -57,105 +77,128 @@ POSITIVE_MODERATE = [
     r"well done", r"much better",
 ]
 
-COMMAND_PATTERN = re.compile(r"`([^`]+)`")
-
-
-def _matches_any(text, patterns):
-    """Check if text matches any regex pattern (case-insensitive)."""
-    text_lower = text.lower()
-    for pattern in patterns:
-        if re.search(pattern, text_lower):
-            return True
-    return False
-
-
-def _extract_user_messages(transcript):
-    """Extract (index, message_text) pairs for user messages from transcript entries."""
-    messages = []
-    for i, entry in enumerate(transcript):
-        role = entry.get("role", "")
-        if role == "user":
-            content = entry.get("content", "")
-            if isinstance(content, list):
-                # Handle structured content blocks
-                text_parts = [b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"]
-                content = " ".join(text_parts)
-            if content:
-                messages.append((i, content))
-    return messages
-
-
-def _is_after_assistant_action(transcript, user_index):
-    """Check if the user message at user_index follows a substantive assistant action."""
-    for j in range(user_index - 1, max(user_index - 5, -1), -1):
-        if j < 0:
-            break
-        entry = transcript[j]
-        if entry.get("role") == "assistant":
-            # Check for tool use or substantial content
-            if entry.get("tool_use") or len(entry.get("content", "")) > 20:
-                return True
-    return False
-
-
-def _detect_repeated_failures(transcript):
-    """Detect same tool failing 2+ times consecutively."""
-    failures = []
-    consecutive = []
-    for entry in transcript:
-        tool = entry.get("tool_use", {})
-        if isinstance(tool, dict) and tool.get("error"):
-            name = tool.get("name", "unknown")
-            if consecutive and consecutive[-1]["name"] == name:
-                consecutive.append({"name": name, "error": tool["error"]})
-            else:
-                if len(consecutive) >= 2:
-                    failures.append(consecutive)
-                consecutive = [{"name": name, "error": tool["error"]}]
-        else:
-            if len(consecutive) >= 2:
-                failures.append(consecutive)
-            consecutive = []
-    if len(consecutive) >= 2:
-        failures.append(consecutive)
-    return failures
-
-
-def _detect_search_thrashing(transcript):
-    """Detect 3+ Glob/Grep with empty results before finding target."""
-    empty_searches = 0
-    for entry in transcript:
-        tool = entry.get("tool_use", {})
-        if isinstance(tool, dict):
-            name = tool.get("name", "")
-            if name in ("Glob", "Grep"):
-                result = tool.get("result", "")
-                if not result or result.strip() == "[]" or "No matches" in str(result):
-                    empty_searches += 1
-                else:
-                    if empty_searches >= 3:
-                        return True
-                    empty_searches = 0
-            else:
-                if empty_searches >= 3:
-                    return True
-                empty_searches = 0
-    return empty_searches >= 3
-
-
-def extract_signals_from_transcript(transcript, session_id):
-    """Main extraction function. Returns list of signal dicts (without id/timestamp — memory_store adds those)."""
-    signals = []
-    user_messages = _extract_user_messages(transcript)
-
-    for idx, (i, text) in enumerate(user_messages):
-        turn = i
+COMMAND_PATTERN = r"`([^`]+)`"
+
+# One combined, case-insensitive pattern per category, compiled on first use
+MATCHER = RuleMatcher({
+    "correction": CORRECTION_KEYWORDS,
+    "workflow": [WORKFLOW_CORRECTION_PATTERN],
+    "convention": CONVENTION_KEYWORDS,
+    "run": [r"\brun\b"],
+    "positive_strong": POSITIVE_STRONG,
+    "positive_moderate": POSITIVE_MODERATE,
+})
+
+# Keys the detectors read from a line, found in its bytes before deciding to decode it
+DETECTOR_KEYS = key_pattern("tool_use", "error", "name")
+# A user entry whose content is a list of blocks: a tool result unless one is text
+USER_BLOCKS = re.compile(rb'"role":\s*"user",\s*"content":\s*\[')
+TEXT_BLOCK = re.compile(rb'"type":\s*"text"')
+SEARCH_TOOLS = ("Glob", "Grep")
+
+
+def _stand_in(line):
+    """What the detectors need from a transcript line, or None to decode it in full.
+
+    Tool calls that neither failed nor searched and tool results without text
+    are most of a transcript, and the detectors only need their role and the tool
+    name: those lines are never decoded.
+    """
+    role = line_role(line)
+    if role is None:
+        return None
+    keys = key_offsets(line, DETECTOR_KEYS)
+    if "error" in keys:
+        return None
+    if role == "user":
+        if "tool_use" not in keys and USER_BLOCKS.search(line, 0, HEAD_BYTES) and not TEXT_BLOCK.search(line):
+            return {"role": role}
+        return None
+    if role == "assistant" and len(keys.get("tool_use", ())) == 1 and len(keys.get("name", ())) == 1:
+        try:
+            name = decode_at(line, keys["name"][0])
+        except ValueError:
+            return None
+        if isinstance(name, str) and name not in SEARCH_TOOLS:
+            return {"role": role, "tool_use": {"name": name}}
+    return None
+
+
+def _user_text(entry):
+    """The text of a user message, or "" for any other entry."""
+    if entry.get("role", "") != "user":
+        return ""
+    content = entry.get("content", "")
+    if isinstance(content, list):
+        # Handle structured content blocks
+        text_parts = [b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"]
+        content = " ".join(text_parts)
+    return content
+
+
+def _is_assistant_action(entry):
+    """Is this a substantive assistant action (tool use or real content)?"""
+    return entry.get("role") == "assistant" and bool(entry.get("tool_use") or len(entry.get("content", "")) > 20)
+
+
+# --- Detectors ---
+
+class Detector:
+    """A small state machine fed one transcript entry at a time.
+
+    `name` keys the detector's section of the carried detector state, which must
+    be JSON-serialisable: it is checkpointed between hook runs. feed() sees every
+    entry in order and finish() runs at the end of each chunk; both return a list
+    of signals.
+    """
+    name = ""
+
+    def initial_state(self):
+        return {}
+
+    def after_gap(self, state):
+        """State to continue with when entries between two runs were skipped."""
+        return self.initial_state()
+
+    def feed(self, entry, turn, state, session_id):
+        return []
+
+    def finish(self, state, session_id):
+        return []
+
+
+DETECTORS = []
+
+
+def register_detector(cls):
+    """Class decorator adding a Detector to the single pass over the transcript."""
+    DETECTORS.append(cls())
+    return cls
+
+
+@register_detector
+class KeywordDetector(Detector):
+    """Corrections, conventions, commands and positive reinforcement in user messages."""
+    name = "keywords"
+
+    def initial_state(self):
+        return {"since_action": 4}  # entries since the last assistant action, capped at 4
+
+    def feed(self, entry, turn, state, session_id):
+        text = _user_text(entry)
+        signals = self._classify(text, turn, state["since_action"] < 4, session_id) if text else []
+        state["since_action"] = 0 if _is_assistant_action(entry) else min(state["since_action"] + 1, 4)
+        return signals
+
+    def _classify(self, text, turn, after_action, session_id):
+        signals = []
+        hits = MATCHER.classify(text)
 
         # --- Corrections ---
-        if _matches_any(text, CORRECTION_KEYWORDS):
+        if "correction" in hits:
             confidence = 2
             # Check for workflow correction (higher confidence)
-            if WORKFLOW_CORRECTION_PATTERN.search(text):
+            if "workflow" in hits:
                 confidence = 3
             signals.append({
                 "type": "correction",
@@ -165,10 +208,11 @@ def extract_signals_from_transcript(transcript, session_id):
                 "content": text[:200],
                 "context": text[:500],
                 "session_id": session_id,
+                "meta": {"rules": hits["correction"] + hits.get("workflow", [])},
             })
 
         # --- Conventions ---
-        if _matches_any(text, CONVENTION_KEYWORDS):
+        if "convention" in hits:
             signals.append({
                 "type": "convention",
                 "status": "captured",
@@ -177,11 +221,12 @@ def extract_signals_from_transcript(transcript, session_id):
                 "content": text[:200],
                 "context": text[:500],
                 "session_id": session_id,
+                "meta": {"rules": hits["convention"]},
             })
 
         # --- Commands ---
-        commands_found = COMMAND_PATTERN.findall(text)
-        if commands_found and re.search(r"\brun\b", text, re.IGNORECASE):
+        commands_found = re.findall(COMMAND_PATTERN, text) if "run" in hits else []
+        if commands_found:
             for cmd in commands_found[:3]:  # Max 3 commands per message
                 signals.append({
                     "type": "command",
@@ -194,18 +239,9 @@ def extract_signals_from_transcript(transcript, session_id):
                 })
 
         # --- Positive reinforcement (only after assistant action) ---
-        if _is_after_assistant_action(transcript, i):
-            if _matches_any(text, POSITIVE_STRONG):
-                signals.append({
-                    "type": "pattern",
-                    "status": "captured",
-                    "confidence": 1,
-                    "source": {"hook": "PreCompact", "turn": turn},
-                    "content": f"Positive reinforcement: {text[:150]}",
-                    "context": text[:500],
-                    "session_id": session_id,
-                })
-            elif _matches_any(text, POSITIVE_MODERATE):
+        if after_action:
+            positive = hits.get("positive_strong") or hits.get("positive_moderate")
+            if positive:
                 signals.append({
                     "type": "pattern",
                     "status": "captured",
@@ -214,54 +250,154 @@ def extract_signals_from_transcript(transcript, session_id):
                     "content": f"Positive reinforcement: {text[:150]}",
                     "context": text[:500],
                     "session_id": session_id,
+                    "meta": {"rules": positive},
                 })
+        return signals
 
-    # --- Repeated failures ---
-    for failure_group in _detect_repeated_failures(transcript):
-        name = failure_group[0]["name"]
-        count = len(failure_group)
-        error = failure_group[0].get("error", "")[:200]
-        signals.append({
+
+@register_detector
+class RepeatedFailureDetector(Detector):
+    """The same tool failing 2+ times consecutively.
+
+    A run still open at the end of a chunk is reported then (the hook may not run
+    again) and marked reported, so it is not reported a second time when it ends later.
+    """
+    name = "failures"
+
+    def initial_state(self):
+        return {"run": None, "reported": False}  # run: {"name", "error", "count"}
+
+    def feed(self, entry, turn, state, session_id):
+        run = state["run"]
+        tool = entry.get("tool_use", {})
+        if isinstance(tool, dict) and tool.get("error"):
+            name = tool.get("name", "unknown")
+            if run and run["name"] == name:
+                run["count"] += 1
+                return []
+            new_run = {"name": name, "error": tool["error"], "count": 1}
+        else:
+            new_run = None
+        signals = self.finish(state, session_id)
+        state["run"], state["reported"] = new_run, False
+        return signals
+
+    def finish(self, state, session_id):
+        run = state["run"]
+        if not run or run["count"] < 2 or state["reported"]:
+            return []
+        state["reported"] = True
+        error = run["error"][:200]
+        return [{
             "type": "failure",
             "status": "captured",
             "confidence": 2,
             "source": {"hook": "PreCompact"},
-            "content": f"{name} failed {count} times consecutively: {error[:100]}",
+            "content": f"{run['name']} failed {run['count']} times consecutively: {error[:100]}",
             "context": error,
             "session_id": session_id,
-            "tags": [name],
-        })
+            "tags": [run["name"]],
+        }]
 
-    # --- Search thrashing ---
-    if _detect_search_thrashing(transcript):
-        signals.append({
-            "type": "project_friction",
-            "status": "captured",
-            "confidence": 1,
-            "source": {"hook": "PreCompact"},
-            "content": "Multiple search attempts before finding target — possible structural confusion",
-            "context": "3+ Glob/Grep calls with empty results before locating the file",
-            "session_id": session_id,
-        })
 
-    return signals
+@register_detector
+class SearchThrashingDetector(Detector):
+    """3+ Glob/Grep with empty results in a row. Reported once per session."""
+    name = "thrashing"
+
+    def initial_state(self):
+        return {"empty_searches": 0, "reported": False}
+
+    def after_gap(self, state):
+        return {**self.initial_state(), "reported": state["reported"]}
+
+    def feed(self, entry, turn, state, session_id):
+        tool = entry.get("tool_use", {})
+        if isinstance(tool, dict) and tool.get("name", "") in SEARCH_TOOLS:
+            result = tool.get("result", "")
+            if not result or result.strip() == "[]" or "No matches" in str(result):
+                state["empty_searches"] += 1
+                if state["empty_searches"] >= 3 and not state["reported"]:
+                    state["reported"] = True
+                    return [{
+                        "type": "project_friction",
+                        "status": "captured",
+                        "confidence": 1,
+                        "source": {"hook": "PreCompact"},
+                        "content": "Multiple search attempts before finding target — possible structural confusion",
+                        "context": "3+ Glob/Grep calls with empty results before locating the file",
+                        "session_id": session_id,
+                    }]
+                return []
+        state["empty_searches"] = 0
+        return []
+
+
+def _new_detector_state(saved=None):
+    """Detector state carried from one run to the next: a fresh transcript starts here.
+
+    Sections of `saved` are kept, so a checkpoint written before a detector was
+    registered gains that detector's initial state.
+    """
+    saved = saved or {}
+    state = {"turn": saved.get("turn", 0)}  # index of the next entry in the whole transcript
+    for detector in DETECTORS:
+        state[detector.name] = saved.get(detector.name) or detector.initial_state()
+    return state
+
+
+def extract_signals_from_transcript(transcript, session_id, state=None, timings=None):
+    """Main extraction function. Returns list of signal dicts (without id/timestamp — memory_store adds those).
+
+    `transcript` is any iterable of entries, consumed once: every registered
+    detector sees each entry as it comes. `state` is the detector state from the
+    previous run over the same transcript (see _new_detector_state); it is updated
+    in place so the next run continues after these entries. Seconds spent in each
+    detector are added to `timings` ({detector name: seconds}) when given.
+    """
+    if state is None:
+        state = _new_detector_state()
+    found = {detector.name: [] for detector in DETECTORS}
+    spent = dict.fromkeys(found, 0.0)
+    clock = time.perf_counter
+    turn = state["turn"]
+    for entry in transcript:
+        for detector in DETECTORS:
+            start = clock()
+            found[detector.name] += detector.feed(entry, turn, state[detector.name], session_id)
+            spent[detector.name] += clock() - start
+        turn += 1
+    for detector in DETECTORS:
+        start = clock()
+        found[detector.name] += detector.finish(state[detector.name], session_id)
+        spent[detector.name] += clock() - start
+    state["turn"] = turn
+
+    if timings is not None:
+        for name, seconds in spent.items():
+            timings[name] = timings.get(name, 0.0) + seconds
+    # Grouped by detector, in registration order
+    return [signal for signals in found.values() for signal in signals]
 
 
 def read_transcript(path, max_turns=200):
     """Read transcript JSONL file, returning last max_turns entries."""
-    entries = []
     if not os.path.exists(path):
-        return entries
-    with open(path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    return entries[-max_turns:]
+        return []
+    return parse_lines(tail_lines(path, max_turns)[0])
+
+
+def read_transcript_from(path, offset=0, max_turns=200, stand_in=None):
+    """Stream the transcript entries after byte `offset`, keeping the last max_turns.
+
+    Returns (entries, end_offset, dropped): entries is a generator that reads and
+    decodes one line at a time from disk, end_offset is where the next run should
+    resume (a trailing line still being written is left for it) and dropped is how
+    many earlier new lines max_turns cut off. `stand_in` is passed to iter_entries().
+    """
+    first_offset, end_offset = tail_span(path, max_turns, offset)
+    dropped = count_lines(path, offset, first_offset)
+    return iter_entries(iter_lines(path, first_offset, end_offset), stand_in), end_offset, dropped
 
 
 def main():
@@ -277,17 +413,42 @@ def main():
     if not transcript_path or not session_id:
         sys.exit(0)
 
-    transcript = read_transcript(transcript_path)
-    if not transcript:
+    if not os.path.exists(transcript_path):
         sys.exit(0)
 
-    signals = extract_signals_from_transcript(transcript, session_id)
-    if not signals:
+    base_dir = os.environ.get("REFLECTIONS_DIR") or DEFAULT_BASE_DIR
+    session_state = load_session_state(base_dir, session_id)
+    # Keep the session digest current, so SessionEnd only reads what follows
+    digest_offset = session_state.get("summary", {}).get("offset")
+    update_digest(session_state, transcript_path)
+    checkpoint = session_state.get("signals")
+    # Start over for a new or rewritten transcript
+    if not checkpoint or checkpoint.get("path") != transcript_path \
+            or checkpoint.get("offset", 0) > os.path.getsize(transcript_path):
+        checkpoint = {"path": transcript_path, "offset": 0, "detectors": {}}
+
+    transcript, offset, dropped = read_transcript_from(transcript_path, checkpoint["offset"], stand_in=_stand_in)
+    if offset == checkpoint["offset"]:
+        if session_state["summary"]["offset"] != digest_offset:
+            save_session_state(base_dir, session_id, session_state)
         sys.exit(0)
-
-    store = MemoryStore()
-    for signal in signals:
-        store.append(signal)
+    detectors = _new_detector_state(checkpoint["detectors"])
+    if dropped:
+        # Nothing carries over the entries that were skipped
+        detectors["turn"] += dropped
+        for detector in DETECTORS:
+            detectors[detector.name] = detector.after_gap(detectors[detector.name])
+
+    timings = checkpoint.get("timings", {})
+    signals = extract_signals_from_transcript(transcript, session_id, detectors, timings)
+    if signals:
+        store = connect_store(base_dir=base_dir)
+        store.append_many(signals)
+
+    # Only after the signals are stored, so a failed run is retried from the same point
+    session_state["signals"] = {"path": transcript_path, "offset": offset, "detectors": detectors,
+                                "timings": timings}
+    save_session_state(base_dir, session_id, session_state)
 
     sys.exit(0)
 
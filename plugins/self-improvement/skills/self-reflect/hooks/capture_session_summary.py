@@ -0,0 +1,16 @@
+"""
+capture_session_summary.py — Importable module wrapper for capture-session-summary.py.
+Python cannot import modules with hyphens, so this re-exports the public API
+from the hook file (capture-session-summary.py) to make it testable.
+"""
+import importlib.util
+import os
+
+# Import the hyphenated module using importlib
+_hook_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capture-session-summary.py")
+_spec = importlib.util.spec_from_file_location("capture_session_summary_hook", _hook_path)
+_mod = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_mod)
+
+# Re-export public API
+build_summary_signal = _mod.build_summary_signal
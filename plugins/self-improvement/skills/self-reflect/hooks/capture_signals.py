@@ -3,7 +3,7 @@ capture_signals.py — Importable module wrapper for capture-signals.py.
 Python cannot import modules with hyphens, so this re-exports the public API
 from the hook file (capture-signals.py) to make it testable.
 """
-import importlib
+import importlib.util
 import os
 import sys
 
@@ -16,3 +16,5 @@ _spec.loader.exec_module(_mod)
 # Re-export public API
 extract_signals_from_transcript = _mod.extract_signals_from_transcript
 read_transcript = _mod.read_transcript
+read_transcript_from = _mod.read_transcript_from
+stand_in = _mod._stand_in
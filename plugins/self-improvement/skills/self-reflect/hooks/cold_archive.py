@@ -0,0 +1,106 @@
+"""
+Cold archive for pruned signals, shared by the JSONL and SQLite stores.
+
+archive() and the 14-day prune move old signals here instead of deleting
+them, so recurrence across sessions can still be looked up later. The archive
+is one gzip file per day in archive/ (archive/2026-02-11.jsonl.gz, named after
+the SIG id date like the hot segments), plus index.json with each file's
+timestamp range and entry count. Files are append-only: every archive run adds
+a new gzip member, which gzip readers decompress as one stream.
+
+Files are only opened when a query with include_archive reaches them, and
+files whose range ends before `since` are skipped without being opened.
+"""
+import gzip
+import json
+import os
+import zlib
+
+from signal_store import _day_name
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_INDEX = "index.json"
+
+
+class ColdArchive:
+    def __init__(self, store):
+        self.store = store
+        self.dir = os.path.join(store.base_dir, ARCHIVE_DIR)
+        self.index_path = os.path.join(self.dir, ARCHIVE_INDEX)
+
+    def _path(self, name):
+        return os.path.join(self.dir, f"{name}.jsonl.gz")
+
+    def _index(self):
+        """Return {name: {"min_ts", "max_ts", "count"}}, rebuilt from the files if missing."""
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            if isinstance(index, dict):
+                return index
+        except (OSError, ValueError):
+            pass
+        # Missing or corrupt index: rebuild it from the files (one full read)
+        if not os.path.isdir(self.dir):
+            return {}
+        index = {}
+        for filename in sorted(os.listdir(self.dir)):
+            if filename.endswith(".jsonl.gz"):
+                name = filename[:-len(".jsonl.gz")]
+                entries = self._read(name)
+                timestamps = [e.get("timestamp") or "" for e in entries] or [""]
+                index[name] = {"min_ts": min(timestamps), "max_ts": max(timestamps),
+                               "count": len(entries)}
+        return index
+
+    def add(self, entries):
+        """Append `entries` to their day files. Caller holds the store's write lock."""
+        if not entries:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        by_name = {}
+        for e in entries:
+            by_name.setdefault(_day_name(e), []).append(e)
+        index = self._index()
+        for name, group in by_name.items():
+            data = "".join(json.dumps(e) + "\n" for e in group)
+            with open(self._path(name), "ab") as f:
+                f.write(gzip.compress(data.encode()))
+                f.flush()
+                os.fsync(f.fileno())
+            timestamps = [e.get("timestamp") or "" for e in group]
+            bounds = index.setdefault(name, {"min_ts": min(timestamps), "max_ts": max(timestamps), "count": 0})
+            bounds["min_ts"] = min(bounds["min_ts"], *timestamps)
+            bounds["max_ts"] = max(bounds["max_ts"], *timestamps)
+            bounds["count"] += len(group)
+        self.store._atomic_write(self.index_path, json.dumps(dict(sorted(index.items()))))
+
+    def _read(self, name):
+        """Entries of one day file in archive order, each id once. Stops at a truncated tail."""
+        seen = set()
+        entries = []
+        try:
+            with gzip.open(self._path(name), "rt") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue
+                    if e.get("id") not in seen:
+                        seen.add(e.get("id"))
+                        entries.append(e)
+        except (OSError, EOFError, zlib.error):
+            pass
+        return entries
+
+    def iter_entries(self, since=None, newest_first=False):
+        """Yield archived entries day by day, decompressing each file only when reached."""
+        names = [name for name, bounds in sorted(self._index().items())
+                 if not (since and bounds["max_ts"] < since)]
+        if newest_first:
+            names.reverse()
+        for name in names:
+            entries = self._read(name)
+            if newest_first:
+                entries.reverse()
+            yield from entries
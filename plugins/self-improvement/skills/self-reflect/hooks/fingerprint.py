@@ -0,0 +1,85 @@
+"""
+Content fingerprints for folding duplicate signals at capture time.
+
+Every signal carries an exact hash of its normalized content (lowercased,
+punctuation and extra whitespace dropped) and a 64-bit SimHash of its words
+and word pairs (the pairs keep "use npm, not pnpm" apart from its reverse).
+Equal exact hashes mean the same text; SimHashes at most NEAR_DISTANCE bits
+apart mean a near-duplicate. The SimHash is cut into BANDS 16-bit bands, and
+two fingerprints within NEAR_DISTANCE bits share at least one band, so a store
+only compares a new signal against entries filed under one of its index_keys(),
+never against every entry.
+
+Hashes are built on zlib.crc32 instead of hashlib, which would add OpenSSL's
+import time to every append.
+"""
+import re
+import zlib
+
+BANDS = 4
+NEAR_DISTANCE = 3
+MIN_NEAR_TOKENS = 4  # shorter texts only fold on an exact match
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text):
+    return _WORD.findall(text.lower())
+
+
+def _hash64(data):
+    return zlib.crc32(b"\x00" + data) << 32 | zlib.crc32(b"\x01" + data[::-1])
+
+
+# _spread()[k][byte] has bit i of `byte` (bit 8k + i of a hash) at bit 32 * (8k + i).
+# Summing them over every feature's hash bytes counts, per bit position, how
+# many features have that bit set: one 32-bit field per position in a single int.
+_FIELD = 32
+_SPREAD = []
+
+
+def _spread():
+    if not _SPREAD:  # built on first use, off the import path of every hook
+        by_byte = [sum(1 << _FIELD * i for i in range(8) if byte >> i & 1) for byte in range(256)]
+        _SPREAD.extend([spread << _FIELD * 8 * k for spread in by_byte] for k in range(8))
+    return _SPREAD
+
+
+def _simhash(tokens):
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    tables = _spread()
+    counts = 0
+    for feature in features:
+        for table, byte in zip(tables, _hash64(feature.encode()).to_bytes(8, "little")):
+            counts += table[byte]
+    # A bit is set when more features have it set than not
+    mask = (1 << _FIELD) - 1
+    return sum(1 << bit for bit in range(64) if 2 * (counts >> _FIELD * bit & mask) > len(features))
+
+
+def fingerprint(text):
+    """{"exact", "simhash", "tokens"} for `text`, or None when there is nothing to fingerprint."""
+    if not isinstance(text, str):
+        return None
+    tokens = _tokens(text)
+    if not tokens:
+        return None
+    return {"exact": f"{_hash64(' '.join(tokens).encode()):016x}",
+            "simhash": f"{_simhash(tokens):016x}", "tokens": len(tokens)}
+
+
+def index_keys(fp):
+    """Keys to file a fingerprint under: its exact hash, plus one per SimHash band if long enough."""
+    keys = [f"x:{fp['exact']}"]
+    if fp["tokens"] >= MIN_NEAR_TOKENS:
+        keys.extend(f"b{i}:{fp['simhash'][i * 4:(i + 1) * 4]}" for i in range(BANDS))
+    return keys
+
+
+def same_content(a, b):
+    """True when fingerprints `a` and `b` are exact or near duplicates."""
+    if a["exact"] == b["exact"]:
+        return True
+    if min(a["tokens"], b["tokens"]) < MIN_NEAR_TOKENS:
+        return False
+    return bin(int(a["simhash"], 16) ^ int(b["simhash"], 16)).count("1") <= NEAR_DISTANCE
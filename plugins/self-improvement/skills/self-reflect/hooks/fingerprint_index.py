@@ -0,0 +1,145 @@
+"""
+Content-fingerprint index of the JSONL store, used to fold repeated signals.
+
+Every signal is filed under the index_keys() of its fingerprint (see
+fingerprint.py) as one line per key, ["key", id, type, simhash, tokens], in
+fingerprints/<xx>.jsonl, where xx is the first two hex digits after the key's
+prefix. Shards are append-only: an append reads only the shards of its own
+keys (at most five of 256) and adds its lines to them, so its cost does not
+follow the size of the whole index. A line carries the type and SimHash, so
+candidates of another type or too far apart are dropped without reading the
+entry; the store re-checks the rest against the entry itself, so lines of
+updated entries may linger. archive() rewrites the shards holding the entries
+it removes.
+
+A missing index is rebuilt with one scan of the store, in a temporary
+directory renamed into place, so a partly written index is never used.
+"""
+import json
+import os
+import shutil
+
+from fingerprint import fingerprint, index_keys, same_content
+
+FINGERPRINTS_DIR = "fingerprints"
+LEGACY_FILE = "fingerprints.json"  # single-file index of older versions
+
+
+def _shard(key):
+    return key.split(":", 1)[1][:2]
+
+
+def _fingerprint_of(entry):
+    return entry.get("fingerprint") or fingerprint(entry.get("content"))
+
+
+def _lines(entries):
+    """{shard: [index line, ...]} for `entries`."""
+    by_shard = {}
+    for e in entries:
+        fp = _fingerprint_of(e)
+        if not fp or not isinstance(e.get("id"), str):
+            continue
+        for key in index_keys(fp):
+            line = json.dumps([key, e["id"], e.get("type"), fp["simhash"], fp["tokens"]]) + "\n"
+            by_shard.setdefault(_shard(key), []).append(line)
+    return by_shard
+
+
+class FingerprintIndex:
+    def __init__(self, store):
+        self.store = store
+        self.dir = os.path.join(store.base_dir, FINGERPRINTS_DIR)
+        self._cache = {}  # shard -> ((ino, size, mtime_ns), {key: [raw line]})
+
+    def _path(self, shard):
+        return os.path.join(self.dir, f"{shard}.jsonl")
+
+    def _load(self, shard):
+        """{key: [raw line, ...]} of one shard, cached while the file is unchanged.
+
+        Only the key is cut out of each line; _rows() decodes the lines of the keys asked for.
+        """
+        try:
+            st = os.stat(self._path(shard))
+        except FileNotFoundError:
+            return {}
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        cached = self._cache.get(shard)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        lines = {}
+        with open(self._path(shard), "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line from an interrupted write
+                end = raw.find(b'"', 2)
+                if raw.startswith(b'["') and end > 0:
+                    lines.setdefault(raw[2:end].decode(), []).append(raw)
+        self._cache[shard] = (stamp, lines)
+        return lines
+
+    def _rows(self, key):
+        """[(id, type, simhash, tokens)] filed under `key`."""
+        rows = []
+        for raw in self._load(_shard(key)).get(key, ()):
+            try:
+                rows.append(tuple(json.loads(raw)[1:]))
+            except ValueError:
+                continue
+        return rows
+
+    def candidates(self, fp, entry_type):
+        """Ids of indexed entries of `entry_type` whose fingerprint matches `fp`, exact matches first.
+
+        Caller holds the store's write lock.
+        """
+        if not os.path.isdir(self.dir):
+            self.rebuild()
+        found = []
+        for key in index_keys(fp):
+            for entry_id, other_type, simhash, tokens in self._rows(key):
+                if other_type != entry_type:
+                    continue
+                if key.startswith("x:") or same_content(fp, {"exact": "", "simhash": simhash, "tokens": tokens}):
+                    found.append(entry_id)
+        return list(dict.fromkeys(found))
+
+    def add(self, entries):
+        """File new entries. Call after the write. Caller holds the store's write lock."""
+        if not os.path.isdir(self.dir):
+            self.rebuild()  # the scan already includes them
+            return
+        for shard, lines in _lines(entries).items():
+            with open(self._path(shard), "a") as f:
+                f.write("".join(lines))
+
+    def forget(self, entries):
+        """Drop removed entries from their shards. Caller holds the store's write lock."""
+        if not os.path.isdir(self.dir):
+            return
+        removed = {}
+        for e in entries:
+            fp = _fingerprint_of(e)
+            if fp and isinstance(e.get("id"), str):
+                for key in index_keys(fp):
+                    removed.setdefault(_shard(key), set()).add(e["id"])
+        for shard, ids in removed.items():
+            kept = [raw for lines in self._load(shard).values() for raw in lines
+                    if json.loads(raw)[1] not in ids]
+            self.store._atomic_write(self._path(shard), b"".join(kept))
+
+    def rebuild(self):
+        """Rebuild the index from a full scan of the store. Caller holds the store's write lock."""
+        tmp_dir = f"{self.dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for shard, lines in _lines(self.store.export()).items():
+            with open(os.path.join(tmp_dir, f"{shard}.jsonl"), "w") as f:
+                f.write("".join(lines))
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.replace(tmp_dir, self.dir)
+        self._cache.clear()
+        legacy = os.path.join(self.store.base_dir, LEGACY_FILE)
+        if os.path.exists(legacy):
+            os.remove(legacy)
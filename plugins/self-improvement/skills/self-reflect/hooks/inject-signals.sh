@@ -27,21 +27,21 @@ if [ -z "$SESSION_ID" ]; then
     exit 0
 fi
 
-# Query signals for current session
-SIGNALS=$(python3 "$MEMORY_STORE" query --status captured --session "$SESSION_ID" 2>/dev/null || echo "[]")
+# Query the last 20 captured signals for this session (newest first, only the fields shown)
+SIGNALS=$(python3 "$MEMORY_STORE" query --status captured --session "$SESSION_ID" \
+    --limit 20 --reverse --fields type content --ndjson 2>/dev/null || true)
 
 # Check if there are any signals
-COUNT=$(echo "$SIGNALS" | jq 'length')
-if [ "$COUNT" = "0" ] || [ -z "$COUNT" ]; then
+if [ -z "$SIGNALS" ]; then
     exit 0
 fi
 
-# Format compact summary
+# Format compact summary, oldest first
 SUMMARY=$(echo "$SIGNALS" | python3 -c "
 import sys, json
-signals = json.load(sys.stdin)
+signals = [json.loads(line) for line in sys.stdin if line.strip()]
 lines = []
-for s in signals[-20:]:  # Last 20 signals max
+for s in reversed(signals):
     t = s.get('type', '?')
     c = s.get('content', '')[:80]
     lines.append(f'- [{t}] {c}')
@@ -0,0 +1,813 @@
+"""
+JSONL backend for the self-improvement signal store (the default).
+Manages signals (ephemeral captures) and learnings/ (analyzed entries).
+Open it through memory_store.open_store(); the CLI lives in memory_store.py.
+The logic shared with the SQLite store (folding, queries, maintenance,
+promotion) is in signal_store.py; this module implements its storage interface.
+
+Signals live in signals/, one append-only JSONL segment per UTC day
+(signals/2026-02-11.jsonl, named after the SIG id date) plus a small
+manifest.json listing the segments and the timestamp range each covers
+(including the last_seen of folded repeats). Updates and removals are written
+as delta records and folded in by `compact`; age-based pruning goes by when a
+signal was last seen and drops whole segments once all of theirs are old. A single-file signals.jsonl from older versions is
+migrated into segments on first use. stats.json holds running counts by status,
+type and category so `stats` (and the status line) never scans the segments,
+plus the oldest prunable last-seen time so `maintain` knows without a scan whether
+the 14-day prune would remove anything. Appends never prune; the SessionEnd
+hook runs `maintain` once the session is over. Repeated signals are folded
+into the entry already holding them (its `occurrences` goes up) instead of being
+written again; fingerprints/ files content fingerprints by key for that lookup
+(see fingerprint_index.py), and recurrence/ counts each signal's sessions
+beyond the prune (see recurrence.py).
+
+Concurrency: every writer (append, update, archive, compact, promote) holds the
+store's exclusive flock on signals.lock, so hook processes never interleave
+writes or hand out duplicate ids. Readers take no lock. Whole-file rewrites go
+through a temp file + rename, so a reader sees either the old or the new file,
+never a truncated one.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from fingerprint_index import FingerprintIndex
+from signal_store import (PROTECTED_STATUSES, STATS_FIELDS, SignalStore, _DAY,
+                          _apply_record, _cutoff, _day_name, _last_seen, _matches, _read_log, _statusline)
+
+
+SEGMENTS_DIR = "signals"
+MANIFEST_FILE = "manifest.json"
+SEQUENCE_FILE = "signals.seq"
+STATS_FILE = "stats.json"
+INDEX_VERSION = 6
+INDEXED_FIELDS = ("status", "type", "category", "session_id", "sessions", "tags", "timestamp", "last_seen")
+POSTING_FIELDS = ("status", "type", "session_id", "tags")
+COMPACT_MIN_DELTAS = 200
+
+
+# Segment logs are append-only: full entries plus the delta records of update() and
+# archive() (see signal_store._apply_record); compact() rewrites a segment with
+# deltas applied.
+
+def _delta_record(op, entry_id, fields=None):
+    record = {"op": op, "id": entry_id}
+    if fields is not None:
+        record["fields"] = fields
+    return record
+
+
+def _segment_bounds(name):
+    """Default (min, max) timestamp bounds for a segment: any timestamp on its day."""
+    if _DAY.match(name):
+        return name, name + "T99"
+    return "", ""
+
+
+class _Segment:
+    """One append-only segment log with its offset and secondary index."""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.path = os.path.join(store.segments_dir, f"{name}.jsonl")
+        self.index_path = os.path.join(store.segments_dir, f"{name}.idx")
+        self._cache = None
+
+    # --- Index (<segment>.idx) ---
+    #
+    # The index is an append-only JSONL sidecar: a header line recording the index
+    # version and the inode of the segment log it describes, then one
+    # {"id", "off", "len"} line per log record ("del": true for tombstones). Lines for
+    # entries and for updates touching INDEXED_FIELDS also carry those values under
+    # "a", from which the in-memory secondary indexes (idx["by"]) are built. Writers
+    # extend the file under the store lock; readers validate it against
+    # the segment log and index any uncovered tail in memory only.
+
+    def _scan_offsets(self, start=0, end=None):
+        """Yield (record, offset, length) for each complete record in the segment log in [start, end)."""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            off = start
+            for raw in f:
+                length = len(raw)
+                if not raw.endswith(b"\n") or (end is not None and off >= end):
+                    break  # partial line from an in-flight write
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict) and record.get("id"):
+                    yield record, off, length
+                off += length
+
+    def _read_at(self, off, length, f=None):
+        """Decode the record stored at [off, off + length) in the segment log, or None."""
+        try:
+            if f is None:
+                with open(self.path, "rb") as f:
+                    f.seek(off)
+                    return json.loads(f.read(length))
+            f.seek(off)
+            return json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+    def _attrs(self, record):
+        """Indexed field values carried by a log record, or None if it changes none."""
+        op = record.get("op")
+        if op == "delete":
+            return None
+        if op == "update":
+            fields = record.get("fields", {})
+            attrs = {k: fields[k] for k in INDEXED_FIELDS if k in fields}
+            return attrs or None
+        return {k: record[k] for k in INDEXED_FIELDS if k in record}
+
+    def _located(self, record, off, length):
+        """Index tuple (id, offset, length, deleted, attrs) for a log record."""
+        return (record["id"], off, length, record.get("op") == "delete", self._attrs(record))
+
+    def _new_index(self, ino):
+        return {"ino": ino, "entries": {}, "attrs": {}, "by": {k: {} for k in POSTING_FIELDS},
+                "covered": 0, "persisted": 0, "deltas": 0, "last": None, "idx_ino": None, "pos": 0}
+
+    def _post(self, idx, entry_id, attrs, add):
+        """Add or remove `entry_id` from the secondary indexes for `attrs`."""
+        for field in POSTING_FIELDS:
+            values = attrs.get(field)
+            if field == "session_id":
+                # Sessions of folded repeats are posted under session_id too
+                sessions = attrs.get("sessions")
+                values = [values, *sessions] if isinstance(sessions, list) else [values]
+            elif field != "tags":
+                values = [values]
+            elif not isinstance(values, list):
+                continue
+            for value in values:
+                if not isinstance(value, str) or not value:
+                    continue
+                postings = idx["by"][field]
+                if add:
+                    postings.setdefault(value, set()).add(entry_id)
+                elif value in postings:
+                    postings[value].discard(entry_id)
+                    if not postings[value]:
+                        del postings[value]
+
+    def _index_record(self, idx, entry_id, off, length, deleted=False, attrs=None):
+        """Add one log record location to the in-memory index."""
+        if off < idx["covered"]:
+            return  # already applied (e.g. indexed from the tail before another writer persisted it)
+        if deleted:
+            if idx["entries"].pop(entry_id, None) is not None:
+                idx["deltas"] += 1
+                self._post(idx, entry_id, idx["attrs"].pop(entry_id, {}), add=False)
+        else:
+            locs = idx["entries"].setdefault(entry_id, [])
+            locs.append((off, length))
+            if len(locs) > 1:
+                idx["deltas"] += 1
+            if attrs:
+                old = idx["attrs"].get(entry_id, {})
+                self._post(idx, entry_id, old, add=False)
+                new = {**old, **attrs}
+                idx["attrs"][entry_id] = new
+                self._post(idx, entry_id, new, add=True)
+        idx["covered"] = off + length
+        idx["last"] = (entry_id, off, length)
+
+    def _load_index_file(self, st):
+        """Parse the segment index. Returns the index dict, or None if missing or stale for `st`."""
+        try:
+            with open(self.index_path, "rb") as f:
+                header = json.loads(f.readline() or b"null")
+                if not isinstance(header, dict) or header.get("index_version") != INDEX_VERSION \
+                        or header.get("ino") != st.st_ino:
+                    return None
+                idx = self._new_index(st.st_ino)
+                idx["idx_ino"] = os.fstat(f.fileno()).st_ino
+                idx["pos"] = f.tell()
+                self._read_index_lines(f, idx)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if idx["covered"] > st.st_size:
+            return None
+        if idx["last"] is not None:
+            last_id, off, length = idx["last"]
+            last = self._read_at(off, length)
+            if not isinstance(last, dict) or last.get("id") != last_id:
+                return None
+        return idx
+
+    def _read_index_lines(self, f, idx):
+        """Apply complete index lines from file object `f` (positioned at idx["pos"]) to `idx`."""
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            rec = json.loads(raw)
+            self._index_record(idx, rec["id"], rec["off"], rec["len"], rec.get("del", False), rec.get("a"))
+            idx["persisted"] = max(idx["persisted"], rec["off"] + rec["len"])
+            idx["pos"] += len(raw)
+
+    def _catch_up_index(self, idx):
+        """Pick up lines other writers appended to the segment index. Returns False if a reload is needed."""
+        try:
+            with open(self.index_path, "rb") as f:
+                if os.fstat(f.fileno()).st_ino != idx["idx_ino"]:
+                    return False
+                f.seek(idx["pos"])
+                self._read_index_lines(f, idx)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        return True
+
+    def _index_line(self, entry_id, off, length, deleted=False, attrs=None):
+        rec = {"id": entry_id, "off": off, "len": length}
+        if deleted:
+            rec["del"] = True
+        if attrs:
+            rec["a"] = attrs
+        return json.dumps(rec) + "\n"
+
+    def _write_index(self, idx):
+        """Rewrite the segment index from `idx`, dropping deleted entries. Lock must be held."""
+        lines = [json.dumps({"index_version": INDEX_VERSION, "ino": idx["ino"]}) + "\n"]
+        locs = sorted((off, length, eid) for eid, entry_locs in idx["entries"].items()
+                      for off, length in entry_locs)
+        first = {eid: entry_locs[0] for eid, entry_locs in idx["entries"].items()}
+        for off, length, eid in locs:
+            # Entry lines carry the merged attributes, so update lines need none
+            attrs = idx["attrs"].get(eid) if first[eid] == (off, length) else None
+            lines.append(self._index_line(eid, off, length, attrs=attrs))
+        data = "".join(lines).encode()
+        self.store._atomic_write(self.index_path, data)
+        idx["idx_ino"] = os.stat(self.index_path).st_ino
+        idx["pos"] = len(data)
+        idx["persisted"] = idx["covered"]
+
+    def _persist_index(self, idx):
+        """Write index lines for records indexed in memory but not yet in the segment index. Lock must be held."""
+        if idx["idx_ino"] is None or idx["persisted"] == 0 or not os.path.exists(self.index_path):
+            self._write_index(idx)
+            return
+        if idx["persisted"] >= idx["covered"]:
+            return
+        data = "".join(self._index_line(*self._located(r, off, length))
+                       for r, off, length in self._scan_offsets(idx["persisted"], idx["covered"])).encode()
+        with open(self.index_path, "ab") as f:
+            f.write(data)
+        idx["pos"] += len(data)
+        idx["persisted"] = idx["covered"]
+
+    def _synced_index(self, persist=False):
+        """Return the index state brought up to date with the segment log.
+
+        idx["entries"] maps each live id to [(offset, length), ...]: the entry itself,
+        then its update deltas. idx["attrs"] holds its INDEXED_FIELDS values and
+        idx["by"][field][value] the set of ids carrying that value.
+
+        The on-disk index is reloaded or rebuilt if missing or stale. Records not yet
+        covered by it (written by an older version or by hand) are indexed from the
+        tail; writers (persist=True, lock held) save that work back to the segment index.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._cache = None
+            return self._new_index(None)
+        idx = self._cache
+        if idx is not None and (idx["ino"] != st.st_ino or idx["covered"] > st.st_size):
+            idx = None
+        elif idx is not None and idx["covered"] < st.st_size and not self._catch_up_index(idx):
+            idx = None
+        if idx is None:
+            idx = self._load_index_file(st)
+        if idx is None:
+            idx = self._new_index(st.st_ino)
+        self._cache = idx
+        if idx["covered"] < st.st_size:
+            for record, off, length in self._scan_offsets(idx["covered"]):
+                self._index_record(idx, *self._located(record, off, length))
+        if persist:
+            self._persist_index(idx)
+        return idx
+
+    def _append_records(self, records):
+        """Append log records to the segment log in one write and index them. Lock must be held."""
+        open(self.path, "ab").close()
+        idx = self._synced_index(persist=True)
+        lines = [(json.dumps(r) + "\n").encode() for r in records]
+        with open(self.path, "ab") as f:
+            off = f.tell()
+            f.write(b"".join(lines))
+        located = []
+        for r, line in zip(records, lines):
+            located.append(self._located(r, off, len(line)))
+            off += len(line)
+        data = "".join(self._index_line(*loc) for loc in located).encode()
+        with open(self.index_path, "ab") as f:
+            f.write(data)
+        idx["pos"] += len(data)
+        for loc in located:
+            self._index_record(idx, *loc)
+        idx["persisted"] = idx["covered"]
+
+    def _fetch(self, idx, entry_ids):
+        """Read and merge the given entries via the index. Returns None if the index is stale."""
+        results = []
+        with open(self.path, "rb") as f:
+            for entry_id in entry_ids:
+                entry = None
+                for loc in idx["entries"][entry_id]:
+                    record = self._read_at(*loc, f=f)
+                    if not isinstance(record, dict) or record.get("id") != entry_id:
+                        return None
+                    entry = _apply_record(entry, record)
+                if entry is not None:
+                    results.append(entry)
+        return results
+
+    def read_all(self):
+        """Read all entries in the segment, with update and delete records applied."""
+        return _read_log(self.path)
+
+    def write_all(self, entries):
+        """Overwrite the segment with the given entries (no deltas) and rebuild its index. Lock must be held."""
+        data = "".join(json.dumps(entry) + "\n" for entry in entries)
+        self.store._atomic_write(self.path, data, durable=True)
+        self._cache = None
+        self._synced_index(persist=True)
+
+    def remove(self):
+        """Delete the segment files. Lock must be held."""
+        for path in (self.path, self.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._cache = None
+
+    def get(self, entry_id):
+        """Fetch a single entry by ID, or None."""
+        idx = self._synced_index()
+        if entry_id not in idx["entries"]:
+            return None
+        found = self._fetch(idx, [entry_id])
+        if found is None:
+            # File changed under a cached index; fall back to a linear scan
+            self._cache = None
+            found = [e for e in self.read_all() if e.get("id") == entry_id]
+        return found[0] if found else None
+
+    def query(self, status=None, entry_type=None, since=None, tags=None, session_id=None):
+        """Matching entries in log order. Indexed filters only read the matching records."""
+        idx = self._synced_index()
+        candidates = None
+        for field, value in (("status", status), ("type", entry_type), ("session_id", session_id)):
+            if value:
+                ids = idx["by"][field].get(value, set())
+                candidates = ids if candidates is None else candidates & ids
+        if tags:
+            ids = set().union(*(idx["by"]["tags"].get(t, set()) for t in tags))
+            candidates = ids if candidates is None else candidates & ids
+
+        if candidates is None:
+            entries = self.read_all()
+        else:
+            if since:
+                candidates = {eid for eid in candidates
+                              if (idx["attrs"].get(eid, {}).get("timestamp") or "") >= since}
+            ordered = sorted(candidates, key=lambda eid: idx["entries"][eid][0][0])
+            entries = self._fetch(idx, ordered)
+            if entries is None:
+                self._cache = None
+                entries = self.read_all()
+        return [e for e in entries if _matches(e, status, entry_type, since, tags, session_id)]
+
+
+class MemoryStore(SignalStore):
+    def __init__(self, base_dir=None):
+        super().__init__(base_dir=base_dir)
+        self.segments_dir = os.path.join(self.base_dir, SEGMENTS_DIR)
+        self.manifest_path = os.path.join(self.segments_dir, MANIFEST_FILE)
+        self.sequence_path = os.path.join(self.base_dir, SEQUENCE_FILE)
+        self.stats_path = os.path.join(self.base_dir, STATS_FILE)
+        self._segments = {}
+        self._manifest_cache = None
+        self._fingerprints = FingerprintIndex(self)
+
+    # --- Segments ---
+
+    def _segment(self, name):
+        if name not in self._segments:
+            self._segments[name] = _Segment(self, name)
+        return self._segments[name]
+
+    def _manifest(self):
+        """Return {segment name: {"min_ts", "max_ts"}} from manifest.json, oldest segment first."""
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return self._rebuild_manifest() if os.path.isdir(self.segments_dir) else {}
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self._manifest_cache and self._manifest_cache[0] == key:
+            return self._manifest_cache[1]
+        try:
+            with open(self.manifest_path, "r") as f:
+                segments = json.load(f)["segments"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return self._rebuild_manifest()
+        segments = dict(sorted(segments.items()))
+        self._manifest_cache = (key, segments)
+        return segments
+
+    def _write_manifest(self, segments):
+        """Persist the segment list. Lock must be held."""
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._atomic_write(self.manifest_path, json.dumps(
+            {"version": 1, "partition": "day", "segments": dict(sorted(segments.items()))}, indent=1))
+        self._manifest_cache = None
+
+    def _rebuild_manifest(self):
+        """Recover a missing or corrupt manifest from the segment files on disk."""
+        segments = {}
+        for fname in sorted(os.listdir(self.segments_dir)):
+            if not fname.endswith(".jsonl"):
+                continue
+            name = fname[:-len(".jsonl")]
+            lo, hi = _segment_bounds(name)
+            for ts in self._segment(name)._synced_index()["attrs"].values():
+                ts = ts.get("timestamp") or ""
+                lo, hi = min(lo, ts), max(hi, ts)
+            segments[name] = {"min_ts": lo, "max_ts": hi}
+        with self._lock():
+            self._write_manifest(segments)
+        return segments
+
+    def _cover(self, segments, name, timestamps):
+        """Add segment `name` to the manifest or widen its bounds to `timestamps`. Lock must be held."""
+        lo, hi = _segment_bounds(name)
+        bounds = segments.get(name, {"min_ts": lo, "max_ts": hi})
+        new = {"min_ts": min([bounds["min_ts"], *timestamps]), "max_ts": max([bounds["max_ts"], *timestamps])}
+        if segments.get(name) != new:
+            self._write_manifest({**segments, name: new})
+
+    def _drop_segment(self, name):
+        """Remove a segment from the manifest, then delete its files. Lock must be held."""
+        segments = dict(self._manifest())
+        segments.pop(name, None)
+        self._write_manifest(segments)
+        self._segment(name).remove()
+
+    def _find(self, entry_id):
+        """Return the segment holding `entry_id`, or None."""
+        segments = self._manifest()
+        name = _day_name({"id": entry_id})
+        if name in segments and entry_id in self._segment(name)._synced_index()["entries"]:
+            return self._segment(name)
+        for other in segments:
+            if other != name and entry_id in self._segment(other)._synced_index()["entries"]:
+                return self._segment(other)
+        return None
+
+    def _write_entries(self, entries):
+        """Append new entries to their segments, registering new segments. Lock must be held."""
+        by_segment = {}
+        for entry in entries:
+            by_segment.setdefault(_day_name(entry), []).append(entry)
+        for name, group in by_segment.items():
+            self._cover(self._manifest(), name, [e.get("timestamp") or "" for e in group])
+            self._segment(name)._append_records(group)
+
+    def _migrate_legacy(self):
+        """Split a single-file signals.jsonl from older versions into day segments (one-time)."""
+        if not os.path.exists(self.signals_path):
+            return
+        with self._lock():
+            if not os.path.exists(self.signals_path):
+                return
+            legacy = _Segment(self, "legacy")
+            legacy.path = self.signals_path
+            # Skip entries already copied by an interrupted earlier migration
+            entries = [e for e in legacy.read_all() if self._find(e["id"]) is None]
+            if entries:
+                self._write_entries(entries)
+            os.replace(self.signals_path, self.signals_path + ".migrated")
+            self._recount()
+            legacy_index = os.path.join(self.base_dir, "signals.idx")
+            if os.path.exists(legacy_index):
+                os.remove(legacy_index)
+
+    def _read_all(self):
+        """Read all entries across segments, oldest segment first."""
+        self._migrate_legacy()
+        entries = []
+        for name in self._manifest():
+            entries.extend(self._segment(name).read_all())
+        return entries
+
+    def _read_sequence(self, day):
+        """Return the last allocated sequence number for `day` from the sidecar, or None if unknown."""
+        try:
+            with open(self.sequence_path, "r") as f:
+                state = json.load(f)
+            if state.get("date") == day:
+                return int(state["seq"])
+            return 0
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _allocate_ids(self, count=1):
+        """Reserve `count` consecutive SIG-YYYYMMDD-NNNN ids. O(1) via the signals.seq sidecar.
+
+        The sidecar is updated before any record is written, so a crash can leave a gap
+        in the sequence but never hands out the same id twice. A lost or corrupt sidecar
+        is re-seeded from the day's segment.
+        """
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        with self._lock():
+            last = self._read_sequence(day)
+            if last is None:
+                # Missing or unreadable sidecar: seed once from today's segment
+                last = self._scan_max_seq(f"SIG-{day}-")
+            self._atomic_write(self.sequence_path, json.dumps({"date": day, "seq": last + count}))
+        return [f"SIG-{day}-{seq:04d}" for seq in range(last + 1, last + count + 1)]
+
+    def _scan_max_seq(self, prefix):
+        """Highest sequence number among ids with `prefix` in that day's segment (full scan)."""
+        self._migrate_legacy()
+        max_seq = 0
+        name = _day_name({"id": prefix})
+        for entry in self._segment(name).read_all():
+            eid = entry.get("id", "")
+            if eid.startswith(prefix):
+                try:
+                    max_seq = max(max_seq, int(eid[len(prefix):]))
+                except ValueError:
+                    continue
+        return max_seq
+
+    def _insert(self, entries):
+        """Write new entries and file them in the stats and fingerprint sidecars. Lock must be held."""
+        self._write_entries(entries)
+        self._adjust_stats(added=entries)
+        self._fingerprints.add(entries)
+
+    def get(self, entry_id):
+        """Fetch a single entry by ID. Returns None if not found."""
+        self._migrate_legacy()
+        segment = self._find(entry_id)
+        return segment.get(entry_id) if segment else None
+
+    def _iter_hot(self, status=None, entry_type=None, since=None, tags=None, session_id=None,
+                  newest_first=False):
+        """Matching entries from the signal segments, one segment at a time."""
+        self._migrate_legacy()
+        names = [name for name, bounds in self._manifest().items()
+                 if not (since and bounds["max_ts"] < since)]
+        if newest_first:
+            names.reverse()
+        for name in names:
+            matched = self._segment(name).query(
+                status=status, entry_type=entry_type, since=since, tags=tags, session_id=session_id)
+            if newest_first:
+                matched.reverse()
+            yield from matched
+
+    def update(self, entry_id, fields):
+        """Update fields on an existing entry. Returns updated entry or None.
+
+        Appends a delta record to the entry's segment instead of rewriting it;
+        compact() folds it in later.
+        """
+        with self._lock():
+            self._migrate_legacy()
+            segment = self._find(entry_id)
+            current = segment.get(entry_id) if segment else None
+            if current is None:
+                return None
+            delta = _delta_record("update", entry_id, fields)
+            seen = [fields[f] for f in ("timestamp", "last_seen") if isinstance(fields.get(f), str)]
+            if seen:
+                self._cover(self._manifest(), segment.name, seen)
+            segment._append_records([delta])
+            updated = {**current, **fields}
+            # timestamp feeds oldest_prunable in stats.json
+            if any(current.get(field) != updated.get(field)
+                   for field in ("timestamp", *(field for _, field in STATS_FIELDS))):
+                self._adjust_stats(removed=[current], added=[updated])
+        return updated
+
+    def compact(self):
+        """Rewrite segments with all deltas folded in. Returns the number of delta records dropped."""
+        dropped = 0
+        with self._lock():
+            self._migrate_legacy()
+            for name in list(self._manifest()):
+                segment = self._segment(name)
+                deltas = segment._synced_index(persist=True)["deltas"]
+                if not deltas:
+                    continue
+                entries = segment.read_all()
+                if entries:
+                    segment.write_all(entries)
+                else:
+                    self._drop_segment(name)
+                dropped += deltas
+        return dropped
+
+    def needs_compaction(self):
+        """True once delta records make up a sizeable share of the log."""
+        deltas = live = 0
+        for name in self._manifest():
+            idx = self._segment(name)._synced_index()
+            deltas += idx["deltas"]
+            live += len(idx["entries"])
+        return deltas >= COMPACT_MIN_DELTAS and deltas * 2 >= live
+
+    def archive(self, days=14, status_filter=None):
+        """Move entries not seen for `days` days to the cold archive. Returns count removed.
+
+        Segments entirely older than the cutoff are archived and deleted outright when
+        nothing in them is protected; other segments get delete records for their old
+        entries. Entries are written to the archive before they leave the hot store.
+        """
+        from cold_archive import ColdArchive
+        cold = ColdArchive(self)
+        cutoff_ts = _cutoff(days)
+
+        removed = 0
+        with self._lock():
+            self._migrate_legacy()
+            for name, bounds in list(self._manifest().items()):
+                if bounds["min_ts"] >= cutoff_ts:
+                    continue
+                segment = self._segment(name)
+                idx = segment._synced_index(persist=True)
+                by_status = idx["by"]["status"]
+                live = len(idx["entries"])
+                if bounds["max_ts"] < cutoff_ts and not any(by_status.get(s) for s in PROTECTED_STATUSES) \
+                        and (not status_filter or len(by_status.get(status_filter, ())) == live):
+                    dropped = segment.read_all()
+                    cold.add(dropped)
+                    self._drop_segment(name)
+                    self._adjust_stats(removed=dropped)
+                    self._fingerprints.forget(dropped)
+                    removed += len(dropped)
+                    continue
+                deletes = []
+                gone = []
+                for e in segment.read_all():
+                    ts = _last_seen(e)
+                    entry_status = e.get("status", "")
+                    # Never prune confirmed/promoted entries
+                    if entry_status in PROTECTED_STATUSES:
+                        continue
+                    if status_filter and entry_status != status_filter:
+                        continue
+                    if ts < cutoff_ts:
+                        deletes.append(_delta_record("delete", e["id"]))
+                        gone.append(e)
+                cold.add(gone)
+                if len(deletes) == live:
+                    self._drop_segment(name)
+                elif deletes:
+                    segment._append_records(deletes)
+                self._adjust_stats(removed=gone)
+                self._fingerprints.forget(gone)
+                removed += len(deletes)
+            self._reset_oldest_prunable()
+        return removed
+
+    def prune_due(self, days=14):
+        """True when archive(days) would remove at least one entry. Reads only stats.json."""
+        self._migrate_legacy()
+        counts = self._read_stats()
+        if counts is None:
+            with self._lock():
+                counts = self._recount()
+        oldest = counts["oldest_prunable"]
+        return oldest is not None and oldest < _cutoff(days)
+
+    # --- Fingerprint index (fingerprints/, see fingerprint_index.py) ---
+
+    def _fingerprint_candidates(self, fp, entry_type):
+        """Ids of entries that may repeat a signal with fingerprint `fp`. Lock must be held."""
+        return self._fingerprints.candidates(fp, entry_type)
+
+    # --- Stats sidecar (stats.json) ---
+    #
+    # Counts by status, type and category, adjusted by every write so stats() and
+    # the statusline never scan the store. A missing or corrupt sidecar is rebuilt
+    # with one full scan. "oldest_prunable" is the earliest last-seen time (see
+    # signal_store._last_seen) among entries that are not protected. Writes only ever lower it, so after an update or
+    # delete it may be older than the truth; archive() then resets it from the
+    # segment indexes, and a stale value costs at most one empty prune.
+
+    def _read_stats(self):
+        try:
+            with open(self.stats_path, "r") as f:
+                counts = json.load(f)
+            if all(isinstance(counts.get(key), dict) for key, _ in STATS_FIELDS) \
+                    and "oldest_prunable" in counts:
+                return counts
+        except (OSError, ValueError, AttributeError):
+            pass
+        return None
+
+    def _write_stats(self, counts):
+        self._atomic_write(self.stats_path, json.dumps(counts))
+        return counts
+
+    def _count(self, counts, entries, sign):
+        for e in entries:
+            counts["total"] += sign
+            if sign > 0 and e.get("status") not in PROTECTED_STATUSES:
+                ts = _last_seen(e)
+                if counts["oldest_prunable"] is None or ts < counts["oldest_prunable"]:
+                    counts["oldest_prunable"] = ts
+            for key, field in STATS_FIELDS:
+                value = e.get(field, "unknown")
+                if not isinstance(value, str):
+                    value = json.dumps(value)
+                n = counts[key].get(value, 0) + sign
+                if n > 0:
+                    counts[key][value] = n
+                else:
+                    counts[key].pop(value, None)
+        return counts
+
+    def _recount(self):
+        """Rebuild and persist stats.json from a full scan. Lock must be held."""
+        counts = {"total": 0, **{key: {} for key, _ in STATS_FIELDS}, "oldest_prunable": None}
+        return self._write_stats(self._count(counts, self._read_all(), 1))
+
+    def _adjust_stats(self, removed=(), added=()):
+        """Apply entry removals/additions to stats.json. Call after the write. Lock must be held."""
+        if not removed and not added:
+            return
+        counts = self._read_stats()
+        if counts is None:
+            self._recount()  # the scan already reflects this write
+            return
+        self._count(counts, removed, -1)
+        self._count(counts, added, 1)
+        self._write_stats(counts)
+
+    def _reset_oldest_prunable(self):
+        """Recompute oldest_prunable exactly from the segment indexes. Lock must be held."""
+        counts = self._read_stats()
+        if counts is None:
+            self._recount()
+            return
+        oldest = None
+        for name in self._manifest():
+            for attrs in self._segment(name)._synced_index()["attrs"].values():
+                if attrs.get("status") not in PROTECTED_STATUSES:
+                    ts = _last_seen(attrs)
+                    if oldest is None or ts < oldest:
+                        oldest = ts
+        counts["oldest_prunable"] = oldest
+        self._write_stats(counts)
+
+    def stats(self, fmt=None, recount=False):
+        """Return counts by status, type, category. If fmt='statusline', return compact string.
+
+        Served from the stats.json sidecar; recount=True rebuilds it from a full scan.
+        """
+        self._migrate_legacy()
+        counts = None if recount else self._read_stats()
+        if counts is None:
+            with self._lock():
+                counts = self._recount()
+        if fmt == "statusline":
+            return _statusline(counts)
+        return {"total": counts["total"], **{key: counts[key] for key, _ in STATS_FIELDS}}
+
+    def export(self):
+        """Yield every entry, oldest segment first, exactly as stored."""
+        self._migrate_legacy()
+        for name in self._manifest():
+            yield from self._segment(name).read_all()
+
+    def import_entries(self, entries):
+        """Insert exported entries, keeping their ids and fields. Ids already present are skipped.
+
+        Returns the number of entries imported.
+        """
+        with self._lock():
+            self._migrate_legacy()
+            fresh = {}
+            for e in entries:
+                if isinstance(e.get("id"), str) and e["id"] not in fresh and self._find(e["id"]) is None:
+                    fresh[e["id"]] = e
+            fresh = list(fresh.values())
+            if fresh:
+                self._insert(fresh)
+                # Re-seed the sequence from the segments in case imported ids are ahead of it
+                if os.path.exists(self.sequence_path):
+                    os.remove(self.sequence_path)
+        return len(fresh)
+
+
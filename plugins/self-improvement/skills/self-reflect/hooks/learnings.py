@@ -0,0 +1,166 @@
+"""
+Structured store for promoted learnings, shared by the JSONL and SQLite stores.
+
+promote() records each learning as one JSON line in learnings/<category>.jsonl
+and maps its LRN id to the category in learnings/index.json, so a learning is
+looked up by id without reading LEARNINGS.md. LEARNINGS.md is a generated
+view: every category is a section between two marker comments, and a promotion
+re-renders only that category's section from its shard. Text outside the
+markers (notes, a retitled header) is left alone.
+
+A LEARNINGS.md from older versions (no markers) is imported into shards on
+first use and kept as LEARNINGS.md.migrated.
+"""
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+LEARNINGS_INDEX_FILE = "index.json"
+
+_SECTION_HEADER = re.compile(r"^## (.+)$")
+_LEGACY_LINE = re.compile(r"^- \[(LRN-[^\]]+)\] (.*) \(promoted to (.*)\)$")
+
+
+def _category_key(category):
+    """Section and shard key: the lowercase slug of the category's title ("Agent Friction" -> "agent-friction").
+
+    Categories spelled differently ("Commands", "commands") share one section and
+    one shard, whose name never differs from another's only by case.
+    """
+    return _category_title(category).lower().replace(" ", "-")
+
+
+def _category_title(category):
+    return category.replace("-", " ").replace("_", " ").title() if category else "General"
+
+
+def _markers(key):
+    return f"<!-- learnings:{key} -->", f"<!-- /learnings:{key} -->"
+
+
+class Learnings:
+    def __init__(self, store):
+        self.store = store
+        self.dir = store.learnings_dir
+        self.view_path = store.learnings_index
+        self.index_path = os.path.join(self.dir, LEARNINGS_INDEX_FILE)
+
+    def _shard_path(self, key):
+        return os.path.join(self.dir, re.sub(r"[^A-Za-z0-9_-]", "-", key) + ".jsonl")
+
+    def _index(self):
+        """Return {lrn_id: category key}, rebuilt from the shards if missing."""
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            if isinstance(index, dict):
+                return index
+        except (OSError, ValueError):
+            pass
+        index = {}
+        if os.path.isdir(self.dir):
+            for filename in sorted(os.listdir(self.dir)):
+                if filename.endswith(".jsonl"):
+                    for record in self._read_shard_file(os.path.join(self.dir, filename)):
+                        index[record["id"]] = _category_key(record.get("category"))
+        return index
+
+    def _read_shard_file(self, path):
+        records = {}
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    records[record.get("id")] = record  # a re-promotion replaces the earlier line
+        except OSError:
+            pass
+        return list(records.values())
+
+    def _read_shard(self, key, index):
+        """Current learnings of one category, in promotion order."""
+        return [r for r in self._read_shard_file(self._shard_path(key)) if index.get(r["id"]) == key]
+
+    def add(self, lrn_id, content, target, category):
+        """Record a learning and re-render its section. Caller holds the store's write lock."""
+        self._migrate_legacy()
+        os.makedirs(self.dir, exist_ok=True)
+        key = _category_key(category)
+        record = {"id": lrn_id, "category": category, "content": content, "target": target,
+                  "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")}
+        with open(self._shard_path(key), "a") as f:
+            f.write(json.dumps(record) + "\n")
+        index = self._index()
+        previous = index.get(lrn_id)
+        index[lrn_id] = key
+        self.store._atomic_write(self.index_path, json.dumps(dict(sorted(index.items()))))
+        self._render(key, index)
+        if previous and previous != key:
+            self._render(previous, index)
+        return record
+
+    def get(self, lrn_id):
+        """Fetch one learning by LRN id. Returns None if not found."""
+        if not os.path.exists(self.index_path) and os.path.exists(self.view_path):
+            with self.store._lock():
+                self._migrate_legacy()
+        index = self._index()
+        key = index.get(lrn_id)
+        if key is None:
+            return None
+        return next((r for r in self._read_shard(key, index) if r["id"] == lrn_id), None)
+
+    def _render(self, key, index):
+        """Rewrite the section of category `key` in LEARNINGS.md from its shard."""
+        records = self._read_shard(key, index)
+        start, end = _markers(key)
+        section = ""
+        if records:
+            lines = "".join(f"- [{r['id']}] {r['content']} (promoted to {r['target']})\n" for r in records)
+            section = f"{start}\n## {_category_title(records[0].get('category'))}\n{lines}{end}\n"
+        try:
+            with open(self.view_path, "r") as f:
+                view = f.read()
+        except OSError:
+            view = "# Learnings\n"
+        lo = view.find(start)
+        hi = view.find(end, lo) if lo != -1 else -1
+        if lo != -1 and hi != -1:
+            hi += len(end)
+            if view[hi:hi + 1] == "\n":
+                hi += 1
+            view = view[:lo] + section + view[hi:]
+        elif section:
+            view = view.rstrip() + "\n\n" + section
+        self.store._atomic_write(self.view_path, view)
+
+    def _migrate_legacy(self):
+        """Import a hand-maintained LEARNINGS.md (no markers, no shards) into shards. Lock must be held."""
+        if os.path.exists(self.index_path) or not os.path.exists(self.view_path):
+            return
+        with open(self.view_path, "r") as f:
+            view = f.read()
+        if "<!-- learnings:" in view:
+            return
+        index = {}
+        key = category = None
+        for line in view.splitlines():
+            header = _SECTION_HEADER.match(line)
+            if header:
+                category = header.group(1).strip()
+                key = _category_key(category)
+                continue
+            match = _LEGACY_LINE.match(line.strip())
+            if match and key:
+                lrn_id, content, target = match.groups()
+                with open(self._shard_path(key), "a") as f:
+                    f.write(json.dumps({"id": lrn_id, "category": category, "content": content,
+                                        "target": target, "timestamp": None}) + "\n")
+                index[lrn_id] = key
+        self.store._atomic_write(self.index_path, json.dumps(dict(sorted(index.items()))))
+        os.replace(self.view_path, self.view_path + ".migrated")
+        for key in sorted(set(index.values())):
+            self._render(key, index)
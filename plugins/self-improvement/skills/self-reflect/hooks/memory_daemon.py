@@ -0,0 +1,222 @@
+"""
+Optional long-lived memory-store daemon for the self-improvement hooks.
+Enabled with REFLECTIONS_DAEMON=1. Usable as CLI: python3 memory_daemon.py serve|status|stop
+
+Hooks are short-lived processes; without the daemon each one imports
+memory_store and re-reads the store's indexes from disk. With it, one process
+keeps the store open (indexes, manifest and caches stay warm) and serves calls
+over a Unix domain socket, store.sock, in the reflections directory.
+
+memory_store.connect_store() returns a DaemonClient when the daemon is
+enabled. The client forwards each call as one JSON line and reads one JSON line
+back. If nothing is listening it starts the daemon in the background for the
+next hook and runs this call in-process against the files, so hooks never wait
+on the daemon. The daemon serves one connection at a time, so a client waits
+at most CLIENT_TIMEOUT seconds for a reply (SLOW_TIMEOUT for maintenance
+calls). A read that times out is served from the files instead; a write is
+not retried, since the daemon may still apply it, and raises DaemonError.
+The daemon exits after IDLE_TIMEOUT seconds without a request.
+"""
+import json
+import os
+import socket
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+SOCKET_FILE = "store.sock"
+DAEMON_LOCK_FILE = "daemon.lock"
+IDLE_TIMEOUT = 600
+CLIENT_TIMEOUT = 2  # well inside the 5 s PostToolUseFailure budget
+SLOW_TIMEOUT = 25  # maintenance calls, made from SessionEnd (30 s) or the CLI
+DEFAULT_BASE_DIR = os.path.expanduser("~/.claude/reflections")
+
+# Store methods the daemon serves; generators are sent back as lists
+OPERATIONS = ("append", "append_many", "get", "query", "iter_query", "update", "stats",
+              "archive", "compact", "needs_compaction", "prune_due", "maintain", "promote",
+              "get_learning", "recurrence", "export", "import_entries")
+STREAMED = ("iter_query", "export")
+READ_ONLY = ("get", "query", "iter_query", "stats", "needs_compaction", "prune_due", "get_learning",
+             "recurrence", "export")
+SLOW = ("archive", "compact", "maintain", "import_entries")
+
+
+class DaemonError(RuntimeError):
+    """A call reached the daemon but failed there."""
+
+
+def daemon_enabled():
+    return os.environ.get("REFLECTIONS_DAEMON", "") not in ("", "0") and hasattr(socket, "AF_UNIX")
+
+
+class DaemonClient:
+    def __init__(self, base_dir=None, backend=None, spawn=True):
+        self.base_dir = base_dir or DEFAULT_BASE_DIR
+        self.backend = backend
+        self.socket_path = os.path.join(self.base_dir, SOCKET_FILE)
+        self.spawn = spawn
+        self._store = None
+
+    def __getattr__(self, name):
+        if name not in OPERATIONS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+    def _direct(self):
+        if self._store is None:
+            from memory_store import open_store
+            self._store = open_store(base_dir=self.base_dir, backend=self.backend)
+        return self._store
+
+    def _call(self, op, *args, **kwargs):
+        request = json.dumps({"op": op, "args": args, "kwargs": kwargs}) + "\n"
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(SLOW_TIMEOUT if op in SLOW else CLIENT_TIMEOUT)
+            sock.connect(self.socket_path)
+        except OSError:
+            # Daemon is down: start it for later calls, serve this one from the files
+            if self.spawn:
+                self.spawn = False
+                self._start_daemon()
+            return getattr(self._direct(), op)(*args, **kwargs)
+        with sock:
+            try:
+                sock.sendall(request.encode())
+                with sock.makefile("r") as f:
+                    line = f.readline()
+            except OSError as e:  # socket.timeout included: the daemon is busy or stuck
+                if op in READ_ONLY:
+                    return getattr(self._direct(), op)(*args, **kwargs)
+                # Once sent the request may still be applied, so writes are not retried
+                raise DaemonError(f"{op}: no reply from the daemon ({e})") from e
+        if not line:
+            raise DaemonError(f"{op}: daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(f"{op}: {response.get('error')}")
+        result = response["result"]
+        return iter(result) if op in STREAMED else result
+
+    def _start_daemon(self):
+        import subprocess
+        env = dict(os.environ, REFLECTIONS_DIR=self.base_dir)
+        if self.backend:
+            env["REFLECTIONS_BACKEND"] = self.backend
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve"], env=env,
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+        except OSError:
+            pass
+
+
+def _handle(store, request):
+    """Run one request against the store. Returns the response dict."""
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True, "result": {"pid": os.getpid()}}
+    if op not in OPERATIONS:
+        return {"ok": False, "error": f"unknown operation: {op}"}
+    try:
+        result = getattr(store, op)(*request.get("args", []), **request.get("kwargs", {}))
+        if op in STREAMED:
+            result = list(result)
+        return {"ok": True, "result": result}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def serve(base_dir=None, backend=None, idle_timeout=IDLE_TIMEOUT):
+    """Serve the store on store.sock until idle for `idle_timeout` seconds or told to stop.
+
+    Returns False without serving if another daemon already holds the directory.
+    """
+    from memory_store import open_store
+
+    base_dir = base_dir or DEFAULT_BASE_DIR
+    os.makedirs(base_dir, exist_ok=True)
+    socket_path = os.path.join(base_dir, SOCKET_FILE)
+    with open(os.path.join(base_dir, DAEMON_LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+        # We hold the daemon lock, so any socket file left behind is stale
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        store = open_store(base_dir=base_dir, backend=backend)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(socket_path)
+            server.listen(16)
+            server.settimeout(idle_timeout)
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    conn.settimeout(CLIENT_TIMEOUT)
+                    try:
+                        with conn.makefile("r") as f:
+                            line = f.readline()
+                        request = json.loads(line)
+                    except (OSError, ValueError):
+                        continue
+                    if request.get("op") == "shutdown":
+                        conn.sendall(b'{"ok": true, "result": null}\n')
+                        break
+                    try:
+                        conn.sendall((json.dumps(_handle(store, request)) + "\n").encode())
+                    except OSError:
+                        continue
+        finally:
+            server.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+    return True
+
+
+def _request(base_dir, op):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    with sock:
+        sock.connect(os.path.join(base_dir, SOCKET_FILE))
+        sock.sendall((json.dumps({"op": op}) + "\n").encode())
+        with sock.makefile("r") as f:
+            return json.loads(f.readline())
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memory store daemon for self-improvement hooks")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    parser.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT)
+    args = parser.parse_args()
+    base_dir = os.environ.get("REFLECTIONS_DIR", DEFAULT_BASE_DIR)
+
+    if args.command == "serve":
+        if not serve(base_dir, idle_timeout=args.idle_timeout):
+            print("Error: a daemon is already running for this store", file=sys.stderr)
+            sys.exit(1)
+        return
+    try:
+        response = _request(base_dir, "ping" if args.command == "status" else "shutdown")
+    except (OSError, ValueError):
+        print(json.dumps({"running": False}))
+        return
+    if args.command == "status":
+        print(json.dumps({"running": True, **response["result"]}))
+    else:
+        print(json.dumps({"stopped": True}))
+
+
+if __name__ == "__main__":
+    main()
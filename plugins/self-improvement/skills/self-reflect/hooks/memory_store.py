@@ -1,269 +1,77 @@
 """
 Shared storage abstraction for the self-improvement v3 system.
-Manages signals.jsonl (ephemeral captures) and learnings/ (analyzed entries).
+Manages signals (ephemeral captures) and learnings/ (analyzed entries).
 Usable as Python module or CLI: python3 memory_store.py <command> [args]
+
+Storage is swappable: open_store() returns the JSONL store (jsonl_store.py, the
+default) or, with REFLECTIONS_BACKEND=sqlite, the SQLite store
+(sqlite_store.py). Both subclass signal_store.SignalStore, which holds the
+logic they share and defines the storage interface each implements, and
+`export`/`import` move signals between them losslessly.
+
+This file is kept small on purpose. Python recompiles the script it is started
+as on every run and caches bytecode only for imported modules, so the stores
+live in their own modules and every CLI call (one per hook, one per status
+line render) pays only for this file.
 """
 import json
 import os
 import sys
-from datetime import datetime, timezone
-
-
-SIGNALS_FILE = "signals.jsonl"
-LEARNINGS_DIR = "learnings"
-LEARNINGS_INDEX = "LEARNINGS.md"
-DEFAULT_BASE_DIR = os.path.expanduser("~/.claude/reflections")
-
-
-class MemoryStore:
-    def __init__(self, base_dir=None):
-        self.base_dir = base_dir or DEFAULT_BASE_DIR
-        self.signals_path = os.path.join(self.base_dir, SIGNALS_FILE)
-        self.learnings_dir = os.path.join(self.base_dir, LEARNINGS_DIR)
-        self.learnings_index = os.path.join(self.learnings_dir, LEARNINGS_INDEX)
-
-    def _ensure_dir(self):
-        os.makedirs(self.base_dir, exist_ok=True)
-
-    def _ensure_learnings_dir(self):
-        os.makedirs(self.learnings_dir, exist_ok=True)
-
-    def _next_id(self):
-        """Generate SIG-YYYYMMDD-NNNN id based on today's date and sequence."""
-        today = datetime.now(timezone.utc).strftime("%Y%m%d")
-        prefix = f"SIG-{today}-"
-        max_seq = 0
-        if os.path.exists(self.signals_path):
-            with open(self.signals_path, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        entry = json.loads(line)
-                        eid = entry.get("id", "")
-                        if eid.startswith(prefix):
-                            seq = int(eid[len(prefix):])
-                            max_seq = max(max_seq, seq)
-                    except (json.JSONDecodeError, ValueError):
-                        continue
-        return f"{prefix}{max_seq + 1:04d}"
-
-    def append(self, entry):
-        """Append a signal entry to signals.jsonl. Returns the complete entry with generated fields."""
-        self._ensure_dir()
-        now = datetime.now(timezone.utc)
-        complete = {
-            **entry,
-            "id": self._next_id(),
-            "version": 1,
-            "timestamp": now.isoformat(timespec="seconds").replace("+00:00", "Z"),
-            "category": entry.get("category", ""),
-            "tags": entry.get("tags", []),
-            "related": entry.get("related", []),
-            "promoted_to": entry.get("promoted_to", None),
-            "meta": entry.get("meta", {}),
-        }
-        # Prune old entries on append (14-day TTL)
-        self._prune_if_needed()
-        with open(self.signals_path, "a") as f:
-            f.write(json.dumps(complete) + "\n")
-        return complete
-
-    def get(self, entry_id):
-        """Fetch a single entry by ID. Returns None if not found."""
-        if not os.path.exists(self.signals_path):
-            return None
-        with open(self.signals_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                    if entry.get("id") == entry_id:
-                        return entry
-                except json.JSONDecodeError:
-                    continue
-        return None
-
-    def _prune_if_needed(self):
-        """Remove entries older than 14 days. Runs opportunistically."""
-        if not os.path.exists(self.signals_path):
-            return
-        # Only prune every ~50 appends (check file size as proxy)
-        try:
-            size = os.path.getsize(self.signals_path)
-            if size < 50000:  # ~50KB, skip pruning for small files
-                return
-        except OSError:
-            return
-        self.archive(days=14)
-
-    def _read_all(self):
-        """Read all entries from signals.jsonl."""
-        entries = []
-        if not os.path.exists(self.signals_path):
-            return entries
-        with open(self.signals_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entries.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-        return entries
-
-    def _write_all(self, entries):
-        """Overwrite signals.jsonl with the given entries."""
-        self._ensure_dir()
-        with open(self.signals_path, "w") as f:
-            for entry in entries:
-                f.write(json.dumps(entry) + "\n")
-
-    def query(self, status=None, entry_type=None, since=None, tags=None, session_id=None):
-        """Filter signals. Returns list of matching entries, oldest first."""
-        entries = self._read_all()
-        results = []
-        for e in entries:
-            if status and e.get("status") != status:
-                continue
-            if entry_type and e.get("type") != entry_type:
-                continue
-            if session_id and e.get("session_id") != session_id:
-                continue
-            if tags:
-                entry_tags = e.get("tags", [])
-                if not any(t in entry_tags for t in tags):
-                    continue
-            if since:
-                entry_ts = e.get("timestamp", "")
-                if entry_ts < since:
-                    continue
-            results.append(e)
-        return results
-
-    def update(self, entry_id, fields):
-        """Update fields on an existing entry. Rewrites the file. Returns updated entry or None."""
-        entries = self._read_all()
-        updated = None
-        for i, e in enumerate(entries):
-            if e.get("id") == entry_id:
-                entries[i] = {**e, **fields}
-                updated = entries[i]
-                break
-        if updated is None:
-            return None
-        self._write_all(entries)
-        return updated
-
-    def archive(self, days=14, status_filter=None):
-        """Remove entries older than `days` days. Returns count of removed entries."""
-        entries = self._read_all()
-        from datetime import timedelta
-        cutoff_dt = datetime.now(timezone.utc) - timedelta(days=days)
-        cutoff_ts = cutoff_dt.isoformat(timespec="seconds").replace("+00:00", "Z")
-
-        keep = []
-        removed = 0
-        for e in entries:
-            ts = e.get("timestamp", "")
-            entry_status = e.get("status", "")
-            # Never prune confirmed/promoted entries
-            if entry_status in ("promoted", "confirmed"):
-                keep.append(e)
-                continue
-            if status_filter and entry_status != status_filter:
-                keep.append(e)
-                continue
-            if ts < cutoff_ts:
-                removed += 1
-            else:
-                keep.append(e)
-        if removed > 0:
-            self._write_all(keep)
-        return removed
-
-    def stats(self, fmt=None):
-        """Return counts by status, type, category. If fmt='statusline', return compact string."""
-        entries = self._read_all()
-        by_status = {}
-        by_type = {}
-        by_category = {}
-        for e in entries:
-            s = e.get("status", "unknown")
-            t = e.get("type", "unknown")
-            c = e.get("category", "unknown")
-            by_status[s] = by_status.get(s, 0) + 1
-            by_type[t] = by_type.get(t, 0) + 1
-            by_category[c] = by_category.get(c, 0) + 1
-
-        result = {
-            "total": len(entries),
-            "by_status": by_status,
-            "by_type": by_type,
-            "by_category": by_category,
-        }
-        if fmt == "statusline":
-            pending = by_status.get("captured", 0) + by_status.get("analyzed", 0)
-            if pending == 0:
-                return ""
-            return f"reflect: {pending} pending"
-        return result
-
-    def promote(self, entry_id, target, content):
-        """Mark entry as promoted, record target, add to learnings index."""
-        updated = self.update(entry_id, {"status": "promoted", "promoted_to": target})
-        if updated is None:
-            return None
-        # Write to learnings index
-        self._ensure_learnings_dir()
-        lrn_id = updated["id"].replace("SIG", "LRN")
-        category = updated.get("category", "General")
-        category_title = category.replace("-", " ").replace("_", " ").title() if category else "General"
-
-        # Read or create learnings index
-        if os.path.exists(self.learnings_index):
-            with open(self.learnings_index, "r") as f:
-                index_content = f.read()
-        else:
-            index_content = "# Learnings\n"
-
-        # Find or create category section
-        section_header = f"## {category_title}"
-        if section_header not in index_content:
-            index_content = index_content.rstrip() + f"\n\n{section_header}\n"
-
-        # Append entry under section
-        entry_line = f"- [{lrn_id}] {content} (promoted to {target})\n"
-        # Insert after section header
-        pos = index_content.index(section_header) + len(section_header)
-        # Find next section or end
-        next_section = index_content.find("\n## ", pos)
-        if next_section == -1:
-            index_content = index_content.rstrip() + "\n" + entry_line
-        else:
-            index_content = index_content[:next_section].rstrip() + "\n" + entry_line + index_content[next_section:]
 
-        with open(self.learnings_index, "w") as f:
-            f.write(index_content)
+from jsonl_store import MemoryStore
+from signal_store import DEFAULT_BASE_DIR
+
+
+def open_store(base_dir=None, backend=None):
+    """Open the signal store with `backend` ("jsonl" or "sqlite"), default from REFLECTIONS_BACKEND."""
+    backend = backend or os.environ.get("REFLECTIONS_BACKEND") or "jsonl"
+    if backend == "jsonl":
+        return MemoryStore(base_dir=base_dir)
+    if backend == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(base_dir=base_dir)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def connect_store(base_dir=None, backend=None):
+    """Store for hooks: a memory_daemon.DaemonClient if REFLECTIONS_DAEMON is set, else open_store().
+
+    memory_daemon (and socket) is only imported when the daemon is enabled.
+    """
+    if os.environ.get("REFLECTIONS_DAEMON", "") not in ("", "0"):
+        from memory_daemon import DaemonClient, daemon_enabled
+        if daemon_enabled():
+            return DaemonClient(base_dir=base_dir, backend=backend)
+    return open_store(base_dir=base_dir, backend=backend)
 
-        return updated
+
+def statusline(base_dir=None, backend=None):
+    """Status bar summary ("reflect: N pending" or ""). The JSONL store reads only stats.json."""
+    return open_store(base_dir=base_dir, backend=backend).stats(fmt="statusline")
 
 
 def main():
+    # Fast paths for the status bar (every render) and append (every hook): skip argparse
+    if sys.argv[1:] == ["stats", "--format", "statusline"]:
+        print(statusline(os.environ.get("REFLECTIONS_DIR", DEFAULT_BASE_DIR)))
+        return
+    if len(sys.argv) == 3 and sys.argv[1] == "append":
+        store = connect_store(base_dir=os.environ.get("REFLECTIONS_DIR", DEFAULT_BASE_DIR))
+        print(json.dumps(store.append(json.loads(sys.argv[2]))))
+        return
+
     import argparse
 
     parser = argparse.ArgumentParser(description="Memory store CLI for self-improvement signals")
-    parser.add_argument("command", choices=["append", "query", "get", "update", "stats", "archive"])
+    parser.add_argument("command", choices=["append", "query", "get", "update", "stats", "archive", "compact",
+                                            "maintain", "promote", "learning", "recurrence", "export",
+                                            "import", "backfill"])
 
     # Allow remaining args for subcommands
     args, remaining = parser.parse_known_args()
 
     base_dir = os.environ.get("REFLECTIONS_DIR", DEFAULT_BASE_DIR)
-    store = MemoryStore(base_dir=base_dir)
+    store = connect_store(base_dir=base_dir)
 
     if args.command == "append":
         if not remaining:
@@ -280,12 +88,27 @@ def main():
         qparser.add_argument("--session")
         qparser.add_argument("--since")
         qparser.add_argument("--tags", nargs="*")
+        qparser.add_argument("--limit", type=int)
+        qparser.add_argument("--reverse", action="store_true", help="newest first")
+        qparser.add_argument("--fields", nargs="+", help="only output these fields")
+        qparser.add_argument("--ndjson", action="store_true", help="one JSON object per line")
+        qparser.add_argument("--include-archive", action="store_true", help="also search archived signals")
         qargs = qparser.parse_args(remaining)
-        results = store.query(
+        results = store.iter_query(
             status=qargs.status, entry_type=qargs.type,
-            session_id=qargs.session, since=qargs.since, tags=qargs.tags
+            session_id=qargs.session, since=qargs.since, tags=qargs.tags,
+            limit=qargs.limit, newest_first=qargs.reverse, fields=qargs.fields,
+            include_archive=qargs.include_archive
         )
-        print(json.dumps(results))
+        # Stream entries as they are read instead of building the whole list
+        if qargs.ndjson:
+            for entry in results:
+                sys.stdout.write(json.dumps(entry) + "\n")
+        else:
+            sys.stdout.write("[")
+            for i, entry in enumerate(results):
+                sys.stdout.write((", " if i else "") + json.dumps(entry))
+            sys.stdout.write("]\n")
 
     elif args.command == "get":
         if not remaining:
@@ -303,11 +126,26 @@ def main():
         result = store.update(uargs.entry_id, fields)
         print(json.dumps(result))
 
+    elif args.command == "promote":
+        pparser = argparse.ArgumentParser()
+        pparser.add_argument("entry_id")
+        pparser.add_argument("target")
+        pparser.add_argument("content")
+        pargs = pparser.parse_args(remaining)
+        print(json.dumps(store.promote(pargs.entry_id, pargs.target, pargs.content)))
+
+    elif args.command == "learning":
+        if not remaining:
+            print("Error: learning requires an LRN ID", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(store.get_learning(remaining[0])))
+
     elif args.command == "stats":
         sparser = argparse.ArgumentParser()
         sparser.add_argument("--format", dest="fmt")
+        sparser.add_argument("--recount", action="store_true")
         sargs = sparser.parse_args(remaining)
-        result = store.stats(fmt=sargs.fmt)
+        result = store.stats(fmt=sargs.fmt, recount=sargs.recount)
         if isinstance(result, str):
             print(result)
         else:
@@ -321,6 +159,66 @@ def main():
         removed = store.archive(days=aargs.days, status_filter=aargs.status)
         print(json.dumps({"removed": removed}))
 
+    elif args.command == "compact":
+        cparser = argparse.ArgumentParser()
+        cparser.add_argument("--if-needed", action="store_true")
+        cargs = cparser.parse_args(remaining)
+        if cargs.if_needed and not store.needs_compaction():
+            print(json.dumps({"compacted": 0}))
+            return
+        print(json.dumps({"compacted": store.compact()}))
+
+    elif args.command == "maintain":
+        mparser = argparse.ArgumentParser()
+        mparser.add_argument("--days", type=int, default=14)
+        margs = mparser.parse_args(remaining)
+        print(json.dumps(store.maintain(days=margs.days)))
+
+    elif args.command == "recurrence":
+        rparser = argparse.ArgumentParser()
+        rparser.add_argument("--type")
+        rparser.add_argument("--min-sessions", type=int, default=1)
+        rparser.add_argument("--limit", type=int)
+        rparser.add_argument("--pending", action="store_true", help="only signals still under review")
+        rargs = rparser.parse_args(remaining)
+        print(json.dumps(store.recurrence(entry_type=rargs.type, min_sessions=rargs.min_sessions,
+                                          limit=rargs.limit, pending=rargs.pending)))
+
+    elif args.command == "export":
+        eparser = argparse.ArgumentParser()
+        eparser.add_argument("--output", "-o")
+        eargs = eparser.parse_args(remaining)
+        out = open(eargs.output, "w") if eargs.output else sys.stdout
+        try:
+            for entry in store.export():
+                out.write(json.dumps(entry) + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    elif args.command == "import":
+        iparser = argparse.ArgumentParser()
+        iparser.add_argument("path", help="JSONL file from `export` or an old signals.jsonl; - for stdin")
+        iargs = iparser.parse_args(remaining)
+        src = sys.stdin if iargs.path == "-" else open(iargs.path, "r")
+        try:
+            entries = [json.loads(line) for line in src if line.strip()]
+        finally:
+            if src is not sys.stdin:
+                src.close()
+        print(json.dumps({"imported": store.import_entries(entries)}))
+
+    elif args.command == "backfill":
+        from backfill import BATCH_SIZE, DEFAULT_PROJECTS_DIR, Backfill
+        bparser = argparse.ArgumentParser()
+        bparser.add_argument("--projects-dir", default=DEFAULT_PROJECTS_DIR, help="where to look for transcripts")
+        bparser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+        bparser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="signals per append_many")
+        bargs = bparser.parse_args(remaining)
+        # The parent process writes every batch itself, so it needs the store, not the daemon
+        backfill = Backfill(open_store(base_dir=base_dir), projects_dir=bargs.projects_dir)
+        print(json.dumps(backfill.run(workers=bargs.workers, batch_size=bargs.batch_size)))
+
 
 if __name__ == "__main__":
     main()
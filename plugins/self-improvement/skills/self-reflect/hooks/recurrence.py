@@ -0,0 +1,196 @@
+"""
+Recurrence table for cross-session confidence, shared by the JSONL and SQLite stores.
+
+Every append records which signal it repeats (the exact fingerprint of the
+entry holding it after folding), the session it came from and when. Per
+fingerprint the table keeps the signal's type and content, the id of the entry
+holding it, the distinct session ids, first and last seen times and the total
+count. Rows outlive the 14-day prune, so a correction made in three sessions a
+month apart still ranks as recurring.
+
+Rows are sharded by the first hex digit of the fingerprint
+(recurrence/0.json ... recurrence/f.json). An append does not rewrite them: it
+adds one line per sighting to recurrence/log.jsonl, and maintain() folds the
+log into the shards. The log starts with a {"generation": g} header; each shard
+records how far into which generation it has folded ({"folded": [g, offset],
+"rows": {...}}), so readers apply only the lines after that, and a fold cut
+short by a crash neither loses nor double-counts sightings. ranked() reads
+the log, then every shard, and orders rows by distinct sessions, then count,
+then recency. A missing table is rebuilt from the hot store and the cold archive.
+"""
+import json
+import os
+
+RECURRENCE_DIR = "recurrence"
+LOG_FILE = "log.jsonl"
+
+
+def _confidence(sessions):
+    """SKILL.md's confidence levels: 1 session low, 2 medium, 3+ high."""
+    return "high" if sessions >= 3 else "medium" if sessions == 2 else "low"
+
+
+class Recurrence:
+    def __init__(self, store):
+        self.store = store
+        self.dir = os.path.join(store.base_dir, RECURRENCE_DIR)
+        self.log_path = os.path.join(self.dir, LOG_FILE)
+
+    def _path(self, shard):
+        return os.path.join(self.dir, f"{shard}.json")
+
+    def _load(self, shard):
+        """(folded, rows) of one shard: the [generation, offset] of the log folded into it, and its rows."""
+        try:
+            with open(self._path(shard), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None, {}
+        if not isinstance(data, dict):
+            return None, {}
+        if isinstance(data.get("rows"), dict):
+            return data.get("folded"), data["rows"]
+        return None, data  # rows only, written before the log existed
+
+    def _save(self, shard, rows, folded=None):
+        self.store._atomic_write(self._path(shard), json.dumps({"folded": folded, "rows": rows}))
+
+    def _read_log(self):
+        """(generation, [(offset after the line, sighting)]) of the sightings log."""
+        try:
+            with open(self.log_path, "rb") as f:
+                header = f.readline()
+                try:
+                    generation = json.loads(header)["generation"]
+                except (ValueError, TypeError, KeyError):
+                    return 0, []
+                lines, off = [], len(header)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # partial line from an in-flight append
+                    off += len(raw)
+                    try:
+                        lines.append((off, json.loads(raw)))
+                    except ValueError:
+                        continue
+                return generation, lines
+        except FileNotFoundError:
+            return 0, []
+
+    def _unfolded(self, shard, folded, log):
+        """Sightings of `shard` in the log that its rows do not include yet."""
+        generation, lines = log
+        start = folded[1] if isinstance(folded, list) and folded[0] == generation else 0
+        return [sighting for off, sighting in lines if off > start and sighting[0][0] == shard]
+
+    def _count(self, rows, holder, session_id, seen, n=1):
+        """Add `n` sightings of the signal held by `holder`."""
+        row = rows.setdefault(holder["fingerprint"]["exact"], {
+            "first_seen": seen, "last_seen": seen, "count": 0, "sessions": []})
+        row.update(type=holder.get("type"), content=holder.get("content"), entry_id=holder["id"])
+        row["count"] += n
+        row["first_seen"] = min(row["first_seen"], seen)
+        row["last_seen"] = max(row["last_seen"], seen)
+        if session_id and session_id not in row["sessions"]:
+            row["sessions"].append(session_id)
+
+    def _apply(self, rows, sightings):
+        for exact, entry_type, content, entry_id, session_id, seen in sightings:
+            holder = {"fingerprint": {"exact": exact}, "type": entry_type, "content": content, "id": entry_id}
+            self._count(rows, holder, session_id, seen)
+
+    def record(self, pairs, timestamp):
+        """Log appended entries. `pairs` are (appended entry, entry holding it). Caller holds the write lock."""
+        from signal_store import UNFOLDED_TYPES
+        if not os.path.isdir(self.dir):
+            self.rebuild()  # the scan already includes this append
+            return
+        lines = [json.dumps([holder["fingerprint"]["exact"], holder.get("type"), holder.get("content"),
+                             holder["id"], entry.get("session_id"), timestamp]) + "\n"
+                 for entry, holder in pairs
+                 if holder.get("fingerprint") and holder.get("type") not in UNFOLDED_TYPES]
+        if not lines:
+            return
+        if not os.path.exists(self.log_path):
+            lines.insert(0, json.dumps({"generation": 1}) + "\n")
+        with open(self.log_path, "a") as f:
+            f.write("".join(lines))
+
+    def fold(self):
+        """Fold the sightings log into the shards and start a new, empty log. Caller holds the write lock.
+
+        Returns the number of sightings folded.
+        """
+        log = self._read_log()
+        generation, lines = log
+        if not lines:
+            return 0
+        end = lines[-1][0]
+        folded = 0
+        for shard in sorted({sighting[0][0] for _, sighting in lines}):
+            marker, rows = self._load(shard)
+            sightings = self._unfolded(shard, marker, log)
+            if sightings:
+                self._apply(rows, sightings)
+                self._save(shard, rows, [generation, end])
+                folded += len(sightings)
+        # Shards now hold everything in this generation; readers of the next one start at its header
+        self.store._atomic_write(self.log_path, json.dumps({"generation": generation + 1}) + "\n")
+        return folded
+
+    def rebuild(self):
+        """Rebuild the table from the hot entries and the cold archive. Caller holds the write lock."""
+        from cold_archive import ColdArchive
+        from fingerprint import fingerprint
+        from signal_store import UNFOLDED_TYPES
+        shards = {}
+        hot = list(self.store.export())
+        live = {e.get("id") for e in hot}
+        cold = (e for e in ColdArchive(self.store).iter_entries() if e.get("id") not in live)
+        for e in (*hot, *cold):
+            fp = e.get("fingerprint") or fingerprint(e.get("content"))
+            if not fp or e.get("type") in UNFOLDED_TYPES or not isinstance(e.get("id"), str):
+                continue
+            rows = shards.setdefault(fp["exact"][0], {})
+            first = e.get("first_seen") or e.get("timestamp") or ""
+            # A folded entry lists every session its repeats came from
+            sessions = e.get("sessions") or [e.get("session_id")]
+            self._count(rows, {**e, "fingerprint": fp}, sessions[0], first, e.get("occurrences", 1))
+            row = rows[fp["exact"]]
+            row["last_seen"] = max(row["last_seen"], e.get("last_seen") or first)
+            row["sessions"].extend(s for s in dict.fromkeys(sessions[1:]) if s and s not in row["sessions"])
+        os.makedirs(self.dir, exist_ok=True)
+        for shard, rows in shards.items():
+            self._save(shard, rows)  # no log yet: the first append starts generation 1
+
+    def ranked(self, entry_type=None, min_sessions=1, limit=None, pending=False):
+        """Rows ordered by distinct sessions, count and recency, with a confidence level each.
+
+        pending=True keeps only rows whose entry is still under review (captured or analyzed).
+        """
+        from signal_store import FOLDABLE_STATUSES
+        if not os.path.isdir(self.dir):
+            with self.store._lock():
+                if not os.path.isdir(self.dir):
+                    self.rebuild()
+        log = self._read_log()  # before the shards, so a concurrent fold is never missed
+        shards = {name[:-len(".json")] for name in os.listdir(self.dir) if name.endswith(".json")}
+        shards.update(sighting[0][0] for _, sighting in log[1])
+        rows = []
+        for shard in sorted(shards):
+            folded, shard_rows = self._load(shard)
+            self._apply(shard_rows, self._unfolded(shard, folded, log))
+            for key, row in shard_rows.items():
+                if (not entry_type or row.get("type") == entry_type) and len(row["sessions"]) >= min_sessions:
+                    rows.append({"fingerprint": key, **row})
+        rows.sort(key=lambda r: (len(r["sessions"]), r["count"], r["last_seen"]), reverse=True)
+        ranked = []
+        for row in rows:
+            if limit is not None and len(ranked) >= limit:
+                break
+            if pending:
+                entry = self.store.get(row["entry_id"])
+                if entry is None or entry.get("status") not in FOLDABLE_STATUSES:
+                    continue
+            ranked.append({**row, "confidence": _confidence(len(row["sessions"]))})
+        return ranked
@@ -0,0 +1,106 @@
+"""
+Running per-session transcript digest behind the session summary.
+
+The SessionEnd summary (capture-session-summary.py) counts turns, tool calls
+and the files they touched over the whole transcript. Rather than re-read the
+transcript at the end of every session, the digest keeps those running totals
+in the session's state file (session_state.py) under "summary": the transcript
+path, the byte offset processed so far, the turn count, every tool's call
+count and every file touched. Whichever hook runs first folds in the lines
+appended since the last one with update_digest(): capture-signals.py does at
+each PreCompact, so by SessionEnd only the tail of the session is left to read.
+
+The digest keeps full counts and the full file set; summarize() applies the
+summary's top-10 and 20-file caps, so a digest built in several steps gives
+the same summary as one pass over the whole transcript.
+"""
+import os
+
+from transcript_io import complete_end, decode_at, iter_entries, iter_lines, key_offsets, key_pattern, line_role
+
+# The summary reads the role and the tool call's name and input, never its result
+TOOL_KEYS = ("tool_use", "name", "input")
+SUMMARY_KEYS = key_pattern(*TOOL_KEYS)
+FILE_KEYS = ("file_path", "path", "file")
+
+
+def stand_in(line):
+    """The role and tool name/input of a transcript line, or None to decode it in full."""
+    role = line_role(line)
+    if role is None:
+        return None
+    keys = key_offsets(line, SUMMARY_KEYS)
+    if "tool_use" not in keys:
+        return {"role": role}
+    if not all(len(keys.get(key, ())) == 1 for key in TOOL_KEYS):
+        return None  # a nested "name" or "input" could be mistaken for the tool's
+    try:
+        return {"role": role, "tool_use": {"name": decode_at(line, keys["name"][0]),
+                                           "input": decode_at(line, keys["input"][0])}}
+    except ValueError:
+        return None
+
+
+def new_digest(path=None):
+    return {"path": path, "offset": 0, "turn_count": 0, "tools_used": {}, "files_touched": []}
+
+
+def add_entries(digest, transcript):
+    """Fold transcript entries into `digest` in place and return it."""
+    tools_used = digest["tools_used"]
+    files_touched = set(digest["files_touched"])
+    turn_count = digest["turn_count"]
+
+    for entry in transcript:
+        role = entry.get("role", "")
+        if role in ("user", "assistant"):
+            turn_count += 1
+
+        tool = entry.get("tool_use", {})
+        if isinstance(tool, dict) and tool.get("name"):
+            tools_used[tool["name"]] = tools_used.get(tool["name"], 0) + 1
+            # Track files from Read, Edit, Write, Glob
+            tool_input = tool.get("input", {})
+            if isinstance(tool_input, dict):
+                for key in FILE_KEYS:
+                    if key in tool_input and tool_input[key]:
+                        files_touched.add(tool_input[key])
+
+    digest["turn_count"] = turn_count
+    digest["files_touched"] = sorted(files_touched)
+    return digest
+
+
+def summarize(digest):
+    """The session summary for a digest: turn count, top 10 tools, first 20 files."""
+    # Most calls first, ties in first-seen order like Counter.most_common()
+    tools = sorted(digest["tools_used"].items(), key=lambda item: -item[1])[:10]
+    return {
+        "turn_count": digest["turn_count"],
+        "tools_used": dict(tools),
+        "files_touched": digest["files_touched"][:20],  # Cap at 20
+    }
+
+
+def extract_summary(transcript):
+    """Extract session metadata from transcript entries."""
+    return summarize(add_entries(new_digest(), transcript))
+
+
+def update_digest(session_state, transcript_path):
+    """Fold the lines appended to the transcript since the last hook into session_state["summary"].
+
+    Returns the digest. A digest for another path, or past the end of a rewritten
+    transcript, starts over from the beginning. A trailing line still being
+    written is left for the next call. The caller saves session_state.
+    """
+    digest = session_state.get("summary")
+    if not digest or digest.get("path") != transcript_path \
+            or digest.get("offset", 0) > os.path.getsize(transcript_path):
+        digest = new_digest(transcript_path)
+    end = complete_end(transcript_path, digest["offset"])
+    if end > digest["offset"]:
+        add_entries(digest, iter_entries(iter_lines(transcript_path, digest["offset"], end), stand_in))
+        digest["offset"] = end
+    session_state["summary"] = digest
+    return digest
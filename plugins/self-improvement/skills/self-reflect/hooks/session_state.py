@@ -0,0 +1,115 @@
+"""
+Per-session hook state for the self-improvement hooks.
+
+Hooks that read a session's transcript keep a small JSON file per session in
+the reflections directory (sessions/<session_id>.json), so the next run can
+resume where the last one stopped instead of re-reading the whole
+transcript. Each hook owns one section of the file; capture-signals.py keeps
+its checkpoint under "signals": the transcript path, the byte offset and
+entry index it has processed up to, and its detectors' carried state. The
+running summary counts (session_digest.py) are under "summary" and are
+advanced by whichever hook reads the transcript.
+
+Files are replaced atomically. A missing or unreadable file means "start from
+the beginning", so deleting sessions/ is always safe.
+
+maintain() drops state files not written for the prune window. Their
+transcript paths, and which sections covered them, move to
+captured_sessions.json, so backfill still knows the hooks captured them.
+"""
+import json
+import os
+import re
+import time
+
+SESSIONS_DIR = "sessions"
+CAPTURED_FILE = "captured_sessions.json"  # next to sessions/, never a session's name
+SECTIONS = ("signals", "summary")
+
+
+def _path(base_dir, session_id):
+    return os.path.join(base_dir, SESSIONS_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", session_id) + ".json")
+
+
+def load_session_state(base_dir, session_id):
+    """The session's state dict, or {} if there is none yet."""
+    try:
+        with open(_path(base_dir, session_id), "r") as f:
+            state = json.load(f)
+        if isinstance(state, dict):
+            return state
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def load_captured(base_dir):
+    """{transcript path: [section, ...]} of the state files prune_session_states() dropped."""
+    try:
+        with open(os.path.join(base_dir, CAPTURED_FILE), "r") as f:
+            captured = json.load(f)
+        if isinstance(captured, dict):
+            return captured
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def prune_session_states(base_dir, days=14):
+    """Drop state files not written for `days` days. Returns how many were dropped.
+
+    The transcripts they covered are recorded in captured_sessions.json first. Caller holds
+    the store's write lock.
+    """
+    sessions_dir = os.path.join(base_dir, SESSIONS_DIR)
+    cutoff = time.time() - days * 86400
+    old = []
+    try:
+        names = os.listdir(sessions_dir)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(sessions_dir, name)
+        if not name.endswith((".json", ".tmp")):
+            continue
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                old.append(path)
+        except OSError:
+            continue
+    if not old:
+        return 0
+    captured = load_captured(base_dir)
+    for path in old:
+        if path.endswith(".json"):
+            try:
+                with open(path, "r") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for section in SECTIONS:
+                transcript = state.get(section, {}).get("path") if isinstance(state, dict) else None
+                if isinstance(transcript, str):
+                    covered = captured.setdefault(transcript, [])
+                    if section not in covered:
+                        covered.append(section)
+    save_path = os.path.join(base_dir, CAPTURED_FILE)
+    tmp_path = f"{save_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(captured, f)
+    os.replace(tmp_path, save_path)
+    for path in old:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(old)
+
+
+def save_session_state(base_dir, session_id, state):
+    path = _path(base_dir, session_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,82 @@
+"""
+Multi-pattern keyword matcher for the capture hooks.
+
+A RuleMatcher takes rule lists per category ({"correction": [pattern, ...]})
+and compiles each category into one alternation with a named group per rule,
+matched case-insensitively. classify() returns, for every category a message
+matches, the rules that fired.
+
+Most messages match nothing, so each rule also gets a required literal: the
+longest run of plain text every match must contain ("that's outdated",
+"instead"). A category's pattern only runs on messages holding one of its
+literals, found with plain substring search on the lowercased message.
+Compilation waits for the first classify() call, so hook runs that exit early
+never pay for it.
+
+A category is reported whenever any of its rules matches. Where two rules of
+one category match at the same position, only the first listed is reported.
+"""
+import re
+
+_QUANTIFIERS = "?*{"
+
+
+def required_literal(rule):
+    """Longest lowercase literal every match of `rule` contains, or "" if none can be derived."""
+    if "|" in rule or any(f"){q}" in rule for q in _QUANTIFIERS):
+        return ""  # alternation or optional group: no single required run
+    best, run, i = "", "", 0
+    while i < len(rule):
+        c = rule[i]
+        if c == "\\":
+            escaped = rule[i + 1:i + 2]
+            i += 2
+            if escaped and not escaped.isalnum():
+                run += escaped
+                continue
+        elif c in _QUANTIFIERS:
+            run = run[:-1]  # the quantified character may be absent
+            if c == "{":
+                i = rule.index("}", i)
+            i += 1
+        elif c in "()[].^$+":
+            if c == "[":
+                i = rule.index("]", i)
+            i += 1
+        else:
+            run += c.lower()
+            i += 1
+            continue
+        best = max(best, run, key=len)
+        run = ""
+    return max(best, run, key=len)
+
+
+class RuleMatcher:
+    def __init__(self, categories):
+        self.categories = {name: list(rules) for name, rules in categories.items()}
+        self._compiled = None
+
+    def _compile(self):
+        compiled = {}
+        for name, rules in self.categories.items():
+            alternation = "|".join(f"(?P<r{i}>{rule})" for i, rule in enumerate(rules))
+            literals = {required_literal(rule) for rule in rules}
+            # A rule without a literal could match anywhere: always run the pattern
+            compiled[name] = (re.compile(alternation, re.IGNORECASE), None if "" in literals else tuple(literals))
+        self._compiled = compiled
+        return compiled
+
+    def classify(self, text):
+        """{category: [rules that fired, in rule order]} for the categories `text` matches."""
+        compiled = self._compiled or self._compile()
+        lower = text.lower()
+        hits = {}
+        for name, (pattern, literals) in compiled.items():
+            if literals is not None and not any(literal in lower for literal in literals):
+                continue
+            fired = {int(m.lastgroup[1:]) for m in pattern.finditer(text)}
+            if fired:
+                rules = self.categories[name]
+                hits[name] = [rules[i] for i in sorted(fired)]
+        return hits
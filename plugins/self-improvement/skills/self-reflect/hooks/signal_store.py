@@ -0,0 +1,460 @@
+"""
+Backend-neutral base of the self-improvement signal stores.
+
+SignalStore holds everything that does not depend on how signals are kept on
+disk: completing new entries, folding repeated signals into the entry already
+holding them, the recurrence table, streaming queries with limit, order and
+projection over the hot store and the cold archive, deferred maintenance,
+promotion to learnings, and the store-wide write lock. The JSONL store
+(jsonl_store.MemoryStore) and the SQLite store (sqlite_store.SqliteStore)
+subclass it and implement the storage interface below.
+
+Storage interface:
+  _migrate_legacy()                 import a single-file signals.jsonl from older versions
+  _write_transaction()              context manager around one write; the lock is held inside
+  _allocate_ids(count)              reserve `count` consecutive SIG-YYYYMMDD-NNNN ids
+  _insert(entries)                  store completed entries that have their ids
+  _fingerprint_candidates(fp, type)  ids of stored entries that may repeat a signal
+  _iter_hot(**filters, newest_first)  matching entries from the hot store
+  get, update, archive, compact, needs_compaction, prune_due, stats, export, import_entries
+
+Concurrency: every writer holds an exclusive flock on signals.lock, which also
+guards the sidecars shared by both backends (recurrence/, archive/, learnings/).
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from fingerprint import fingerprint, index_keys, same_content
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-writer assumed
+    fcntl = None
+
+
+SIGNALS_FILE = "signals.jsonl"  # single-file layout of older versions
+LOCK_FILE = "signals.lock"
+PROTECTED_STATUSES = ("promoted", "confirmed")
+FOLDABLE_STATUSES = ("captured", "analyzed")  # later repeats fold into entries still under review
+UNFOLDED_TYPES = ("summary",)
+STATS_FIELDS = (("by_status", "status"), ("by_type", "type"), ("by_category", "category"))
+LEARNINGS_DIR = "learnings"
+LEARNINGS_INDEX = "LEARNINGS.md"
+DEFAULT_BASE_DIR = os.path.expanduser("~/.claude/reflections")
+
+_SIG_DATE = re.compile(r"^SIG-(\d{4})(\d{2})(\d{2})-")
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+# --- Log records ---
+#
+# Append-only logs (the JSONL segments, the legacy signals.jsonl) hold full
+# entries plus small delta records written by update() ({"op": "update", "id",
+# "fields"}) and archive() ({"op": "delete", "id"}). Readers fold them into the
+# current view.
+
+def _apply_record(current, record):
+    """Fold one log record into `current` (the entry so far, or None). Returns the new entry."""
+    op = record.get("op")
+    if op == "update":
+        return {**current, **record.get("fields", {})} if current is not None else None
+    if op == "delete":
+        return None
+    return record
+
+
+def _read_log(path):
+    """Read all entries in a JSONL log, with update and delete records applied."""
+    entries = {}
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        return []
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            eid = record.get("id")
+            if record.get("op"):
+                entry = _apply_record(entries.get(eid), record)
+                if entry is None:
+                    entries.pop(eid, None)
+                else:
+                    entries[eid] = entry
+            else:
+                entries[eid] = record
+    return list(entries.values())
+
+
+def _last_seen(e):
+    """When an entry was last seen: its latest folded repeat, else its own timestamp. Pruning goes by this."""
+    return e.get("last_seen") or e.get("timestamp") or ""
+
+
+def _cutoff(days):
+    """ISO timestamp `days` days ago; entries stamped before it are prunable."""
+    from datetime import timedelta
+    cutoff_dt = datetime.now(timezone.utc) - timedelta(days=days)
+    return cutoff_dt.isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def _matches(e, status=None, entry_type=None, since=None, tags=None, session_id=None):
+    """Check an entry against query() filters."""
+    if status and e.get("status") != status:
+        return False
+    if entry_type and e.get("type") != entry_type:
+        return False
+    if session_id and e.get("session_id") != session_id and session_id not in (e.get("sessions") or ()):
+        return False
+    if tags:
+        entry_tags = e.get("tags", [])
+        if not any(t in entry_tags for t in tags):
+            return False
+    if since:
+        entry_ts = e.get("timestamp", "")
+        if entry_ts < since:
+            return False
+    return True
+
+
+def _project(entry, fields):
+    """Restrict `entry` to `fields` (all fields if None), keeping only keys it has."""
+    if not fields:
+        return entry
+    return {k: entry[k] for k in fields if k in entry}
+
+
+def _day_name(record):
+    """UTC day a record belongs to: the date in its SIG id, else its timestamp's date."""
+    m = _SIG_DATE.match(str(record.get("id", "")))
+    if m:
+        return "-".join(m.groups())
+    day = str(record.get("timestamp") or "")[:10]
+    return day if _DAY.match(day) else "undated"
+
+
+def _statusline(counts):
+    pending = counts["by_status"].get("captured", 0) + counts["by_status"].get("analyzed", 0)
+    if pending == 0:
+        return ""
+    return f"reflect: {pending} pending"
+
+
+class SignalStore:
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or DEFAULT_BASE_DIR
+        self.signals_path = os.path.join(self.base_dir, SIGNALS_FILE)
+        self.lock_path = os.path.join(self.base_dir, LOCK_FILE)
+        self._lock_depth = 0
+        self.learnings_dir = os.path.join(self.base_dir, LEARNINGS_DIR)
+        self.learnings_index = os.path.join(self.learnings_dir, LEARNINGS_INDEX)
+
+    def _ensure_dir(self):
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @contextmanager
+    def _lock(self):
+        """Hold an exclusive advisory lock on the store for the duration of the block. Reentrant."""
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        self._ensure_dir()
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _atomic_write(self, path, data, durable=False):
+        """Replace `path` with `data` (str or bytes) via temp file + rename so readers never see a partial file.
+
+        With durable=True the temp file is fsynced first, so a crash cannot leave an empty file behind.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    # --- Storage interface ---
+
+    def _migrate_legacy(self):
+        raise NotImplementedError
+
+    def _write_transaction(self):
+        """Context manager for one write. The default holds the store lock."""
+        return self._lock()
+
+    def _allocate_ids(self, count=1):
+        raise NotImplementedError
+
+    def _insert(self, entries):
+        raise NotImplementedError
+
+    def _fingerprint_candidates(self, fp, entry_type):
+        """Ids of stored entries of `entry_type` that may repeat fingerprint `fp`, best matches first.
+
+        May include entries that are not repeats; _duplicate_of() checks each one.
+        """
+        raise NotImplementedError
+
+    def _iter_hot(self, status=None, entry_type=None, since=None, tags=None, session_id=None,
+                  newest_first=False):
+        raise NotImplementedError
+
+    def get(self, entry_id):
+        """Fetch a single entry by ID. Returns None if not found."""
+        raise NotImplementedError
+
+    def update(self, entry_id, fields):
+        """Update fields on an existing entry. Returns updated entry or None."""
+        raise NotImplementedError
+
+    def archive(self, days=14, status_filter=None):
+        """Move entries not seen for `days` days to the cold archive. Returns count removed."""
+        raise NotImplementedError
+
+    def compact(self):
+        raise NotImplementedError
+
+    def needs_compaction(self):
+        raise NotImplementedError
+
+    def prune_due(self, days=14):
+        """True when archive(days) would remove at least one entry."""
+        raise NotImplementedError
+
+    def stats(self, fmt=None, recount=False):
+        raise NotImplementedError
+
+    def export(self):
+        """Yield every entry, oldest first, exactly as stored."""
+        raise NotImplementedError
+
+    def import_entries(self, entries):
+        raise NotImplementedError
+
+    # --- Appends ---
+
+    def _next_id(self):
+        """Generate SIG-YYYYMMDD-NNNN id based on today's date and sequence."""
+        return self._allocate_ids(1)[0]
+
+    def _complete(self, entry, entry_id, timestamp):
+        """Fill in generated and default fields for a new signal entry."""
+        return {
+            **entry,
+            "id": entry_id,
+            "version": 1,
+            "timestamp": timestamp,
+            "category": entry.get("category", ""),
+            "tags": entry.get("tags", []),
+            "related": entry.get("related", []),
+            "promoted_to": entry.get("promoted_to", None),
+            "meta": entry.get("meta", {}),
+            "occurrences": entry.get("occurrences", 1),
+            "fingerprint": fingerprint(entry.get("content")),
+        }
+
+    def append(self, entry):
+        """Append a signal entry to the store. Returns the complete entry with generated fields."""
+        return self.append_many([entry])[0]
+
+    def append_many(self, entries, seen=None):
+        """Append several signal entries in one write. Returns the complete entries, in order.
+
+        `seen` (ISO 8601) is when the signals occurred, if earlier than now: backfill
+        passes the transcript's time. The entries are still stamped and dated now, so
+        they stay in the hot store for review like fresh captures; `seen` is kept as
+        their `first_seen` and is what folding and the recurrence table record.
+
+        An entry repeating one still under review (same type, same or nearly the same
+        content) is folded into it instead: the existing entry's `occurrences` and
+        `last_seen` are updated, a repeat from another session is added to its
+        `sessions` list, and it is returned in place of a new one. Ids are
+        allocated as one contiguous range for the rest. Appends never prune; see maintain().
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+        self._ensure_dir()
+        self._migrate_legacy()
+        now = datetime.now(timezone.utc)
+        timestamp = now.isoformat(timespec="seconds").replace("+00:00", "Z")
+        with self._write_transaction():
+            completed = [self._complete(e, None, timestamp) for e in entries]
+            if seen:
+                for e in completed:
+                    e["first_seen"] = seen
+            fresh, results = self._fold_duplicates(completed, seen or timestamp)
+            if fresh:
+                for e, eid in zip(fresh, self._allocate_ids(len(fresh))):
+                    e["id"] = eid
+                self._insert(fresh)
+            self._record_recurrence(zip(completed, results), seen or timestamp)
+        return results
+
+    def _fold_duplicates(self, completed, seen):
+        """Split new entries into ones to write and ones repeating an existing entry. Lock must be held.
+
+        Returns (fresh, results): the entries to write, and per input entry the entry
+        that now holds it. Folded repeats update their target before returning.
+        """
+        fresh, results, folded = [], [], {}
+        filed = {}  # index key -> fresh entries filed under it
+        for entry in completed:
+            target = self._duplicate_of(entry, filed, folded)
+            if target is None:
+                fresh.append(entry)
+                results.append(entry)
+                if entry.get("fingerprint"):
+                    for key in index_keys(entry["fingerprint"]):
+                        filed.setdefault(key, []).append(entry)
+                continue
+            target["occurrences"] = target.get("occurrences", 1) + 1
+            target["last_seen"] = max(target.get("last_seen") or target.get("timestamp") or "", seen)
+            session = entry.get("session_id")
+            if session and session != target.get("session_id") and session not in target.get("sessions", ()):
+                # Keep the repeat findable by its own session: query(session_id=) matches these too
+                target["sessions"] = [*(target.get("sessions") or [target.get("session_id")]), session]
+            if target.get("id") is not None:  # a stored entry; fresh ones get ids after folding
+                folded[target["id"]] = target
+            results.append(target)
+        for entry_id, target in folded.items():
+            fields = {"occurrences": target["occurrences"], "last_seen": target["last_seen"]}
+            if "sessions" in target:
+                fields["sessions"] = target["sessions"]
+            self.update(entry_id, fields)
+        return fresh, results
+
+    def _duplicate_of(self, entry, filed, folded):
+        """The entry `entry` repeats: one from this batch or a stored one still under review.
+
+        `filed` maps index keys to the batch's fresh entries, so only entries sharing a
+        key with `entry` are compared.
+        """
+        fp = entry.get("fingerprint")
+        if not fp or entry.get("type") in UNFOLDED_TYPES:
+            return None
+        keys = index_keys(fp)
+        candidates = list({id(e): e for key in keys for e in filed.get(key, ())}.values())
+        for entry_id in self._fingerprint_candidates(fp, entry.get("type")):
+            candidates.append(folded.get(entry_id) or self.get(entry_id))
+        for other in candidates:
+            if other is None or other.get("type") != entry.get("type") \
+                    or other.get("status") not in FOLDABLE_STATUSES:
+                continue
+            other_fp = other.get("fingerprint") or fingerprint(other.get("content"))
+            if other_fp and same_content(fp, other_fp):
+                return other
+        return None
+
+    def _record_recurrence(self, pairs, timestamp):
+        from recurrence import Recurrence
+        Recurrence(self).record(pairs, timestamp)
+
+    def recurrence(self, entry_type=None, min_sessions=1, limit=None, pending=False):
+        """Signals ranked by recurrence across sessions, most recurrent first (see recurrence.py).
+
+        Each row has the signal's type, content, entry_id, sessions, count, first_seen,
+        last_seen and a confidence level. pending=True keeps signals still under review.
+        """
+        from recurrence import Recurrence
+        return Recurrence(self).ranked(entry_type=entry_type, min_sessions=min_sessions,
+                                       limit=limit, pending=pending)
+
+    # --- Queries ---
+
+    def query(self, status=None, entry_type=None, since=None, tags=None, session_id=None):
+        """Filter signals. Returns list of matching entries, oldest first."""
+        return list(self.iter_query(status=status, entry_type=entry_type, since=since,
+                                    tags=tags, session_id=session_id))
+
+    def iter_query(self, status=None, entry_type=None, since=None, tags=None, session_id=None,
+                   limit=None, newest_first=False, fields=None, include_archive=False):
+        """Yield matching entries one at a time, oldest first (newest first with newest_first=True).
+
+        Hot entries are read lazily and reading stops once `limit` entries are out, so
+        "the last 20 signals" only touches the newest ones. `fields` projects each
+        entry onto those keys. With include_archive=True, signals moved to the cold
+        archive are included too; archive files are only decompressed once the hot
+        entries are exhausted (newest first) or before them (oldest first), and only
+        for days inside the `since` range.
+        """
+        if limit is not None and limit <= 0:
+            return
+        filters = dict(status=status, entry_type=entry_type, since=since, tags=tags, session_id=session_id)
+        entries = self._iter_hot(newest_first=newest_first, **filters)
+        if include_archive:
+            from itertools import chain
+            from cold_archive import ColdArchive
+            # A crash between archiving and deleting can leave an entry in both; the hot copy wins
+            cold = (e for e in ColdArchive(self).iter_entries(since=since, newest_first=newest_first)
+                    if _matches(e, **filters) and self.get(e["id"]) is None)
+            entries = chain(entries, cold) if newest_first else chain(cold, entries)
+        count = 0
+        for e in entries:
+            yield _project(e, fields)
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    # --- Maintenance ---
+
+    def maintain(self, days=14):
+        """Deferred housekeeping: prune past `days` if due, compact if needed, fold the recurrence log
+        and drop hook state of sessions not active for `days` days.
+
+        Run off the capture hot path (the SessionEnd hook, or `memory_store.py
+        maintain`). Returns {"archived": n, "compacted": n}.
+        """
+        archived = self.archive(days=days) if self.prune_due(days) else 0
+        compacted = self.compact() if self.needs_compaction() else 0
+        from recurrence import Recurrence
+        from session_state import prune_session_states
+        with self._lock():
+            Recurrence(self).fold()
+            prune_session_states(self.base_dir, days)
+        return {"archived": archived, "compacted": compacted}
+
+    # --- Learnings ---
+
+    def promote(self, entry_id, target, content):
+        """Mark entry as promoted, record target, add to the learnings store and LEARNINGS.md."""
+        with self._lock():
+            return self._promote(entry_id, target, content)
+
+    def _promote(self, entry_id, target, content):
+        updated = self.update(entry_id, {"status": "promoted", "promoted_to": target})
+        if updated is None:
+            return None
+        from learnings import Learnings
+        lrn_id = updated["id"].replace("SIG", "LRN")
+        Learnings(self).add(lrn_id, content, target, updated.get("category", ""))
+        return updated
+
+    def get_learning(self, lrn_id):
+        """Fetch a promoted learning by LRN id from the learnings store. Returns None if not found."""
+        from learnings import Learnings
+        return Learnings(self).get(lrn_id)
@@ -0,0 +1,349 @@
+"""
+SQLite backend for the self-improvement signal store.
+Selected with REFLECTIONS_BACKEND=sqlite (or open_store(backend="sqlite")).
+
+Signals live in one database, signals.db, in WAL mode so readers never wait on
+a writer. Each row keeps the full entry as JSON (lossless round trips through
+export/import) next to indexed copies of the fields queries filter on: id,
+status, type, session_id and timestamp. Tags go in a join table, and so do
+the sessions of folded repeats and the content fingerprint keys used to fold
+repeated signals (fingerprint.py). Every write is
+a single BEGIN IMMEDIATE transaction, so concurrent hook processes serialize
+inside SQLite and id allocation stays unique.
+
+SqliteStore implements the storage interface of signal_store.SignalStore;
+folding, queries, maintenance and promotion come from there. Learnings
+(LEARNINGS.md), the recurrence table (recurrence.py), the cold archive of pruned
+signals (cold_archive.py) and the CLI are shared with the JSONL store.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from fingerprint import fingerprint, index_keys
+from signal_store import PROTECTED_STATUSES, STATS_FIELDS, SignalStore, _cutoff, _read_log, _statusline
+
+DB_FILE = "signals.db"
+SCHEMA_VERSION = 3
+COLUMNS = ("status", "type", "category", "session_id", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    type TEXT,
+    category TEXT,
+    session_id TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signals_status ON signals (status);
+CREATE INDEX IF NOT EXISTS signals_type ON signals (type);
+CREATE INDEX IF NOT EXISTS signals_session ON signals (session_id);
+CREATE INDEX IF NOT EXISTS signals_timestamp ON signals (timestamp);
+CREATE TABLE IF NOT EXISTS signal_tags (
+    tag TEXT NOT NULL,
+    id TEXT NOT NULL REFERENCES signals (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signal_tags_id ON signal_tags (id);
+CREATE TABLE IF NOT EXISTS signal_fingerprints (
+    key TEXT NOT NULL,
+    id TEXT NOT NULL REFERENCES signals (id) ON DELETE CASCADE,
+    PRIMARY KEY (key, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signal_fingerprints_id ON signal_fingerprints (id);
+CREATE TABLE IF NOT EXISTS signal_sessions (
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL REFERENCES signals (id) ON DELETE CASCADE,
+    PRIMARY KEY (session_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signal_sessions_id ON signal_sessions (id);
+CREATE TABLE IF NOT EXISTS sequence (
+    day TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+
+def _column(entry, field):
+    """Indexed column value for `field`: scalars as-is, anything else as JSON, NULL if missing."""
+    value = entry.get(field)
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value)
+
+
+class SqliteStore(SignalStore):
+    def __init__(self, base_dir=None):
+        super().__init__(base_dir=base_dir)
+        self.db_path = os.path.join(self.base_dir, DB_FILE)
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._ensure_dir()
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._upgrade(conn)
+            self._conn = conn
+        return self._conn
+
+    def _upgrade(self, conn):
+        """Create or upgrade the schema in one write transaction, re-checking the version under the lock."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                if version and version < 3:
+                    rows = [json.loads(data) for (data,) in conn.execute("SELECT data FROM signals")]
+                    if version == 1:
+                        # Fingerprints arrived in version 2: file the rows written before
+                        self._insert_fingerprints(conn, rows)
+                    # Folded sessions arrived in version 3
+                    self._insert_sessions(conn, rows)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def _write_transaction(self):
+        """The store lock (for the sidecars shared with the JSONL store) and one write transaction."""
+        with self._lock(), self._transaction() as conn:
+            yield conn
+
+    @contextmanager
+    def _transaction(self):
+        """Run the block as one write transaction. The write lock is taken up front."""
+        conn = self._connect()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _insert(self, entries):
+        self._insert_rows(self._connect(), entries)
+
+    def _insert_rows(self, conn, entries):
+        conn.executemany(
+            "INSERT INTO signals (id, status, type, category, session_id, timestamp, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(e["id"], *(_column(e, f) for f in COLUMNS), json.dumps(e)) for e in entries])
+        self._insert_tags(conn, entries)
+        self._insert_sessions(conn, entries)
+        self._insert_fingerprints(conn, entries)
+
+    def _insert_tags(self, conn, entries):
+        conn.executemany(
+            "INSERT OR IGNORE INTO signal_tags (tag, id) VALUES (?, ?)",
+            [(tag, e["id"]) for e in entries if isinstance(e.get("tags"), list)
+             for tag in e["tags"] if isinstance(tag, str)])
+
+    def _insert_sessions(self, conn, entries):
+        """File the `sessions` of folded repeats, so session_id filters match them too."""
+        conn.executemany(
+            "INSERT OR IGNORE INTO signal_sessions (session_id, id) VALUES (?, ?)",
+            [(session, e["id"]) for e in entries if isinstance(e.get("sessions"), list)
+             for session in e["sessions"] if isinstance(session, str)])
+
+    def _insert_fingerprints(self, conn, entries):
+        rows = []
+        for e in entries:
+            fp = e.get("fingerprint") or fingerprint(e.get("content"))
+            if fp:
+                rows.extend((key, e["id"]) for key in index_keys(fp))
+        conn.executemany("INSERT OR IGNORE INTO signal_fingerprints (key, id) VALUES (?, ?)", rows)
+
+    def _fingerprint_candidates(self, fp, entry_type):
+        """Ids of rows of `entry_type` filed under any of the fingerprint's keys (an index lookup per key)."""
+        keys = index_keys(fp)
+        rows = self._connect().execute(
+            f"SELECT f.key, f.id FROM signal_fingerprints f JOIN signals s ON s.id = f.id "
+            f"WHERE f.key IN ({', '.join('?' * len(keys))}) AND s.type IS ?", (*keys, entry_type))
+        # Exact-hash matches first
+        return list(dict.fromkeys(eid for _, eid in sorted(rows, key=lambda row: not row[0].startswith("x:"))))
+
+    def _migrate_legacy(self):
+        """Import a single-file signals.jsonl from older versions (one-time)."""
+        if not os.path.exists(self.signals_path):
+            return
+        with self._lock():
+            if not os.path.exists(self.signals_path):
+                return
+            self.import_entries(_read_log(self.signals_path))
+            os.replace(self.signals_path, self.signals_path + ".migrated")
+
+    def _allocate_ids(self, count=1):
+        """Reserve `count` consecutive SIG-YYYYMMDD-NNNN ids from the sequence table."""
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        with self._transaction() as conn:
+            row = conn.execute("SELECT seq FROM sequence WHERE day = ?", (day,)).fetchone()
+            last = row[0] if row else self._scan_max_seq(f"SIG-{day}-")
+            conn.execute("DELETE FROM sequence WHERE day < ?", (day,))
+            conn.execute("INSERT OR REPLACE INTO sequence (day, seq) VALUES (?, ?)", (day, last + count))
+        return [f"SIG-{day}-{seq:04d}" for seq in range(last + 1, last + count + 1)]
+
+    def _scan_max_seq(self, prefix):
+        """Highest sequence number among ids with `prefix` (range scan of the primary key)."""
+        max_seq = 0
+        rows = self._connect().execute(
+            "SELECT id FROM signals WHERE id >= ? AND id < ?", (prefix, prefix[:-1] + "."))
+        for (eid,) in rows:
+            try:
+                max_seq = max(max_seq, int(eid[len(prefix):]))
+            except ValueError:
+                continue
+        return max_seq
+
+    def get(self, entry_id):
+        """Fetch a single entry by ID. Returns None if not found."""
+        self._migrate_legacy()
+        row = self._connect().execute("SELECT data FROM signals WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _iter_hot(self, status=None, entry_type=None, since=None, tags=None, session_id=None,
+                  newest_first=False):
+        """Matching rows in insertion order (reversed with newest_first), decoded as the cursor yields them."""
+        self._migrate_legacy()
+        clauses, params = [], []
+        for column, value in (("status", status), ("type", entry_type)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if session_id:
+            clauses.append("(session_id = ? OR id IN (SELECT id FROM signal_sessions WHERE session_id = ?))")
+            params.extend([session_id, session_id])
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if tags:
+            clauses.append(f"id IN (SELECT id FROM signal_tags WHERE tag IN ({', '.join('?' * len(tags))}))")
+            params.extend(tags)
+        sql = "SELECT data FROM signals"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        sql += " ORDER BY rowid DESC" if newest_first else " ORDER BY rowid"
+        for (data,) in self._connect().execute(sql, params):
+            yield json.loads(data)
+
+    def update(self, entry_id, fields):
+        """Update fields on an existing entry. Returns updated entry or None."""
+        self._migrate_legacy()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM signals WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return None
+            updated = {**json.loads(row[0]), **fields}
+            conn.execute(
+                f"UPDATE signals SET {', '.join(f'{c} = ?' for c in COLUMNS)}, data = ? WHERE id = ?",
+                (*(_column(updated, f) for f in COLUMNS), json.dumps(updated), entry_id))
+            if "tags" in fields:
+                conn.execute("DELETE FROM signal_tags WHERE id = ?", (entry_id,))
+                self._insert_tags(conn, [updated])
+            if "sessions" in fields:
+                conn.execute("DELETE FROM signal_sessions WHERE id = ?", (entry_id,))
+                self._insert_sessions(conn, [updated])
+        return updated
+
+    def compact(self):
+        """Checkpoint the WAL back into the database. Updates are in place, so no deltas are dropped."""
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return 0
+
+    def needs_compaction(self):
+        return False
+
+    def _prunable(self, days, status_filter=None):
+        """WHERE clause and parameters selecting the rows archive(days) removes."""
+        # Age is when the signal was last seen (signal_store._last_seen); last_seen is never
+        # before timestamp, so the timestamp test narrows the rows through its index first.
+        # Never prune confirmed/promoted entries
+        cutoff = _cutoff(days)
+        where = (f"COALESCE(timestamp, '') < ? "
+                 f"AND COALESCE(json_extract(data, '$.last_seen'), timestamp, '') < ? "
+                 f"AND COALESCE(status, '') NOT IN ({', '.join('?' * len(PROTECTED_STATUSES))})")
+        params = [cutoff, cutoff, *PROTECTED_STATUSES]
+        if status_filter:
+            where += " AND status = ?"
+            params.append(status_filter)
+        return where, params
+
+    def prune_due(self, days=14):
+        """True when archive(days) would remove at least one row (walks the timestamp index)."""
+        self._migrate_legacy()
+        where, params = self._prunable(days)
+        row = self._connect().execute(f"SELECT 1 FROM signals WHERE {where} LIMIT 1", params).fetchone()
+        return row is not None
+
+    def _delete_older_than(self, conn, days, status_filter=None):
+        where, params = self._prunable(days, status_filter)
+        # Move, don't drop: old rows go to the cold archive before they are deleted
+        from cold_archive import ColdArchive
+        old = [json.loads(data) for (data,) in conn.execute(f"SELECT data FROM signals WHERE {where}", params)]
+        ColdArchive(self).add(old)
+        return conn.execute(f"DELETE FROM signals WHERE {where}", params).rowcount
+
+    def archive(self, days=14, status_filter=None):
+        """Move entries not seen for `days` days to the cold archive. Returns count removed."""
+        self._migrate_legacy()
+        with self._transaction() as conn:
+            return self._delete_older_than(conn, days, status_filter)
+
+    def stats(self, fmt=None, recount=False):
+        """Return counts by status, type, category. If fmt='statusline', return compact string.
+
+        Counted with GROUP BY queries; there is no sidecar, so `recount` is accepted and ignored.
+        """
+        self._migrate_legacy()
+        conn = self._connect()
+        counts = {"total": conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]}
+        for key, field in STATS_FIELDS:
+            rows = conn.execute(f"SELECT {field}, COUNT(*) FROM signals GROUP BY {field}")
+            counts[key] = {("unknown" if value is None else str(value)): n for value, n in rows}
+        if fmt == "statusline":
+            return _statusline(counts)
+        return counts
+
+    def export(self):
+        """Yield every entry, oldest first, exactly as stored."""
+        self._migrate_legacy()
+        for (data,) in self._connect().execute("SELECT data FROM signals ORDER BY rowid"):
+            yield json.loads(data)
+
+    def import_entries(self, entries):
+        """Insert exported entries, keeping their ids and fields. Ids already present are skipped.
+
+        Returns the number of entries imported.
+        """
+        with self._transaction() as conn:
+            new = {}
+            for e in entries:
+                if isinstance(e.get("id"), str) and e["id"] not in new:
+                    new[e["id"]] = e
+            existing = set()
+            ids = list(new)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                existing.update(eid for (eid,) in conn.execute(
+                    f"SELECT id FROM signals WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+            fresh = [e for eid, e in new.items() if eid not in existing]
+            self._insert_rows(conn, fresh)
+            # Re-seed today's sequence from the table in case imported ids are ahead of it
+            conn.execute("DELETE FROM sequence")
+        return len(fresh)
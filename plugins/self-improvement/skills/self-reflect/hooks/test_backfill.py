@@ -0,0 +1,107 @@
+# test_backfill.py
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from backfill import Backfill
+from memory_store import MemoryStore
+from session_state import save_session_state
+
+
+def _write_transcript(path, *entries):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.writelines(json.dumps(e) + "\n" for e in entries)
+
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.projects = os.path.join(self.tmpdir, "projects")
+        self.store = MemoryStore(base_dir=os.path.join(self.tmpdir, "store"))
+        self.first = os.path.join(self.projects, "-repo-a", "sess-a.jsonl")
+        self.second = os.path.join(self.projects, "-repo-b", "sess-b.jsonl")
+        _write_transcript(self.first,
+                          {"role": "assistant", "content": "I've updated the installer script."},
+                          {"role": "user", "content": "No, use pnpm not npm"})
+        _write_transcript(self.second,
+                          {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+                          {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _backfill(self):
+        return Backfill(self.store, projects_dir=self.projects).run(workers=2)
+
+    def test_captures_signals_and_summaries_per_transcript(self):
+        counts = self._backfill()
+        self.assertEqual(counts, {"scanned": 2, "skipped": 0, "signals": 4, "failed": 0})
+        signals = self.store.query()
+        self.assertEqual(sorted((s["session_id"], s["type"]) for s in signals),
+                         [("sess-a", "correction"), ("sess-a", "summary"),
+                          ("sess-b", "failure"), ("sess-b", "summary")])
+        self.assertEqual({s["source"]["hook"] for s in signals}, {"backfill"})
+
+    def test_rerun_scans_only_new_or_changed_transcripts(self):
+        self._backfill()
+        self.assertEqual(self._backfill()["skipped"], 2)
+        with open(self.first, "a") as f:
+            f.write(json.dumps({"role": "user", "content": "We always use absolute imports"}) + "\n")
+        counts = self._backfill()
+        self.assertEqual((counts["scanned"], counts["skipped"]), (1, 1))
+        self.assertEqual(len(self.store.query(entry_type="convention")), 1)
+
+    def test_skips_sessions_the_capture_hook_checkpoints(self):
+        save_session_state(self.store.base_dir, "sess-a", {"signals": {"path": self.first, "offset": 0}})
+        counts = self._backfill()
+        self.assertEqual((counts["scanned"], counts["skipped"]), (1, 1))
+        self.assertEqual({s["session_id"] for s in self.store.query()}, {"sess-b"})
+
+    def test_no_second_summary_for_sessions_summarized_at_session_end(self):
+        save_session_state(self.store.base_dir, "sess-a", {"summary": {"path": self.first, "offset": 0}})
+        counts = self._backfill()
+        self.assertEqual((counts["scanned"], counts["skipped"]), (2, 0))
+        self.assertEqual(sorted(s["type"] for s in self.store.query(session_id="sess-a")), ["correction"])
+        self.assertEqual(len(self.store.query(session_id="sess-b", entry_type="summary")), 1)
+
+    def test_state_of_old_sessions_is_dropped_but_still_skipped(self):
+        save_session_state(self.store.base_dir, "sess-a", {"signals": {"path": self.first, "offset": 0}})
+        save_session_state(self.store.base_dir, "sess-b", {"summary": {"path": self.second, "offset": 0}})
+        save_session_state(self.store.base_dir, "sess-c", {"signals": {"path": "elsewhere", "offset": 0}})
+        sessions = os.path.join(self.store.base_dir, "sessions")
+        month_ago = time.time() - 30 * 86400
+        for name in ("sess-a.json", "sess-b.json"):
+            os.utime(os.path.join(sessions, name), (month_ago, month_ago))
+        self.store.maintain()
+        self.assertEqual(os.listdir(sessions), ["sess-c.json"])
+        counts = self._backfill()
+        self.assertEqual((counts["scanned"], counts["skipped"]), (1, 1))
+        self.assertEqual([s["type"] for s in self.store.query()], ["failure"])
+
+    def test_old_transcripts_stay_hot_and_keep_their_time(self):
+        old = datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc).timestamp()
+        os.utime(self.first, (old, old))
+        self._backfill()
+        self.assertEqual(self.store.maintain()["archived"], 0)
+        signals = self.store.query(status="captured", session_id="sess-a")
+        self.assertEqual(len(signals), 2)
+        self.assertEqual({s["first_seen"] for s in signals}, {"2026-03-04T05:06:07Z"})
+        self.assertEqual(self.store.recurrence(entry_type="correction")[0]["first_seen"], "2026-03-04T05:06:07Z")
+
+    def test_cli(self):
+        import subprocess
+        import sys
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_store.py")
+        env = dict(os.environ, REFLECTIONS_DIR=self.store.base_dir)
+        out = subprocess.run([sys.executable, script, "backfill", "--projects-dir", self.projects, "--workers", "1"],
+                             capture_output=True, text=True, env=env, check=True).stdout
+        self.assertEqual(json.loads(out)["signals"], 4)
+        self.assertTrue(os.path.exists(os.path.join(self.store.base_dir, "backfill.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# test_capture_failure.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from capture_failure import build_failure_signal
+from memory_store import MemoryStore
+
+HOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capture-failure.py")
+
+
+class TestBuildFailureSignal(unittest.TestCase):
+    def test_builds_failure_signal(self):
+        signal = build_failure_signal({"tool_name": "Bash", "error": "npm test exited 1",
+                                       "session_id": "s1"})
+        self.assertEqual(signal["type"], "failure")
+        self.assertEqual(signal["content"], "Bash failed: npm test exited 1")
+        self.assertEqual(signal["tags"], ["Bash"])
+        self.assertEqual(signal["session_id"], "s1")
+
+    def test_keeps_quotes_in_errors(self):
+        error = """grep: "can't open" 'file'"""
+        signal = build_failure_signal({"tool_name": "Bash", "error": error, "session_id": "s1"})
+        self.assertEqual(signal["context"], error)
+
+    def test_truncates_long_errors(self):
+        signal = build_failure_signal({"tool_name": "Read", "error": "x" * 500})
+        self.assertEqual(len(signal["context"]), 200)
+        self.assertEqual(signal["content"], "Read failed: " + "x" * 100)
+
+    def test_skips_empty_payload(self):
+        self.assertIsNone(build_failure_signal({}))
+
+
+class TestCaptureFailureHook(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, stdin, base_dir=None):
+        env = dict(os.environ, REFLECTIONS_DIR=base_dir or self.tmpdir)
+        env.pop("REFLECTIONS_DAEMON", None)
+        return subprocess.run([sys.executable, HOOK], input=stdin, capture_output=True, text=True, env=env)
+
+    def test_hook_appends_signal(self):
+        payload = {"tool_name": "Bash", "error": 'sh: "it\'s" broken', "session_id": "s1"}
+        self.assertEqual(self._run(json.dumps(payload)).returncode, 0)
+        entries = MemoryStore(base_dir=self.tmpdir).query(session_id="s1")
+        self.assertEqual([e["context"] for e in entries], ['sh: "it\'s" broken'])
+
+    def test_hook_ignores_bad_input(self):
+        self.assertEqual(self._run("not json").returncode, 0)
+        self.assertEqual(MemoryStore(base_dir=self.tmpdir).query(), [])
+
+    def test_store_errors_do_not_fail_the_hook(self):
+        not_a_dir = os.path.join(self.tmpdir, "file")
+        open(not_a_dir, "w").close()
+        result = self._run(json.dumps({"tool_name": "Bash", "error": "exit 1"}), base_dir=not_a_dir)
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("capture-failure: signal not recorded", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# test_capture_session_summary.py
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from memory_store import MemoryStore
+from session_digest import extract_summary
+from session_state import load_session_state
+from transcript_io import parse_lines
+
+HOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestSessionEndDigest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "transcript.jsonl")
+        self.env = dict(os.environ, REFLECTIONS_DIR=os.path.join(self.tmpdir, "store"))
+        self.env.pop("REFLECTIONS_DAEMON", None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _run(self, script, *entries):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(e) + "\n" for e in entries)
+        subprocess.run([sys.executable, os.path.join(HOOK_DIR, script)], text=True, env=self.env, check=True,
+                       input=json.dumps({"session_id": "s1", "transcript_path": self.path}))
+
+    def test_summary_continues_from_the_precompact_digest(self):
+        first = [{"role": "user", "content": "Fix the login bug"},
+                 {"role": "assistant", "tool_use": {"name": "Read", "input": {"file_path": "src/login.py"}}}]
+        rest = [{"role": "assistant", "tool_use": {"name": "Edit", "input": {"file_path": "src/login.py"}}},
+                {"role": "user", "content": "thanks"}]
+        self._run("capture-signals.py", *first)
+        digest = load_session_state(self.env["REFLECTIONS_DIR"], "s1")["summary"]
+        self.assertEqual((digest["offset"], digest["turn_count"]), (os.path.getsize(self.path), 2))
+
+        self._run("capture-session-summary.py", *rest)
+        with open(self.path, "rb") as f:
+            expected = extract_summary(parse_lines(f))
+        summaries = MemoryStore(base_dir=self.env["REFLECTIONS_DIR"]).query(entry_type="summary")
+        self.assertEqual([s["meta"] for s in summaries], [expected])
+        self.assertEqual(expected["turn_count"], 4)
+        digest = load_session_state(self.env["REFLECTIONS_DIR"], "s1")["summary"]
+        self.assertEqual(digest["offset"], os.path.getsize(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
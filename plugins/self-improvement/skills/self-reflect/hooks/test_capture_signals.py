@@ -3,7 +3,7 @@ import json
 import os
 import tempfile
 import unittest
-from capture_signals import extract_signals_from_transcript
+from capture_signals import extract_signals_from_transcript, read_transcript_from
 
 
 class TestCorrectionDetection(unittest.TestCase):
@@ -38,6 +38,21 @@ class TestCorrectionDetection(unittest.TestCase):
         self.assertGreaterEqual(corrections[0]["confidence"], 3)
 
 
+    def test_records_the_rules_that_fired(self):
+        transcript = [
+            {"role": "assistant", "content": "Running grep to search."},
+            {"role": "user", "content": "Use rg instead of grep, it's faster"},
+        ]
+        correction = [s for s in extract_signals_from_transcript(transcript, "test-sess")
+                      if s["type"] == "correction"][0]
+        self.assertIn(r"\binstead\b", correction["meta"]["rules"])
+        self.assertIn(r"use\s+(\w+)\s+instead\s+of\s+(\w+)", correction["meta"]["rules"])
+
+    def test_capitalized_keywords_match(self):
+        transcript = [{"role": "user", "content": "I meant the staging config"}]
+        signals = extract_signals_from_transcript(transcript, "test-sess")
+        self.assertEqual([s["type"] for s in signals], ["correction"])
+
 class TestConventionDetection(unittest.TestCase):
     def test_detects_explicit_convention(self):
         transcript = [
@@ -89,5 +104,169 @@ class TestPositiveReinforcementDetection(unittest.TestCase):
         self.assertGreaterEqual(len(patterns), 1)
 
 
+
+class TestIncrementalCapture(unittest.TestCase):
+    TRANSCRIPT = [
+        {"role": "assistant", "content": "I've refactored the auth module."},
+        {"role": "user", "content": "No, use pnpm not npm in this project"},
+        {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+        {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+        {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+        {"role": "assistant", "tool_use": {"name": "Glob", "result": "[]"}},
+        {"role": "assistant", "tool_use": {"name": "Grep", "result": ""}},
+        {"role": "assistant", "tool_use": {"name": "Glob", "result": "No matches"}},
+        {"role": "assistant", "content": "Found it after refactoring the module."},
+        {"role": "user", "content": "Perfect, that's exactly what I wanted"},
+    ]
+
+    def _summary(self, signals):
+        return sorted((s["type"], s["content"], s["source"].get("turn")) for s in signals)
+
+    def test_split_runs_match_a_single_pass(self):
+        whole = extract_signals_from_transcript(self.TRANSCRIPT, "s1")
+        for split in range(1, len(self.TRANSCRIPT)):
+            with self.subTest(split=split):
+                from capture_signals import _mod
+                state = _mod._new_detector_state()
+                parts = extract_signals_from_transcript(self.TRANSCRIPT[:split], "s1", state)
+                parts += extract_signals_from_transcript(self.TRANSCRIPT[split:], "s1", state)
+                if split in (3, 4):
+                    # The open failure run is reported at the boundary with the count so far
+                    parts = [s for s in parts if s["type"] != "failure"]
+                    whole_cmp = [s for s in whole if s["type"] != "failure"]
+                else:
+                    whole_cmp = whole
+                self.assertEqual(self._summary(parts), self._summary(whole_cmp))
+                self.assertEqual(state["turn"], len(self.TRANSCRIPT))
+
+    def test_open_failure_run_is_reported_once(self):
+        from capture_signals import _mod
+        state = _mod._new_detector_state()
+        first = extract_signals_from_transcript(self.TRANSCRIPT[:4], "s1", state)
+        rest = extract_signals_from_transcript(self.TRANSCRIPT[4:], "s1", state)
+        self.assertEqual([s["content"] for s in first if s["type"] == "failure"],
+                         ["Bash failed 2 times consecutively: exit 1"])
+        self.assertEqual([s for s in rest if s["type"] == "failure"], [])
+
+    def test_read_transcript_from_resumes_after_complete_lines(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({"role": "user", "content": "one"}) + "\n")
+            f.write('{"role": "user", "content": "in fli')
+        try:
+            entries, offset, dropped = read_transcript_from(f.name)
+            self.assertEqual(([e["content"] for e in entries], dropped), (["one"], 0))
+            with open(f.name, "a") as out:
+                out.write('ght"}\n' + json.dumps({"role": "user", "content": "three"}) + "\n")
+            entries, _, _ = read_transcript_from(f.name, offset)
+            self.assertEqual([e["content"] for e in entries], ["in flight", "three"])
+            entries, _, dropped = read_transcript_from(f.name, max_turns=1)
+            self.assertEqual(([e["content"] for e in entries], dropped), (["three"], 2))
+        finally:
+            os.remove(f.name)
+
+    def test_hook_only_scans_new_lines(self):
+        import shutil
+        import subprocess
+        import sys
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "transcript.jsonl")
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capture-signals.py")
+            env = dict(os.environ, REFLECTIONS_DIR=os.path.join(tmpdir, "store"))
+            env.pop("REFLECTIONS_DAEMON", None)
+            hook_input = json.dumps({"session_id": "s1", "transcript_path": path})
+
+            def run(*entries):
+                with open(path, "a") as f:
+                    f.writelines(json.dumps(e) + "\n" for e in entries)
+                subprocess.run([sys.executable, script], input=hook_input, text=True, env=env, check=True)
+
+            run(*self.TRANSCRIPT[:2])
+            run(*self.TRANSCRIPT[2:])
+            from memory_store import MemoryStore
+            signals = MemoryStore(base_dir=env["REFLECTIONS_DIR"]).query()
+            correction = [s for s in signals if s["type"] == "correction"]
+            self.assertEqual([s["occurrences"] for s in correction], [1])
+            self.assertEqual(sorted({s["type"] for s in signals}),
+                             ["convention", "correction", "failure", "pattern", "project_friction"])
+            self.assertTrue(os.path.exists(os.path.join(env["REFLECTIONS_DIR"], "sessions", "s1.json")))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestDetectorRegistry(unittest.TestCase):
+    def setUp(self):
+        from capture_signals import _mod
+        self.hook = _mod
+        self.registered = list(_mod.DETECTORS)
+
+        @_mod.register_detector
+        class LongMessageDetector(_mod.Detector):
+            name = "long_messages"
+
+            def initial_state(self):
+                return {"seen": 0}
+
+            def feed(self, entry, turn, state, session_id):
+                state["seen"] += 1
+                if len(_mod._user_text(entry)) > 30:
+                    return [{"type": "pattern", "content": f"long message at {turn}", "session_id": session_id}]
+                return []
+
+    def tearDown(self):
+        self.hook.DETECTORS[:] = self.registered
+
+    def test_registered_detector_joins_the_single_pass(self):
+        transcript = [
+            {"role": "assistant", "content": "I've refactored the auth module."},
+            {"role": "user", "content": "No, use pnpm not npm in this project"},
+        ]
+        state, timings = self.hook._new_detector_state(), {}
+        signals = extract_signals_from_transcript(iter(transcript), "s1", state, timings)
+        self.assertEqual([s["type"] for s in signals], ["correction", "convention", "pattern"])
+        self.assertEqual(signals[-1]["content"], "long message at 1")
+        self.assertEqual(state["long_messages"], {"seen": 2})
+        self.assertEqual(set(timings), {d.name for d in self.hook.DETECTORS})
+
+    def test_saved_state_gains_new_detectors(self):
+        saved = {"turn": 7, "failures": {"run": None, "reported": True}}
+        state = self.hook._new_detector_state(saved)
+        self.assertEqual(state["turn"], 7)
+        self.assertEqual(state["failures"], {"run": None, "reported": True})
+        self.assertEqual(state["long_messages"], {"seen": 0})
+
+
+class TestDetectorStandIn(unittest.TestCase):
+    LINES = [
+        {"role": "assistant", "content": "Running the tests.",
+         "tool_use": {"name": "Bash", "input": {"command": "npm test"}, "result": "PASS \"name\": x\n" * 500}},
+        {"role": "user", "content": [{"type": "tool_result", "content": "ok"}]},
+        {"role": "user", "content": "Perfect, that's exactly what I wanted"},
+        {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+        {"role": "assistant", "tool_use": {"name": "Bash", "error": "exit 1"}},
+        {"role": "assistant", "tool_use": {"name": "Glob", "result": "[]"}},
+        {"role": "assistant", "tool_use": {"name": "Grep", "result": ""}},
+        {"role": "assistant", "tool_use": {"name": "Glob", "result": "No matches"}},
+        {"role": "assistant", "tool_use": {"name": "Read", "input": {"file_path": "a.py"}, "result": "..."}},
+        {"role": "user", "content": [{"type": "text", "text": "No, use pnpm not npm"}]},
+    ]
+
+    def _lines(self, **dump_args):
+        return [json.dumps(line, **dump_args).encode() + b"\n" for line in self.LINES]
+
+    def test_stand_ins_give_the_same_signals(self):
+        from capture_signals import _mod
+        from transcript_io import parse_lines
+        for dump_args in ({}, {"separators": (",", ":")}):
+            with self.subTest(dump_args=dump_args):
+                lines = self._lines(**dump_args)
+                self.assertEqual(extract_signals_from_transcript(parse_lines(lines, _mod._stand_in), "s1"),
+                                 extract_signals_from_transcript(parse_lines(lines), "s1"))
+
+    def test_only_lines_the_detectors_read_are_decoded(self):
+        from capture_signals import _mod
+        decoded = [i for i, line in enumerate(self._lines()) if _mod._stand_in(line) is None]
+        self.assertEqual(decoded, [2, 3, 4, 5, 6, 7, 9])
+
 if __name__ == "__main__":
     unittest.main()
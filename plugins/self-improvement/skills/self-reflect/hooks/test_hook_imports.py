@@ -0,0 +1,38 @@
+# test_hook_imports.py
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from bench_hooks import bench_env, cases, imported_modules
+from memory_store import MemoryStore
+
+
+class TestHookImports(unittest.TestCase):
+    """Fast paths must not import modules they do not use (see bench_hooks.py for timings)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        base_dir = os.path.join(cls.tmpdir, "store")
+        entry = MemoryStore(base_dir=base_dir).append({"type": "failure", "status": "captured",
+                                                       "content": "seed", "session_id": "s1"})
+        cls.env = bench_env(base_dir, os.path.join(cls.tmpdir, "pycache"))
+        cls.cases = cases(cls.tmpdir, entry["id"])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_no_heavy_imports_on_fast_paths(self):
+        for name, argv, stdin, _, forbidden in self.cases:
+            if argv[0] != sys.executable or not forbidden:
+                continue
+            with self.subTest(case=name):
+                modules = imported_modules(argv, stdin, self.env)
+                self.assertIn("json", modules)  # sanity: importtime output was parsed
+                self.assertEqual(modules & set(forbidden), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
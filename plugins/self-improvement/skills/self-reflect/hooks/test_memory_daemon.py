@@ -0,0 +1,114 @@
+# test_memory_daemon.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from memory_daemon import DaemonClient, DaemonError, serve
+from memory_store import MemoryStore, connect_store
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestMemoryDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.thread = threading.Thread(target=serve, args=(self.tmpdir,), kwargs={"idle_timeout": 30})
+        self.thread.start()
+        self.client = DaemonClient(base_dir=self.tmpdir, spawn=False)
+        self.assertTrue(_wait_for(lambda: os.path.exists(self.client.socket_path)))
+
+    def tearDown(self):
+        import shutil
+        self.client._call("shutdown")
+        self.thread.join(timeout=10)
+        shutil.rmtree(self.tmpdir)
+
+    def test_calls_are_served_by_the_daemon(self):
+        with patch.object(DaemonClient, "_direct", side_effect=AssertionError("fell back")):
+            entry = self.client.append({"type": "failure", "status": "captured", "content": "x",
+                                        "session_id": "s1"})
+            self.assertEqual(self.client.get(entry["id"])["content"], "x")
+            self.client.update(entry["id"], {"status": "analyzed"})
+            self.assertEqual([e["status"] for e in self.client.query(session_id="s1")], ["analyzed"])
+            self.assertEqual(list(self.client.iter_query(fields=["content"])), [{"content": "x"}])
+            self.assertEqual(self.client.stats()["total"], 1)
+        # Written through to the files, visible to a plain store
+        self.assertEqual(MemoryStore(base_dir=self.tmpdir).get(entry["id"])["status"], "analyzed")
+
+    def test_daemon_sees_writes_made_without_it(self):
+        self.assertEqual(self.client.query(), [])
+        MemoryStore(base_dir=self.tmpdir).append({"type": "failure", "status": "captured",
+                                                  "content": "direct"})
+        self.assertEqual([e["content"] for e in self.client.query()], ["direct"])
+
+    def test_errors_are_raised_not_retried(self):
+        with self.assertRaises(DaemonError):
+            self.client.archive(days="fourteen")
+
+    def test_second_daemon_does_not_start(self):
+        self.assertFalse(serve(self.tmpdir, idle_timeout=1))
+
+
+class TestDaemonClientFallback(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def test_falls_back_to_files_when_daemon_is_down(self):
+        client = DaemonClient(base_dir=self.tmpdir, spawn=False)
+        entry = client.append({"type": "failure", "status": "captured", "content": "offline"})
+        self.assertEqual(MemoryStore(base_dir=self.tmpdir).get(entry["id"])["content"], "offline")
+        self.assertEqual(client.stats()["total"], 1)
+
+    def test_first_call_starts_daemon_for_later_calls(self):
+        client = DaemonClient(base_dir=self.tmpdir)
+        client.append({"type": "failure", "status": "captured", "content": "first"})
+        self.assertTrue(_wait_for(lambda: os.path.exists(client.socket_path)))
+        env = dict(os.environ, REFLECTIONS_DIR=self.tmpdir)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_daemon.py")
+        status = subprocess.run([sys.executable, script, "status"], capture_output=True, text=True, env=env)
+        self.assertTrue(json.loads(status.stdout)["running"])
+        self.assertEqual(client.stats()["total"], 1)
+        subprocess.run([sys.executable, script, "stop"], capture_output=True, env=env)
+        self.assertTrue(_wait_for(lambda: not os.path.exists(client.socket_path)))
+
+    def test_stalled_daemon_reads_fall_back_and_writes_raise(self):
+        import socket
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(os.path.join(self.tmpdir, "store.sock"))
+        server.listen(16)  # accepts connections, never answers
+        client = DaemonClient(base_dir=self.tmpdir, spawn=False)
+        try:
+            with patch("memory_daemon.CLIENT_TIMEOUT", 0.2):
+                start = time.time()
+                self.assertEqual(client.stats()["total"], 0)
+                with self.assertRaises(DaemonError):
+                    client.append({"type": "failure", "status": "captured", "content": "lost?"})
+                self.assertLess(time.time() - start, 5)
+        finally:
+            server.close()
+
+    def test_connect_store_is_plain_store_unless_enabled(self):
+        with patch.dict(os.environ, {"REFLECTIONS_DAEMON": ""}):
+            self.assertIsInstance(connect_store(base_dir=self.tmpdir), MemoryStore)
+        with patch.dict(os.environ, {"REFLECTIONS_DAEMON": "1"}):
+            self.assertIsInstance(connect_store(base_dir=self.tmpdir), DaemonClient)
+
+
+if __name__ == "__main__":
+    unittest.main()
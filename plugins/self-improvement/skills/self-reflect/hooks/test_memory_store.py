@@ -1,16 +1,38 @@
 # test_memory_store.py
 import json
+import multiprocessing
 import os
 import tempfile
 import unittest
 from unittest.mock import patch
-from memory_store import MemoryStore
+from jsonl_store import _Segment
+from memory_store import MemoryStore, open_store, statusline
+
+
+def _segment_paths(store, entry_id):
+    """Log and index paths of the day segment holding a SIG-YYYYMMDD-NNNN id."""
+    base = os.path.join(store.segments_dir, f"{entry_id[4:8]}-{entry_id[8:10]}-{entry_id[10:12]}")
+    return base + ".jsonl", base + ".idx"
+
+
+def _stress_worker(base_dir, worker, count, backend="jsonl"):
+    """Append `count` signals and update each one, compacting now and then."""
+    store = open_store(base_dir=base_dir, backend=backend)
+    for i in range(count):
+        result = store.append({"type": "failure", "status": "captured", "confidence": 1,
+                               "source": {"hook": "stress"}, "content": f"w{worker}-{i}",
+                               "context": "ctx", "session_id": f"s{worker}"})
+        store.update(result["id"], {"status": "analyzed", "meta": {"worker": worker}})
+        if i % 10 == 9:
+            store.compact()
 
 
 class TestMemoryStoreAppend(unittest.TestCase):
+    backend = "jsonl"
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
-        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
 
     def tearDown(self):
         import shutil
@@ -27,7 +49,7 @@ class TestMemoryStoreAppend(unittest.TestCase):
             "session_id": "test-session",
         }
         result = self.store.append(entry)
-        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, "signals.jsonl")))
+        self.assertTrue(os.path.exists(_segment_paths(self.store, result["id"])[0]))
         self.assertIn("id", result)
         self.assertIn("timestamp", result)
         self.assertEqual(result["version"], 1)
@@ -37,10 +59,135 @@ class TestMemoryStoreAppend(unittest.TestCase):
                  "source": {"hook": "test"}, "content": "test", "context": "test",
                  "session_id": "s1"}
         r1 = self.store.append(entry)
-        r2 = self.store.append(entry)
+        r2 = self.store.append({**entry, "content": "another test"})
         # IDs should be different
         self.assertNotEqual(r1["id"], r2["id"])
 
+    def test_append_ids_continue_from_sequence_sidecar(self):
+        entry = {"type": "failure", "status": "captured", "confidence": 1,
+                 "source": {"hook": "test"}, "content": "test", "context": "test",
+                 "session_id": "s1"}
+        r1 = self.store.append(entry)
+        with open(self.store.sequence_path, "r") as f:
+            state = json.load(f)
+        self.assertEqual(r1["id"], f"SIG-{state['date']}-{state['seq']:04d}")
+        # A fresh store instance picks up where the sidecar left off
+        r2 = MemoryStore(base_dir=self.tmpdir).append({**entry, "content": "another test"})
+        self.assertEqual(int(r2["id"][-4:]), state["seq"] + 1)
+
+    def test_append_reseeds_missing_sequence_sidecar(self):
+        entry = {"type": "failure", "status": "captured", "confidence": 1,
+                 "source": {"hook": "test"}, "content": "test", "context": "test",
+                 "session_id": "s1"}
+        r1 = self.store.append(entry)
+        os.remove(self.store.sequence_path)
+        r2 = self.store.append({**entry, "content": "another test"})
+        self.assertEqual(int(r2["id"][-4:]), int(r1["id"][-4:]) + 1)
+
+    def test_concurrent_appends_get_unique_ids(self):
+        import subprocess
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_store.py")
+        env = os.environ.copy()
+        env["REFLECTIONS_DIR"] = self.tmpdir
+        env["REFLECTIONS_BACKEND"] = self.backend
+        procs = [subprocess.Popen(["python3", script, "append",
+                                   json.dumps({"type": "failure", "status": "captured", "content": f"x{i}",
+                                               "session_id": "s1"})],
+                                  env=env, stdout=subprocess.PIPE, text=True) for i in range(8)]
+        ids = [json.loads(p.communicate()[0])["id"] for p in procs]
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_append_many_allocates_contiguous_ids(self):
+        entries = [{"type": "correction", "status": "captured", "confidence": 2,
+                    "source": {"hook": "PreCompact"}, "content": f"c{i}", "context": "c",
+                    "session_id": "s1"} for i in range(3)]
+        results = self.store.append_many(entries)
+        seqs = [int(r["id"][-4:]) for r in results]
+        self.assertEqual(seqs, [seqs[0], seqs[0] + 1, seqs[0] + 2])
+        self.assertEqual([r["content"] for r in self.store.query()], ["c0", "c1", "c2"])
+
+    def test_append_many_with_an_earlier_seen_time(self):
+        seen = "2026-03-04T05:06:07Z"
+        first = self.store.append_many([{"type": "failure", "status": "captured", "content": f"old {i}",
+                                         "session_id": "s0"} for i in range(2)], seen=seen)
+        # Stamped and dated now, so they stay hot for review; the earlier time is kept apart
+        self.assertEqual({e["first_seen"] for e in first}, {seen})
+        self.assertNotIn("20260304", first[0]["id"])
+        self.assertGreater(first[0]["timestamp"], seen)
+        self.assertFalse(self.store.prune_due(14))
+        self.assertEqual(self.store.recurrence(entry_type="failure")[0]["first_seen"], seen)
+        today = self.store.append({"type": "failure", "status": "captured", "content": "now"})
+        self.assertEqual(int(today["id"][-4:]), int(first[1]["id"][-4:]) + 1)
+        # A repeat seen earlier never moves last_seen back
+        folded = self.store.append_many([{"type": "failure", "status": "captured", "content": "now"}],
+                                        seen=seen)
+        self.assertEqual(folded[0]["id"], today["id"])
+        self.assertEqual(self.store.get(today["id"])["last_seen"], today["timestamp"])
+
+    def test_repeated_content_folds_into_existing_entry(self):
+        first = self.store.append({"type": "correction", "status": "captured", "content": "No, use pnpm.",
+                                   "session_id": "s1"})
+        again = self.store.append({"type": "correction", "status": "captured", "content": "no use PNPM",
+                                   "session_id": "s2"})
+        self.assertEqual(again["id"], first["id"])
+        self.assertEqual(again["occurrences"], 2)
+        stored = self.store.get(first["id"])
+        self.assertEqual(stored["occurrences"], 2)
+        self.assertIn("last_seen", stored)
+        self.assertEqual(len(self.store.query()), 1)
+        self.assertEqual(self.store.stats()["total"], 1)
+
+    def test_folded_repeat_is_found_by_its_own_session(self):
+        text = "Run the full test suite with pytest before every commit in this repository"
+        first = self.store.append({"type": "convention", "status": "captured", "content": text,
+                                   "session_id": "A"})
+        self.store.append({"type": "convention", "status": "captured", "content": text + " please",
+                           "session_id": "B"})
+        self.store.append({"type": "convention", "status": "captured", "content": text, "session_id": "B"})
+        self.assertEqual(self.store.get(first["id"])["sessions"], ["A", "B"])
+        self.assertEqual([e["id"] for e in self.store.query(session_id="B")], [first["id"]])
+        self.assertEqual([e["id"] for e in self.store.query(session_id="A")], [first["id"]])
+        self.assertEqual([e["id"] for e in self.store.query(status="captured", session_id="B")], [first["id"]])
+        self.assertEqual(self.store.query(session_id="C"), [])
+
+    def test_near_duplicate_folds(self):
+        text = "Run the full test suite with pytest before every commit in this repository"
+        first = self.store.append({"type": "convention", "status": "captured", "content": text})
+        again = self.store.append({"type": "convention", "status": "captured", "content": text + " please"})
+        self.assertEqual(again["id"], first["id"])
+        other = self.store.append({"type": "convention", "status": "captured",
+                                   "content": "Run the linter before every push to this repository"})
+        self.assertNotEqual(other["id"], first["id"])
+
+    def test_repeats_do_not_fold_across_types_statuses_or_summaries(self):
+        entry = {"type": "correction", "status": "captured", "content": "Use pnpm"}
+        first = self.store.append(entry)
+        self.assertNotEqual(self.store.append({**entry, "type": "convention"})["id"], first["id"])
+        self.store.update(first["id"], {"status": "dismissed"})
+        self.assertNotEqual(self.store.append(entry)["id"], first["id"])
+        summary = {"type": "summary", "status": "captured", "content": "Session: 3 turns"}
+        self.assertNotEqual(self.store.append(summary)["id"], self.store.append(summary)["id"])
+
+    def test_append_many_folds_repeats_within_the_batch(self):
+        results = self.store.append_many({"type": "correction", "status": "captured", "content": c}
+                                         for c in ("Use pnpm", "Use uv", "use pnpm!"))
+        self.assertEqual(results[2]["id"], results[0]["id"])
+        self.assertEqual(results[0]["occurrences"], 2)
+        self.assertEqual(int(results[1]["id"][-4:]), int(results[0]["id"][-4:]) + 1)
+        self.assertEqual(len(self.store.query()), 2)
+
+    def test_duplicate_lookup_reads_only_candidates(self):
+        self.store.append_many({"type": "failure", "status": "captured", "content": f"Bash failed: step {i}"}
+                               for i in range(200))
+        with patch.object(type(self.store), "get", autospec=True,
+                          side_effect=type(self.store).get) as get:
+            self.store.append({"type": "failure", "status": "captured", "content": "Bash failed: step 7"})
+        self.assertLess(get.call_count, 5)
+
+    def test_append_many_empty_is_noop(self):
+        self.assertEqual(self.store.append_many([]), [])
+        self.assertFalse(os.path.exists(self.store.signals_path))
+
     def test_get_by_id(self):
         entry = {"type": "correction", "status": "captured", "confidence": 2,
                  "source": {"hook": "PreCompact", "turn": 10},
@@ -56,9 +203,11 @@ class TestMemoryStoreAppend(unittest.TestCase):
 
 
 class TestMemoryStoreQuery(unittest.TestCase):
+    backend = "jsonl"
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
-        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
         # Seed test data
         self.store.append({"type": "failure", "status": "captured", "confidence": 1,
                            "source": {"hook": "PostToolUseFailure"}, "content": "npm failed",
@@ -100,11 +249,21 @@ class TestMemoryStoreQuery(unittest.TestCase):
         results = self.store.query(status="promoted")
         self.assertEqual(len(results), 0)
 
+    def test_iter_query_limit_order_and_fields(self):
+        it = self.store.iter_query(limit=2, newest_first=True, fields=["type", "content"])
+        self.assertEqual(list(it), [{"type": "convention", "content": "camelCase files"},
+                                    {"type": "correction", "content": "Use pnpm"}])
+        self.assertEqual([e["content"] for e in self.store.iter_query(status="captured", limit=1)],
+                         ["npm failed"])
+        self.assertEqual(list(self.store.iter_query(limit=0)), [])
+
 
 class TestMemoryStoreUpdate(unittest.TestCase):
+    backend = "jsonl"
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
-        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
         result = self.store.append({"type": "failure", "status": "captured", "confidence": 1,
                                      "source": {"hook": "test"}, "content": "test fail",
                                      "context": "ctx", "session_id": "s1"})
@@ -129,7 +288,200 @@ class TestMemoryStoreUpdate(unittest.TestCase):
         self.assertIsNone(self.store.update("SIG-99999999-0001", {"status": "analyzed"}))
 
 
-class TestMemoryStoreArchive(unittest.TestCase):
+class TestMemoryStoreIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.ids = [self.store.append({"type": "failure", "status": "captured", "confidence": 1,
+                                       "source": {"hook": "test"}, "content": f"entry {i}",
+                                       "context": "ctx", "session_id": "s1"})["id"]
+                    for i in range(5)]
+        self.log_path, self.index_path = _segment_paths(self.store, self.ids[0])
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _fresh_get(self, entry_id):
+        return MemoryStore(base_dir=self.tmpdir).get(entry_id)
+
+    def test_append_maintains_index_file(self):
+        with open(self.index_path, "r") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([r["id"] for r in lines[1:]], self.ids)
+        with open(self.log_path, "rb") as f:
+            f.seek(lines[3]["off"])
+            self.assertEqual(json.loads(f.read(lines[3]["len"]))["id"], self.ids[2])
+
+    def test_get_rebuilds_missing_index(self):
+        os.remove(self.index_path)
+        self.assertEqual(self._fresh_get(self.ids[3])["content"], "entry 3")
+
+    def test_get_rebuilds_corrupt_index(self):
+        with open(self.index_path, "w") as f:
+            f.write("not json\n")
+        self.assertEqual(self._fresh_get(self.ids[1])["content"], "entry 1")
+
+    def test_get_sees_records_written_without_index(self):
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps({"id": "SIG-20260101-0001", "content": "by hand"}) + "\n")
+        self.assertEqual(self._fresh_get("SIG-20260101-0001")["content"], "by hand")
+        self.assertEqual(self.store.get("SIG-20260101-0001")["content"], "by hand")
+
+    def test_update_keeps_later_offsets_valid(self):
+        self.store.update(self.ids[1], {"context": "a much longer context than before" * 3})
+        for i, eid in enumerate(self.ids):
+            self.assertEqual(self._fresh_get(eid)["content"], f"entry {i}")
+        self.assertEqual(self.store.get(self.ids[4])["content"], "entry 4")
+
+
+class TestMemoryStoreSecondaryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.store.append_many([
+            {"type": "failure", "status": "captured", "content": "f1", "session_id": "s1",
+             "tags": ["Bash"]},
+            {"type": "correction", "status": "captured", "content": "c1", "session_id": "s2",
+             "tags": ["pnpm", "Bash"]},
+            {"type": "correction", "status": "analyzed", "content": "c2", "session_id": "s1"},
+        ])
+        self.ids = [e["id"] for e in self.store.query()]
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def test_filtered_query_skips_full_scan(self):
+        fresh = MemoryStore(base_dir=self.tmpdir)
+        with patch.object(MemoryStore, "_read_all", side_effect=AssertionError("full scan")):
+            results = fresh.query(status="captured", session_id="s1")
+            self.assertEqual([e["content"] for e in results], ["f1"])
+            self.assertEqual([e["content"] for e in fresh.query(tags=["Bash"])], ["f1", "c1"])
+            self.assertEqual(fresh.query(entry_type="command"), [])
+
+    def test_update_moves_entry_between_status_postings(self):
+        self.store.update(self.ids[0], {"status": "dismissed"})
+        fresh = MemoryStore(base_dir=self.tmpdir)
+        for store in (self.store, fresh):
+            self.assertEqual([e["content"] for e in store.query(status="captured")], ["c1"])
+            self.assertEqual([e["content"] for e in store.query(status="dismissed")], ["f1"])
+
+    def test_deleted_entries_leave_postings(self):
+        self.store.update(self.ids[1], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.store.archive(days=14)
+        self.assertEqual([e["content"] for e in self.store.query(tags=["pnpm"])], [])
+        self.assertEqual([e["content"] for e in MemoryStore(base_dir=self.tmpdir).query(
+            status="captured")], ["f1"])
+
+    def test_since_filter_uses_indexed_timestamp(self):
+        self.store.update(self.ids[0], {"timestamp": "2026-01-01T00:00:00Z"})
+        results = self.store.query(session_id="s1", since="2026-01-02T00:00:00Z")
+        self.assertEqual([e["content"] for e in results], ["c2"])
+
+
+class TestMemoryStoreDeltaLog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.ids = [self.store.append({"type": "failure", "status": "captured", "confidence": 1,
+                                       "source": {"hook": "test"}, "content": f"entry {i}",
+                                       "context": "ctx", "session_id": "s1"})["id"]
+                    for i in range(3)]
+        self.log_path = _segment_paths(self.store, self.ids[0])[0]
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _log_lines(self):
+        with open(self.log_path, "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_update_appends_delta_record(self):
+        before = os.path.getsize(self.log_path)
+        self.store.update(self.ids[0], {"status": "dismissed"})
+        with open(self.log_path, "rb") as f:
+            self.assertTrue(f.read(before).endswith(b"\n"))
+        last = self._log_lines()[-1]
+        self.assertEqual(last, {"op": "update", "id": self.ids[0], "fields": {"status": "dismissed"}})
+        self.assertEqual(MemoryStore(base_dir=self.tmpdir).get(self.ids[0])["status"], "dismissed")
+        self.assertEqual(len(self.store.query(status="dismissed")), 1)
+
+    def test_archive_appends_delete_records(self):
+        self.store.update(self.ids[1], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.assertEqual(self.store.archive(days=14), 1)
+        self.assertEqual(self._log_lines()[-1], {"op": "delete", "id": self.ids[1]})
+        self.assertIsNone(self.store.get(self.ids[1]))
+        self.assertEqual([e["id"] for e in self.store.query()], [self.ids[0], self.ids[2]])
+
+    def test_compact_folds_deltas(self):
+        self.store.update(self.ids[0], {"status": "analyzed"})
+        self.store.update(self.ids[0], {"confidence": 3})
+        self.store.update(self.ids[2], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.store.archive(days=14)
+        view = self.store.query()
+        self.assertEqual(self.store.compact(), 4)
+        lines = self._log_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertFalse(any("op" in line for line in lines))
+        self.assertEqual(self.store.query(), view)
+        self.assertEqual(self.store.get(self.ids[0])["confidence"], 3)
+        self.assertEqual(self.store.compact(), 0)
+
+    def test_needs_compaction_threshold(self):
+        self.assertFalse(self.store.needs_compaction())
+        with patch("jsonl_store.COMPACT_MIN_DELTAS", 2):
+            self.store.update(self.ids[0], {"status": "analyzed"})
+            self.assertFalse(self.store.needs_compaction())
+            self.store.update(self.ids[1], {"status": "analyzed"})
+            self.assertTrue(self.store.needs_compaction())
+
+
+class TestMemoryStoreConcurrency(unittest.TestCase):
+    backend = "jsonl"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def test_readers_do_not_block_on_writer_lock(self):
+        result = self.store.append({"type": "failure", "status": "captured", "content": "x",
+                                    "session_id": "s1"})
+        reader = open_store(base_dir=self.tmpdir, backend=self.backend)
+        with self.store._lock():
+            self.assertEqual(reader.get(result["id"])["content"], "x")
+            self.assertEqual(len(reader.query()), 1)
+
+    def test_concurrent_appenders_and_updaters_lose_nothing(self):
+        workers, count = 6, 30
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_stress_worker, args=(self.tmpdir, w, count, self.backend))
+                 for w in range(workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=120)
+            self.assertEqual(p.exitcode, 0)
+
+        entries = self.store.query()
+        ids = [e["id"] for e in entries]
+        self.assertEqual(len(ids), workers * count)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual({e["content"] for e in entries},
+                         {f"w{w}-{i}" for w in range(workers) for i in range(count)})
+        self.assertTrue(all(e["status"] == "analyzed" for e in entries))
+        # The index agrees with the log after all the interleaved rewrites
+        fresh = open_store(base_dir=self.tmpdir, backend=self.backend)
+        for e in entries:
+            self.assertEqual(fresh.get(e["id"]), e)
+
+
+class TestMemoryStoreSegments(unittest.TestCase):
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
         self.store = MemoryStore(base_dir=self.tmpdir)
@@ -138,6 +490,113 @@ class TestMemoryStoreArchive(unittest.TestCase):
         import shutil
         shutil.rmtree(self.tmpdir)
 
+    def _old_entry(self, entry_id, status="captured", content="old"):
+        day = f"{entry_id[4:8]}-{entry_id[8:10]}-{entry_id[10:12]}"
+        return {"id": entry_id, "version": 1, "timestamp": f"{day}T10:00:00Z",
+                "session_id": "old", "type": "failure", "status": status, "confidence": 1,
+                "source": {"hook": "test"}, "content": content, "context": "old",
+                "category": "", "tags": [], "related": [], "promoted_to": None, "meta": {}}
+
+    def _write_legacy(self, *records):
+        os.makedirs(self.tmpdir, exist_ok=True)
+        with open(self.store.signals_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def test_migrates_single_file_layout(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"),
+                           self._old_entry("SIG-20260102-0001", content="second"),
+                           {"op": "update", "id": "SIG-20260101-0001", "fields": {"status": "analyzed"}})
+        self.assertEqual([e["id"] for e in self.store.query()], ["SIG-20260101-0001", "SIG-20260102-0001"])
+        self.assertFalse(os.path.exists(self.store.signals_path))
+        self.assertTrue(os.path.exists(self.store.signals_path + ".migrated"))
+        self.assertTrue(os.path.exists(_segment_paths(self.store, "SIG-20260102-0001")[0]))
+        self.assertEqual(self.store.get("SIG-20260101-0001")["status"], "analyzed")
+        with open(self.store.manifest_path, "r") as f:
+            self.assertEqual(list(json.load(f)["segments"]), ["2026-01-01", "2026-01-02"])
+
+    def test_archive_deletes_whole_old_segments(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"), self._old_entry("SIG-20260101-0002"))
+        new = self.store.append({"type": "failure", "status": "captured", "content": "new",
+                                 "session_id": "s1"})
+        old_log = _segment_paths(self.store, "SIG-20260101-0001")[0]
+        self.assertTrue(os.path.exists(old_log))
+        self.assertEqual(self.store.archive(days=14), 2)
+        self.assertFalse(os.path.exists(old_log))
+        self.assertEqual([e["id"] for e in self.store.query()], [new["id"]])
+
+    def test_whole_segment_drop_updates_stats(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"), self._old_entry("SIG-20260101-0002"))
+        self.store.append({"type": "failure", "status": "captured", "content": "new", "session_id": "s1"})
+        self.assertEqual(self.store.stats()["total"], 3)
+        self.store.archive(days=14)
+        self.assertEqual(self.store.stats(), self.store.stats(recount=True))
+        self.assertEqual(self.store.stats()["total"], 1)
+
+    def test_archive_keeps_segments_with_promoted_entries(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"),
+                           self._old_entry("SIG-20260101-0002", status="promoted"))
+        self.assertEqual(self.store.archive(days=14), 1)
+        self.assertEqual([e["id"] for e in self.store.query()], ["SIG-20260101-0002"])
+
+    def test_limited_newest_first_query_stops_at_newest_segment(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"))
+        self.store.append({"type": "failure", "status": "captured", "content": "new", "session_id": "s1"})
+        opened = []
+        real_query = _Segment.query
+
+        def spy(segment, **kwargs):
+            opened.append(segment.name)
+            return real_query(segment, **kwargs)
+
+        with patch.object(_Segment, "query", spy):
+            newest = list(self.store.iter_query(limit=1, newest_first=True))
+        self.assertEqual([e["content"] for e in newest], ["new"])
+        self.assertNotIn("2026-01-01", opened)
+
+    def test_since_query_skips_older_segments(self):
+        self._write_legacy(self._old_entry("SIG-20260101-0001"))
+        new = self.store.append({"type": "failure", "status": "captured", "content": "new",
+                                 "session_id": "s1"})
+        opened = []
+        real_query = _Segment.query
+
+        def spy(segment, **kwargs):
+            opened.append(segment.name)
+            return real_query(segment, **kwargs)
+
+        with patch.object(_Segment, "query", spy):
+            results = self.store.query(since=new["timestamp"])
+        self.assertEqual([e["id"] for e in results], [new["id"]])
+        self.assertNotIn("2026-01-01", opened)
+
+    def test_manifest_bounds_follow_updated_timestamps(self):
+        new = self.store.append({"type": "failure", "status": "captured", "content": "new",
+                                 "session_id": "s1"})
+        self.store.update(new["id"], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.assertEqual(self.store.archive(days=14), 1)
+        self.assertEqual(self.store.query(), [])
+
+    def test_missing_manifest_is_rebuilt(self):
+        new = self.store.append({"type": "failure", "status": "captured", "content": "new",
+                                 "session_id": "s1"})
+        os.remove(self.store.manifest_path)
+        fresh = MemoryStore(base_dir=self.tmpdir)
+        self.assertEqual([e["id"] for e in fresh.query()], [new["id"]])
+        self.assertTrue(os.path.exists(self.store.manifest_path))
+
+
+class TestMemoryStoreArchive(unittest.TestCase):
+    backend = "jsonl"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
     def test_archive_removes_old_entries(self):
         # Manually write an old entry
         old_ts = "2026-01-01T00:00:00Z"
@@ -159,11 +618,128 @@ class TestMemoryStoreArchive(unittest.TestCase):
         self.assertEqual(len(remaining), 1)
         self.assertEqual(remaining[0]["content"], "new")
 
+    def test_recent_repeat_keeps_an_old_signal_hot(self):
+        from datetime import datetime, timedelta, timezone
+        month_ago = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat(timespec="seconds")
+        old, gone = self.store.append_many(
+            [{"type": "correction", "status": "captured", "content": "Use pnpm", "session_id": "old"},
+             {"type": "correction", "status": "captured", "content": "Use uv", "session_id": "old"}])
+        self._age(old, month_ago.replace("+00:00", "Z"))
+        self._age(gone, month_ago.replace("+00:00", "Z"))
+        again = self.store.append({"type": "correction", "status": "captured", "content": "use pnpm",
+                                   "session_id": "new"})
+        self.assertEqual(again["id"], old["id"])
+        self.assertEqual(self.store.maintain(), {"archived": 1, "compacted": 0})
+        self.assertIsNone(self.store.get(gone["id"]))
+        self.assertEqual([e["id"] for e in self.store.query(status="captured", session_id="new")], [old["id"]])
+        self.assertFalse(self.store.prune_due(14))
 
-class TestMemoryStoreStats(unittest.TestCase):
+    def _age(self, entry, ts="2026-01-01T00:00:00Z"):
+        self.store.update(entry["id"], {"timestamp": ts})
+
+    def test_archived_entries_move_to_cold_archive(self):
+        old = self.store.append({"type": "correction", "status": "captured", "content": "old",
+                                 "session_id": "s1", "tags": ["pnpm"]})
+        self._age(old)
+        self.store.append({"type": "correction", "status": "captured", "content": "new", "session_id": "s1"})
+        self.assertEqual(self.store.archive(days=14), 1)
+        self.assertIsNone(self.store.get(old["id"]))
+        self.assertEqual([e["content"] for e in self.store.iter_query(include_archive=True)], ["old", "new"])
+        self.assertEqual([e["content"] for e in self.store.iter_query(
+            include_archive=True, newest_first=True, limit=1)], ["new"])
+        self.assertEqual([e["content"] for e in self.store.iter_query(tags=["pnpm"], include_archive=True)],
+                         ["old"])
+        self.assertEqual(self.store.stats()["total"], 1)
+
+    def test_include_archive_skips_days_before_since(self):
+        from cold_archive import ColdArchive
+        old = self.store.append({"type": "failure", "status": "captured", "content": "old"})
+        self._age(old)
+        self.store.archive(days=14)
+        opened = []
+        real_read = ColdArchive._read
+
+        def spy(archive, name):
+            opened.append(name)
+            return real_read(archive, name)
+
+        with patch.object(ColdArchive, "_read", spy):
+            self.assertEqual(list(self.store.iter_query(since="2026-02-01", include_archive=True)), [])
+            self.assertEqual(list(self.store.iter_query(newest_first=True, limit=1)), [])
+        self.assertEqual(opened, [])
+        self.assertEqual(len(list(self.store.iter_query(since="2025-12-31", include_archive=True))), 1)
+
+    def test_append_does_not_prune(self):
+        old = self.store.append({"type": "failure", "status": "captured", "content": "old"})
+        self._age(old)
+        self.store.append_many({"type": "failure", "status": "captured", "content": f"new {i}"}
+                               for i in range(50))
+        self.assertIsNotNone(self.store.get(old["id"]))
+
+    def test_prune_due_only_when_something_is_prunable(self):
+        self.store.append({"type": "failure", "status": "captured", "content": "new"})
+        self.assertFalse(self.store.prune_due())
+        promoted = self.store.append({"type": "failure", "status": "promoted", "content": "kept"})
+        self._age(promoted)
+        self.assertFalse(self.store.prune_due())
+        old = self.store.append({"type": "failure", "status": "captured", "content": "old"})
+        self._age(old)
+        self.assertTrue(self.store.prune_due())
+        self.assertFalse(self.store.prune_due(days=365 * 10))
+
+    def test_maintain_prunes_when_due(self):
+        old = self.store.append({"type": "failure", "status": "captured", "content": "old"})
+        self._age(old)
+        self.store.append({"type": "failure", "status": "captured", "content": "new"})
+        self.assertEqual(self.store.maintain(), {"archived": 1, "compacted": 0})
+        self.assertFalse(self.store.prune_due())
+        self.assertEqual(self.store.maintain(), {"archived": 0, "compacted": 0})
+        with patch.object(type(self.store), "archive", side_effect=AssertionError("pruned")):
+            self.store.maintain()
+
+    def test_protecting_an_old_entry_clears_prune_due_after_one_prune(self):
+        old = self.store.append({"type": "failure", "status": "captured", "content": "old"})
+        self._age(old)
+        self.store.update(old["id"], {"status": "confirmed"})
+        self.assertEqual(self.store.archive(days=14), 0)
+        self.assertFalse(self.store.prune_due())
+
+
+class TestColdArchive(unittest.TestCase):
     def setUp(self):
+        from cold_archive import ColdArchive
         self.tmpdir = tempfile.mkdtemp()
         self.store = MemoryStore(base_dir=self.tmpdir)
+        self.archive = ColdArchive(self.store)
+        self.entries = [{"id": f"SIG-20260101-000{i}", "timestamp": f"2026-01-01T0{i}:00:00Z",
+                         "content": f"c{i}"} for i in range(1, 4)]
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def test_appends_members_and_dedupes_ids(self):
+        self.archive.add(self.entries[:2])
+        self.archive.add(self.entries[1:])
+        self.assertEqual([e["content"] for e in self.archive.iter_entries()], ["c1", "c2", "c3"])
+        self.assertEqual(self.archive._index()["2026-01-01"]["max_ts"], "2026-01-01T03:00:00Z")
+
+    def test_truncated_tail_and_lost_index(self):
+        self.archive.add(self.entries[:2])
+        path = self.archive._path("2026-01-01")
+        with open(path, "ab") as f:
+            f.write(b"\x1f\x8b\x08")  # a gzip member cut off mid-header
+        os.remove(self.archive.index_path)
+        self.assertEqual([e["content"] for e in self.archive.iter_entries()], ["c1", "c2"])
+        self.assertEqual(self.archive._index()["2026-01-01"]["count"], 2)
+
+
+class TestMemoryStoreStats(unittest.TestCase):
+    backend = "jsonl"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
         self.store.append({"type": "failure", "status": "captured", "confidence": 1,
                            "source": {"hook": "test"}, "content": "f1", "context": "c",
                            "session_id": "s1"})
@@ -191,11 +767,40 @@ class TestMemoryStoreStats(unittest.TestCase):
         # Should be a compact string like "reflect: 2 pending"
         self.assertIn("2", line)
 
+    def test_stats_served_from_sidecar(self):
+        self.assertTrue(os.path.exists(self.store.stats_path))
+        with patch.object(MemoryStore, "_read_all", side_effect=AssertionError("full scan")):
+            self.assertEqual(self.store.stats()["total"], 3)
+            self.assertEqual(statusline(self.tmpdir, self.backend), "reflect: 2 pending")
+
+    def test_sidecar_follows_update_and_archive(self):
+        entry = self.store.query(entry_type="failure")[0]
+        self.store.update(entry["id"], {"status": "analyzed", "category": "tooling"})
+        s = self.store.stats()
+        self.assertEqual(s["by_status"], {"captured": 1, "analyzed": 1, "promoted": 1})
+        self.assertEqual(s["by_category"]["tooling"], 1)
+        self.store.update(entry["id"], {"timestamp": "2020-01-01T00:00:00Z"})
+        self.assertEqual(self.store.archive(days=14), 1)
+        s = self.store.stats()
+        self.assertEqual(s["total"], 2)
+        self.assertNotIn("analyzed", s["by_status"])
+        self.assertEqual(s, self.store.stats(recount=True))
+
+    def test_missing_or_corrupt_sidecar_is_rebuilt(self):
+        with open(self.store.stats_path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(self.store.stats()["by_type"]["correction"], 2)
+        os.remove(self.store.stats_path)
+        self.assertEqual(statusline(self.tmpdir, self.backend), "reflect: 2 pending")
+        self.assertTrue(os.path.exists(self.store.stats_path))
+
 
 class TestMemoryStorePromote(unittest.TestCase):
+    backend = "jsonl"
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
-        self.store = MemoryStore(base_dir=self.tmpdir)
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
         result = self.store.append({"type": "correction", "status": "captured", "confidence": 2,
                                      "source": {"hook": "PreCompact"}, "content": "Use pnpm",
                                      "context": "User said no", "session_id": "s1",
@@ -219,8 +824,200 @@ class TestMemoryStorePromote(unittest.TestCase):
         self.assertIn("Use pnpm not npm", content)
         self.assertIn(self.entry_id.replace("SIG", "LRN"), content)
 
+    def _promote_new(self, content, category):
+        entry = self.store.append({"type": "correction", "status": "captured", "content": content,
+                                   "category": category})
+        self.store.promote(entry["id"], "CLAUDE.md", content)
+        return entry["id"].replace("SIG", "LRN")
+
+    def _view(self):
+        with open(self.store.learnings_index, "r") as f:
+            return f.read()
+
+    def test_learning_lookup_by_lrn_id(self):
+        self.store.promote(self.entry_id, "~/.claude/CLAUDE.md", "Use pnpm not npm")
+        learning = self.store.get_learning(self.entry_id.replace("SIG", "LRN"))
+        self.assertEqual(learning["content"], "Use pnpm not npm")
+        self.assertEqual(learning["category"], "command")
+        self.assertEqual(learning["target"], "~/.claude/CLAUDE.md")
+        self.assertIsNone(self.store.get_learning("LRN-19990101-0001"))
+
+    def test_learnings_are_sharded_per_category(self):
+        self.store.promote(self.entry_id, "CLAUDE.md", "Use pnpm not npm")
+        self._promote_new("Tabs in Makefiles", "gotcha")
+        shards = sorted(f for f in os.listdir(self.store.learnings_dir) if f.endswith(".jsonl"))
+        self.assertEqual(shards, ["command.jsonl", "gotcha.jsonl"])
+
+    def test_promotion_rerenders_only_its_section(self):
+        self.store.promote(self.entry_id, "CLAUDE.md", "Use pnpm not npm")
+        self._promote_new("Tabs in Makefiles", "gotcha")
+        # Hand edits outside the generated sections survive
+        view = self._view().replace("# Learnings\n", "# Learnings\n\nMy notes.\n")
+        with open(self.store.learnings_index, "w") as f:
+            f.write(view)
+        self._promote_new("Run make -j", "command")
+        view = self._view()
+        self.assertIn("My notes.", view)
+        command = view[view.index("## Command"):view.index("<!-- /learnings:command -->")]
+        self.assertIn("Use pnpm not npm", command)
+        self.assertIn("Run make -j", command)
+        self.assertNotIn("Tabs in Makefiles", command)
+        self.assertEqual(view.count("## Gotcha"), 1)
+
+    def test_legacy_learnings_file_is_imported(self):
+        os.makedirs(self.store.learnings_dir, exist_ok=True)
+        with open(self.store.learnings_index, "w") as f:
+            f.write("# Learnings\n\n## Command\n- [LRN-20260101-0001] Use uv (promoted to CLAUDE.md)\n")
+        self.assertEqual(self.store.get_learning("LRN-20260101-0001")["content"], "Use uv")
+        self.store.promote(self.entry_id, "CLAUDE.md", "Use pnpm not npm")
+        view = self._view()
+        self.assertIn("[LRN-20260101-0001] Use uv", view)
+        self.assertEqual(view.count("## Command"), 1)
+        self.assertTrue(os.path.exists(self.store.learnings_index + ".migrated"))
+
+
+    def test_category_spellings_share_a_section_with_migrated_ones(self):
+        os.makedirs(self.store.learnings_dir, exist_ok=True)
+        with open(self.store.learnings_index, "w") as f:
+            f.write("# Learnings\n\n## Commands\n- [LRN-20260101-0001] Use uv (promoted to CLAUDE.md)\n")
+        self._promote_new("Run make -j", "Commands")
+        self._promote_new("Ask before force-pushing", "Agent Friction")
+        self._promote_new("Do not rebase shared branches", "agent_friction")
+        view = self._view()
+        self.assertEqual((view.count("## Commands"), view.count("## Agent Friction")), (1, 1))
+        shards = sorted(f for f in os.listdir(self.store.learnings_dir) if f.endswith(".jsonl"))
+        self.assertEqual(shards, ["agent-friction.jsonl", "commands.jsonl"])
+
+
+class TestMemoryStoreRecurrence(unittest.TestCase):
+    backend = "jsonl"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = open_store(base_dir=self.tmpdir, backend=self.backend)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _capture(self, content, session_id, entry_type="correction"):
+        return self.store.append({"type": entry_type, "status": "captured", "content": content,
+                                  "session_id": session_id})
+
+    def test_ranked_by_distinct_sessions_then_count(self):
+        for session in ("s1", "s2", "s3"):
+            self._capture("Use pnpm", session)
+        for _ in range(4):
+            self._capture("Use uv", "s1")
+        self._capture("Use uv", "s2")
+        self._capture("Tabs in Makefiles", "s1", entry_type="gotcha")
+        ranked = self.store.recurrence()
+        self.assertEqual([r["content"] for r in ranked], ["Use pnpm", "Use uv", "Tabs in Makefiles"])
+        self.assertEqual(ranked[0]["sessions"], ["s1", "s2", "s3"])
+        self.assertEqual(ranked[0]["confidence"], "high")
+        self.assertEqual((ranked[1]["count"], ranked[1]["confidence"]), (5, "medium"))
+        self.assertEqual(ranked[2]["confidence"], "low")
+        self.assertLessEqual(ranked[0]["first_seen"], ranked[0]["last_seen"])
+        self.assertEqual([r["content"] for r in self.store.recurrence(entry_type="gotcha")],
+                         ["Tabs in Makefiles"])
+        self.assertEqual(len(self.store.recurrence(min_sessions=2)), 2)
+        self.assertEqual(len(self.store.recurrence(limit=1)), 1)
+
+    def test_pending_skips_processed_signals(self):
+        entry = self._capture("Use pnpm", "s1")
+        self._capture("Use uv", "s1")
+        self.store.update(entry["id"], {"status": "dismissed"})
+        self.assertEqual([r["content"] for r in self.store.recurrence(pending=True)], ["Use uv"])
+
+    def test_recurrence_outlives_the_prune(self):
+        old = self._capture("Use pnpm", "s1")
+        self.store.update(old["id"], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.store.archive(days=14)
+        self._capture("Use pnpm", "s2")
+        row = self.store.recurrence()[0]
+        self.assertEqual((row["sessions"], row["count"]), (["s1", "s2"], 2))
+
+    def _ranking(self):
+        return [(r["content"], r["sessions"], r["count"]) for r in self.store.recurrence()]
+
+    def test_appends_only_extend_the_log_until_maintain_folds_it(self):
+        self._capture("Use pnpm", "s1")
+        shards = os.path.join(self.tmpdir, "recurrence")
+        before = {name: os.stat(os.path.join(shards, name)).st_mtime_ns
+                  for name in os.listdir(shards) if name.endswith(".json")}
+        self._capture("Use pnpm", "s2")
+        self._capture("Use uv", "s2")
+        after = {name: os.stat(os.path.join(shards, name)).st_mtime_ns
+                 for name in os.listdir(shards) if name.endswith(".json")}
+        self.assertEqual(after, before)
+        ranking = self._ranking()
+        self.assertEqual(ranking, [("Use pnpm", ["s1", "s2"], 2), ("Use uv", ["s2"], 1)])
+        self.store.maintain()
+        with open(os.path.join(shards, "log.jsonl")) as f:
+            self.assertEqual([json.loads(line) for line in f], [{"generation": 2}])
+        self.assertEqual(self._ranking(), ranking)
+        self._capture("Use uv", "s3")
+        self.assertEqual(self._ranking()[1], ("Use uv", ["s2", "s3"], 2))
+
+    def test_fold_cut_short_neither_loses_nor_double_counts(self):
+        from recurrence import Recurrence
+        self._capture("Use pnpm", "s1")
+        self._capture("Use pnpm", "s2")
+        self._capture("Use uv", "s2")
+        log = os.path.join(self.tmpdir, "recurrence", "log.jsonl")
+        with open(log) as f:
+            unfolded = f.read()
+        ranking = self._ranking()
+        with self.store._lock():
+            Recurrence(self.store).fold()
+        with open(log, "w") as f:
+            f.write(unfolded)  # as if the fold stopped before starting the new log
+        self.assertEqual(self._ranking(), ranking)
+        self.store.maintain()
+        self.assertEqual(self._ranking(), ranking)
+
+    def test_shards_written_before_the_log_are_read(self):
+        self._capture("Use pnpm", "s1")
+        self.store.maintain()
+        shards = os.path.join(self.tmpdir, "recurrence")
+        for name in os.listdir(shards):
+            path = os.path.join(shards, name)
+            if name.endswith(".json"):
+                with open(path) as f:
+                    rows = json.load(f)["rows"]
+                with open(path, "w") as f:
+                    json.dump(rows, f)
+            else:
+                os.remove(path)
+        self._capture("Use pnpm", "s2")
+        self.assertEqual(self._ranking(), [("Use pnpm", ["s1", "s2"], 2)])
+
+    def test_rebuild_counts_every_session_of_folded_entries(self):
+        import shutil
+        for session in ("A", "B", "C"):
+            self._capture("Use pnpm", session)
+        ranking = self._ranking()
+        self.assertEqual(self.store.recurrence()[0]["confidence"], "high")
+        shutil.rmtree(os.path.join(self.tmpdir, "recurrence"))
+        self.assertEqual(self._ranking(), ranking)
+        self.assertEqual(self.store.recurrence()[0]["confidence"], "high")
+
+    def test_missing_table_is_rebuilt_from_hot_and_archived_entries(self):
+        import shutil
+        old = self._capture("Use pnpm", "s1")
+        self.store.update(old["id"], {"timestamp": "2026-01-01T00:00:00Z"})
+        self.store.archive(days=14)
+        self._capture("Use pnpm", "s2")
+        self._capture("Use pnpm", "s2")
+        shutil.rmtree(os.path.join(self.tmpdir, "recurrence"))
+        row = self.store.recurrence()[0]
+        self.assertEqual((sorted(row["sessions"]), row["count"]), (["s1", "s2"], 3))
+        self.assertEqual(row["first_seen"], "2026-01-01T00:00:00Z")
+
 
 class TestMemoryStoreCLI(unittest.TestCase):
+    backend = "jsonl"
+
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
         self.script = os.path.join(os.path.dirname(__file__), "memory_store.py")
@@ -233,12 +1030,37 @@ class TestMemoryStoreCLI(unittest.TestCase):
         import subprocess
         env = os.environ.copy()
         env["REFLECTIONS_DIR"] = self.tmpdir
+        env["REFLECTIONS_BACKEND"] = self.backend
         result = subprocess.run(
             ["python3", self.script] + list(args),
             capture_output=True, text=True, env=env
         )
         return result
 
+    def test_cli_recurrence_is_ranked(self):
+        for content, session in (("Use uv", "s1"), ("Use pnpm", "s1"), ("Use pnpm", "s2")):
+            self._run("append", json.dumps({"type": "correction", "status": "captured", "content": content,
+                                            "session_id": session}))
+        result = self._run("recurrence", "--pending")
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual([r["content"] for r in json.loads(result.stdout)], ["Use pnpm", "Use uv"])
+
+    def test_cli_session_filter_matches_folded_repeats(self):
+        # The query inject-signals.sh runs for the resumed session
+        for session in ("A", "B"):
+            self._run("append", json.dumps({"type": "correction", "status": "captured", "content": "Use pnpm",
+                                            "session_id": session}))
+        result = self._run("query", "--status", "captured", "--session", "B")
+        self.assertEqual([e["sessions"] for e in json.loads(result.stdout)], [["A", "B"]])
+
+    def test_cli_promote_and_learning_lookup(self):
+        entry = json.loads(self._run("append", json.dumps({"type": "correction", "status": "captured",
+                                                           "content": "npm", "category": "command"})).stdout)
+        promoted = json.loads(self._run("promote", entry["id"], "CLAUDE.md", "Use pnpm").stdout)
+        self.assertEqual(promoted["status"], "promoted")
+        learning = json.loads(self._run("learning", entry["id"].replace("SIG", "LRN")).stdout)
+        self.assertEqual(learning["content"], "Use pnpm")
+
     def test_cli_append(self):
         entry_json = json.dumps({
             "type": "failure", "status": "captured", "confidence": 1,
@@ -287,5 +1109,216 @@ class TestMemoryStoreCLI(unittest.TestCase):
         self.assertEqual(len(output), 1)
 
 
+    def test_cli_query_streams_ndjson(self):
+        for content in ("one", "two", "three"):
+            self._run("append", json.dumps({"type": "failure", "status": "captured",
+                                            "content": content, "session_id": "s1"}))
+        result = self._run("query", "--limit", "2", "--reverse", "--fields", "content", "--ndjson")
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual([json.loads(line) for line in result.stdout.splitlines()],
+                         [{"content": "three"}, {"content": "two"}])
+        self.assertEqual(json.loads(self._run("query", "--status", "promoted").stdout), [])
+
+    def test_cli_query_include_archive(self):
+        result = json.loads(self._run("append", json.dumps({"type": "failure", "status": "captured",
+                                                             "content": "old"})).stdout)
+        self._run("update", result["id"], json.dumps({"timestamp": "2026-01-01T00:00:00Z"}))
+        self._run("archive", "--days", "14")
+        self.assertEqual(json.loads(self._run("query").stdout), [])
+        archived = json.loads(self._run("query", "--include-archive").stdout)
+        self.assertEqual([e["content"] for e in archived], ["old"])
+
+    def test_cli_export_import(self):
+        for content in ("one", "two"):
+            self._run("append", json.dumps({"type": "failure", "status": "captured",
+                                            "content": content, "session_id": "s1"}))
+        dump = os.path.join(self.tmpdir, "dump.jsonl")
+        self.assertEqual(self._run("export", "--output", dump).returncode, 0)
+        with open(dump) as f:
+            self.assertEqual([json.loads(line)["content"] for line in f], ["one", "two"])
+        # Re-importing the same signals is a no-op
+        result = self._run("import", dump)
+        self.assertEqual(json.loads(result.stdout), {"imported": 0})
+
+
+class TestStoreBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmpdir)
+
+    def _store(self, name, backend):
+        return open_store(base_dir=os.path.join(self.tmpdir, name), backend=backend)
+
+    def test_export_import_is_lossless_between_backends(self):
+        jsonl = self._store("a", "jsonl")
+        jsonl.append({"type": "correction", "status": "captured", "content": "Use pnpm",
+                      "session_id": "s1", "tags": ["pnpm", "npm"], "meta": {"nested": [1, {"x": None}]}})
+        first = jsonl.append({"type": "failure", "status": "captured", "content": "boom",
+                              "session_id": "s2", "source": {"hook": "test", "turn": 3}})
+        jsonl.update(first["id"], {"status": "analyzed", "confidence": 4})
+        exported = list(jsonl.export())
+
+        sqlite = self._store("b", "sqlite")
+        self.assertEqual(sqlite.import_entries(exported), 2)
+        self.assertEqual(sqlite.import_entries(exported), 0)
+        self.assertEqual(list(sqlite.export()), exported)
+
+        back = self._store("c", "jsonl")
+        self.assertEqual(back.import_entries(sqlite.export()), 2)
+        self.assertEqual(list(back.export()), exported)
+        self.assertEqual(back.stats(), jsonl.stats())
+
+    def test_import_keeps_id_sequence_ahead(self):
+        source = self._store("a", "jsonl")
+        entries = source.append_many([{"type": "failure", "status": "captured", "content": f"c{i}",
+                                       "session_id": "s1"} for i in range(3)])
+        for backend in ("jsonl", "sqlite"):
+            target = self._store(backend, backend)
+            target.append({"type": "failure", "status": "captured", "content": "local"})
+            target.import_entries(entries)
+            fresh = target.append({"type": "failure", "status": "captured", "content": "after"})
+            self.assertGreater(fresh["id"], entries[-1]["id"])
+
+    def test_sqlite_uses_wal_and_tag_table(self):
+        store = self._store("db", "sqlite")
+        tagged = store.append({"type": "correction", "status": "captured", "content": "x",
+                               "tags": ["pnpm"]})
+        conn = store._connect()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("SELECT id FROM signal_tags WHERE tag = 'pnpm'").fetchall(),
+                         [(tagged["id"],)])
+        store.update(tagged["id"], {"tags": ["yarn"]})
+        self.assertEqual(store.query(tags=["pnpm"]), [])
+        self.assertEqual(len(store.query(tags=["yarn"])), 1)
+
+    def test_sqlite_upgrade_files_fingerprints_of_existing_rows(self):
+        store = self._store("db", "sqlite")
+        first = store.append({"type": "correction", "status": "captured", "content": "Use pnpm"})
+        conn = store._connect()
+        conn.execute("DELETE FROM signal_fingerprints")
+        conn.execute("PRAGMA user_version = 1")
+        again = self._store("db", "sqlite").append({"type": "correction", "status": "captured",
+                                                    "content": "use pnpm"})
+        self.assertEqual(again["id"], first["id"])
+
+    def test_sqlite_upgrade_files_sessions_of_existing_rows(self):
+        store = self._store("db", "sqlite")
+        first = store.append({"type": "correction", "status": "captured", "content": "Use pnpm",
+                              "session_id": "A"})
+        store.append({"type": "correction", "status": "captured", "content": "use pnpm", "session_id": "B"})
+        conn = store._connect()
+        conn.execute("DELETE FROM signal_sessions")
+        conn.execute("PRAGMA user_version = 2")
+        self.assertEqual([e["id"] for e in self._store("db", "sqlite").query(session_id="B")], [first["id"]])
+
+    def test_missing_fingerprint_index_is_rebuilt(self):
+        import shutil
+        store = self._store("a", "jsonl")
+        first = store.append({"type": "correction", "status": "captured", "content": "Use pnpm"})
+        shutil.rmtree(store._fingerprints.dir)
+        self.assertEqual(self._store("a", "jsonl").append({"type": "correction", "status": "captured",
+                                                           "content": "use pnpm"})["id"], first["id"])
+        self.assertTrue(os.path.isdir(store._fingerprints.dir))
+
+    def test_fingerprint_shards_are_append_only_and_drop_archived_entries(self):
+        store = self._store("a", "jsonl")
+        kept = store.append({"type": "correction", "status": "captured", "content": "Use pnpm for installs"})
+        old = store.append({"type": "gotcha", "status": "captured", "content": "Tabs in Makefiles matter here"})
+        shard = os.path.join(store._fingerprints.dir, f"{kept['fingerprint']['exact'][:2]}.jsonl")
+        with open(shard) as f:
+            before = f.read()
+        store.append({"type": "failure", "status": "captured", "content": "Something else entirely broke now"})
+        with open(shard) as f:
+            self.assertTrue(f.read().startswith(before))
+        store.update(old["id"], {"timestamp": "2026-01-01T00:00:00Z"})
+        store.archive(days=14)
+        indexed = set()
+        for name in os.listdir(store._fingerprints.dir):
+            with open(os.path.join(store._fingerprints.dir, name)) as f:
+                indexed.update(json.loads(line)[1] for line in f)
+        self.assertIn(kept["id"], indexed)
+        self.assertNotIn(old["id"], indexed)
+        # Another type never folds, even with the same text
+        other = store.append({"type": "gotcha", "status": "captured", "content": "Use pnpm for installs"})
+        self.assertNotEqual(other["id"], kept["id"])
+
+    def test_backends_share_only_the_signal_store_base(self):
+        from signal_store import SignalStore
+        from sqlite_store import SqliteStore
+        self.assertTrue(issubclass(SqliteStore, SignalStore))
+        self.assertFalse(issubclass(SqliteStore, MemoryStore))
+        self.assertFalse(hasattr(self._store("db", "sqlite"), "segments_dir"))
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            open_store(base_dir=self.tmpdir, backend="redis")
+
+
+# The backend-agnostic suites, run again against the SQLite store
+
+class TestSqliteStoreAppend(TestMemoryStoreAppend):
+    backend = "sqlite"
+
+    def test_append_creates_signals_file(self):
+        self.store.append({"type": "failure", "status": "captured", "content": "x"})
+        self.assertTrue(os.path.exists(self.store.db_path))
+
+    def test_append_ids_continue_from_sequence_sidecar(self):
+        entry = {"type": "failure", "status": "captured", "content": "test"}
+        r1 = self.store.append(entry)
+        r2 = open_store(base_dir=self.tmpdir, backend=self.backend).append({**entry, "content": "another test"})
+        self.assertEqual(int(r2["id"][-4:]), int(r1["id"][-4:]) + 1)
+
+    def test_append_reseeds_missing_sequence_sidecar(self):
+        entry = {"type": "failure", "status": "captured", "content": "test"}
+        r1 = self.store.append(entry)
+        self.store._connect().execute("DELETE FROM sequence")
+        r2 = self.store.append({**entry, "content": "another test"})
+        self.assertEqual(int(r2["id"][-4:]), int(r1["id"][-4:]) + 1)
+
+
+class TestSqliteStoreQuery(TestMemoryStoreQuery):
+    backend = "sqlite"
+
+
+class TestSqliteStoreUpdate(TestMemoryStoreUpdate):
+    backend = "sqlite"
+
+
+class TestSqliteStoreConcurrency(TestMemoryStoreConcurrency):
+    backend = "sqlite"
+
+
+class TestSqliteStoreArchive(TestMemoryStoreArchive):
+    backend = "sqlite"
+
+
+class TestSqliteStoreStats(TestMemoryStoreStats):
+    backend = "sqlite"
+
+    @unittest.skip("the SQLite store counts with GROUP BY; there is no stats.json")
+    def test_stats_served_from_sidecar(self):
+        pass
+
+    @unittest.skip("the SQLite store counts with GROUP BY; there is no stats.json")
+    def test_missing_or_corrupt_sidecar_is_rebuilt(self):
+        pass
+
+
+class TestSqliteStorePromote(TestMemoryStorePromote):
+    backend = "sqlite"
+
+
+class TestSqliteStoreRecurrence(TestMemoryStoreRecurrence):
+    backend = "sqlite"
+
+
+class TestSqliteStoreCLI(TestMemoryStoreCLI):
+    backend = "sqlite"
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+# test_session_digest.py
+import json
+import os
+import random
+import tempfile
+import unittest
+from session_digest import extract_summary, stand_in, summarize, update_digest
+from transcript_io import parse_lines
+
+LINES = [
+    {"role": "user", "content": "Fix the login bug"},
+    {"role": "assistant", "content": "Reading the file.",
+     "tool_use": {"name": "Read", "input": {"file_path": "src/login.py"}, "result": "x = {\"name\": 1}\n" * 500}},
+    {"role": "assistant", "tool_use": {"result": "ok", "input": {"path": "src"}, "name": "Glob"}},
+    {"role": "assistant", "tool_use": {"name": "Task", "input": {"name": "helper", "file": "a.py"}}},
+    {"role": "user", "content": [{"type": "tool_result", "content": "done"}]},
+    {"type": "summary", "summary": "no role here"},
+]
+
+
+class TestSummaryStandIn(unittest.TestCase):
+    def _lines(self, **dump_args):
+        return [json.dumps(line, **dump_args).encode() + b"\n" for line in LINES]
+
+    def test_stand_ins_give_the_same_summary(self):
+        for dump_args in ({}, {"separators": (",", ":")}):
+            with self.subTest(dump_args=dump_args):
+                lines = self._lines(**dump_args)
+                self.assertEqual(extract_summary(parse_lines(lines, stand_in)),
+                                 extract_summary(parse_lines(lines)))
+
+    def test_tool_results_are_not_decoded(self):
+        lines = self._lines()
+        self.assertEqual(stand_in(lines[1]),
+                         {"role": "assistant", "tool_use": {"name": "Read", "input": {"file_path": "src/login.py"}}})
+        self.assertEqual(stand_in(lines[4]), {"role": "user"})
+
+    def test_ambiguous_or_roleless_lines_are_decoded(self):
+        lines = self._lines()
+        self.assertIsNone(stand_in(lines[3]))  # "name" appears twice
+        self.assertIsNone(stand_in(lines[5]))
+
+
+class TestUpdateDigest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _append(self, data):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def test_steps_give_the_same_summary_as_one_pass(self):
+        rng = random.Random(3)
+        lines = []
+        for i in range(300):
+            tool = {"name": f"Tool{rng.randint(0, 14)}", "input": {"file_path": f"src/f{rng.randint(0, 40)}.py"}}
+            lines.append(json.dumps(rng.choice([{"role": "user", "content": f"step {i}"},
+                                                {"role": "assistant", "tool_use": tool}])).encode() + b"\n")
+        data = b"".join(lines)
+        state = {}
+        cut = 0
+        while cut < len(data):
+            # Cut anywhere, including inside a line that is still being written
+            cut = min(len(data), cut + rng.randint(1, 4000))
+            self._append(data[os.path.getsize(self.path):cut])
+            update_digest(state, self.path)
+            self.assertEqual(state["summary"]["offset"], data.rfind(b"\n", 0, cut) + 1)
+        expected = extract_summary(parse_lines(lines))
+        self.assertEqual(summarize(json.loads(json.dumps(state))["summary"]), expected)
+        self.assertEqual(len(expected["tools_used"]), 10)
+        self.assertEqual(len(expected["files_touched"]), 20)
+
+    def test_rewritten_or_other_transcript_starts_over(self):
+        self._append(b'{"role": "user", "content": "a"}\n{"role": "user", "content": "b"}\n')
+        state = {}
+        self.assertEqual(update_digest(state, self.path)["turn_count"], 2)
+        with open(self.path, "wb") as f:
+            f.write(b'{"role": "user", "content": "c"}\n')
+        self.assertEqual(update_digest(state, self.path)["turn_count"], 1)
+        state["summary"]["path"] = "elsewhere.jsonl"
+        self.assertEqual(update_digest(state, self.path)["turn_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
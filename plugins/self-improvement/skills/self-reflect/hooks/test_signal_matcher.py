@@ -0,0 +1,52 @@
+# test_signal_matcher.py
+import unittest
+from signal_matcher import RuleMatcher, required_literal
+
+
+class TestRuleMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = RuleMatcher({
+            "correction": [r"\bno,\s", r"\binstead\b", r"I meant\b"],
+            "positive": [r"\bperfect\b", r"exactly right"],
+        })
+
+    def test_reports_every_category_and_the_rules_that_fired(self):
+        hits = self.matcher.classify("No, use rg instead. Perfect otherwise")
+        self.assertEqual(hits, {"correction": [r"\bno,\s", r"\binstead\b"], "positive": [r"\bperfect\b"]})
+
+    def test_no_match_is_empty(self):
+        self.assertEqual(self.matcher.classify("ok, continue"), {})
+
+    def test_matching_ignores_case(self):
+        self.assertEqual(self.matcher.classify("i MEANT the other file"), {"correction": [r"I meant\b"]})
+
+    def test_rules_with_their_own_groups(self):
+        matcher = RuleMatcher({"workflow": [r"use\s+(\w+)\s+instead\s+of\s+(\w+)", r"\bswitch\b"]})
+        self.assertEqual(matcher.classify("Use rg instead of grep, then switch"),
+                         {"workflow": [r"use\s+(\w+)\s+instead\s+of\s+(\w+)", r"\bswitch\b"]})
+
+    def test_compiles_on_first_use(self):
+        self.assertIsNone(self.matcher._compiled)
+        self.matcher.classify("no, thanks")
+        self.assertEqual(set(self.matcher._compiled), {"correction", "positive"})
+
+
+
+class TestRequiredLiteral(unittest.TestCase):
+    def test_longest_plain_run(self):
+        self.assertEqual(required_literal(r"that's not right"), "that's not right")
+        self.assertEqual(required_literal(r"\bactually[,\s]"), "actually")
+        self.assertEqual(required_literal(r"prefer \w+ over"), "prefer ")
+        self.assertEqual(required_literal(r"I meant\b"), "i meant")
+
+    def test_optional_characters_are_not_required(self):
+        self.assertEqual(required_literal(r"\w+ goes? in\b"), " goe")
+        self.assertEqual(required_literal(r"colou?r"), "colo")
+
+    def test_alternations_and_optional_groups_have_none(self):
+        self.assertEqual(required_literal(r"yes|no"), "")
+        self.assertEqual(required_literal(r"(very )?good"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# test_transcript_io.py
+import os
+import random
+import tempfile
+import unittest
+from transcript_io import count_lines, parse_lines, tail_lines
+
+
+class TestTailLines(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def _naive(self, data, n, start=0):
+        """Forward reference: complete non-blank lines after `start`, last n."""
+        body = data[start:data.rfind(b"\n") + 1] if b"\n" in data[start:] else b""
+        lines = [line for line in body.split(b"\n") if line.strip()]
+        return lines[-n:] if n else []
+
+    def test_matches_a_forward_read_at_any_block_size(self):
+        rng = random.Random(7)
+        for trial in range(40):
+            data = b"".join(rng.choice([b"", b"  ", b"x" * rng.randint(1, 40)]) + b"\n"
+                            for _ in range(rng.randint(0, 30)))
+            data += b"y" * rng.randint(0, 10)  # a line still being written
+            self._write(data)
+            for block_size in (1, 3, 16, 4096):
+                n, start = rng.randint(0, 12), rng.randint(0, len(data))
+                with self.subTest(trial=trial, block_size=block_size, n=n, start=start):
+                    lines, first, end = tail_lines(self.path, n, start, block_size)
+                    self.assertEqual(lines, self._naive(data, n, start) if data.rfind(b"\n") >= start else [])
+                    if lines:
+                        self.assertTrue(data[first:].startswith(lines[0]))
+                        self.assertEqual(data[end - 1:end], b"\n")
+                        self.assertEqual(data[end:].count(b"\n"), 0)
+
+    def test_line_spanning_many_blocks(self):
+        self._write(b"a\n" + b"z" * 1000 + b"\nb\n")
+        self.assertEqual(tail_lines(self.path, 2, block_size=7)[0], [b"z" * 1000, b"b"])
+
+    def test_partial_last_line_is_left_for_the_next_read(self):
+        self._write(b'{"a": 1}\n{"b": ')
+        self.assertEqual(tail_lines(self.path, 10), ([b'{"a": 1}'], 0, 9))
+        self._write(b'{"b": ')
+        self.assertEqual(tail_lines(self.path, 10), ([], 0, 0))
+
+    def test_start_offset_bounds_the_read(self):
+        self._write(b"one\ntwo\nthree\n")
+        self.assertEqual(tail_lines(self.path, 10, start=4), ([b"two", b"three"], 4, 14))
+        self.assertEqual(tail_lines(self.path, 10, start=14), ([], 14, 14))
+
+    def test_count_lines(self):
+        self._write(b"one\n\ntwo\nthree\n")
+        self.assertEqual(count_lines(self.path, 0, 9, block_size=2), 3)
+        self.assertEqual(count_lines(self.path, 5, 5), 0)
+
+
+class TestParseLines(unittest.TestCase):
+    def test_skips_invalid_json(self):
+        self.assertEqual(parse_lines([b'{"a": 1}', b"{not json", b"2"]), [{"a": 1}, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Transcript reading for the capture hooks.
+
+Claude Code transcripts are JSONL files that grow to hundreds of megabytes,
+mostly tool output, while the hooks only look at the most recent turns.
+tail_lines() reads the file backwards in fixed-size blocks from the end and
+stops as soon as it has the last N lines, so memory and time depend on the
+size of those lines rather than of the file. tail_span() does the same scan
+without keeping the lines, and iter_lines() then streams them forward from
+disk, so a hook can decode and process one entry at a time.
+
+Offsets are byte offsets into the file. A final line without a newline is
+still being written: it is never returned, and end_offset stops before it so
+the next run picks it up once complete.
+
+Most lines are tool calls and their output, which the hooks only need to
+know exist. parse_lines() takes a `stand_in` function that looks at a line's
+bytes and returns a small dict with the fields a hook reads, or None to
+decode the line in full. line_role() finds the role in the first bytes of a
+line, key_offsets() finds where given keys occur in one regex pass, and
+decode_at() decodes a single value (a tool name, a tool input) without
+touching the rest, so decode time follows the content the hooks use.
+"""
+import json
+import os
+import re
+
+BLOCK_SIZE = 64 * 1024
+# Writers put "role" before the content; a role further in means "decode it"
+HEAD_BYTES = 512
+ROLE_PATTERN = re.compile(rb'"role":\s*"([a-z_]+)"')
+
+_decoder = json.JSONDecoder()
+
+
+def tail_span(path, n, start=0, block_size=BLOCK_SIZE):
+    """Where the last `n` complete, non-blank lines of `path` after byte `start` are.
+
+    Returns (first_offset, end_offset): first_offset is where the first of those
+    lines starts and end_offset is just past the last complete line (both are
+    `start` when there is no complete line). The lines themselves are not kept.
+    """
+    count = 0
+    first_offset = end_offset = None
+    content = False  # does the line running past the current block have any?
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > start and count < n:
+            step = min(block_size, pos - start)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            hi = len(block)
+            nl = block.rfind(b"\n", 0, hi)
+            while nl >= 0 and count < n:
+                if end_offset is None:
+                    end_offset = pos + nl + 1  # anything after it is still being written
+                elif content or block[nl + 1:hi].strip():
+                    count += 1
+                    first_offset = pos + nl + 1
+                content = False
+                hi = nl
+                nl = block.rfind(b"\n", 0, hi)
+            if end_offset is not None:
+                content = content or bool(block[:hi].strip())
+        if pos == start and count < n and content:
+            first_offset = start
+    if end_offset is None:
+        return start, start
+    return end_offset if first_offset is None else first_offset, end_offset
+
+
+def iter_lines(path, start, end):
+    """Yield the non-blank lines between byte offsets `start` and `end`, reading forward."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            line = f.readline(remaining)
+            if not line:
+                break
+            remaining -= len(line)
+            if line.strip():
+                yield line.rstrip(b"\n")
+
+
+def complete_end(path, start=0, block_size=BLOCK_SIZE):
+    """The byte offset just past the last complete line after `start`, or `start` if there is none."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > start:
+            step = min(block_size, pos - start)
+            pos -= step
+            f.seek(pos)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                return pos + nl + 1
+    return start
+
+
+def tail_lines(path, n, start=0, block_size=BLOCK_SIZE):
+    """The last `n` complete, non-blank lines of `path` after byte `start`, oldest first.
+
+    Returns (lines, first_offset, end_offset) as for tail_span().
+    """
+    first_offset, end_offset = tail_span(path, n, start, block_size)
+    return list(iter_lines(path, first_offset, end_offset)), first_offset, end_offset
+
+
+def count_lines(path, start, end, block_size=1024 * 1024):
+    """Number of newlines between byte offsets `start` and `end`, read in blocks."""
+    count = 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        while start < end:
+            block = f.read(min(block_size, end - start))
+            if not block:
+                break
+            count += block.count(b"\n")
+            start += len(block)
+    return count
+
+
+def line_role(line):
+    """The entry's role from a marker in the first HEAD_BYTES of `line`, or None."""
+    match = ROLE_PATTERN.search(line, 0, HEAD_BYTES)
+    return match.group(1).decode() if match else None
+
+
+def key_pattern(*keys):
+    """A pattern for key_offsets() matching any of `keys` used as an object key."""
+    return re.compile(rb'"(' + b"|".join(re.escape(k.encode()) for k in keys) + rb')":\s*')
+
+
+def key_offsets(line, pattern):
+    """{key: [offset of each value]} for the keys of `pattern` that occur in `line`.
+
+    A key inside a JSON string has its quotes escaped, so only real keys match.
+    """
+    offsets = {}
+    for match in pattern.finditer(line):
+        offsets.setdefault(match.group(1).decode(), []).append(match.end())
+    return offsets
+
+
+def decode_at(line, offset):
+    """Decode the single JSON value starting at byte `offset` of `line`. Raises ValueError."""
+    return _decoder.raw_decode(line[offset:].decode("utf-8"))[0]
+
+
+def iter_entries(lines, stand_in=None):
+    """Yield each line JSON-decoded, skipping lines that are not valid JSON.
+
+    With `stand_in`, a line for which stand_in(line) returns a dict is replaced by
+    that dict instead of being decoded.
+    """
+    for line in lines:
+        if stand_in is not None:
+            entry = stand_in(line)
+            if entry is not None:
+                yield entry
+                continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def parse_lines(lines, stand_in=None):
+    """iter_entries() as a list."""
+    return list(iter_entries(lines, stand_in))